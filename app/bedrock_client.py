@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+BEDROCK_MODEL_ID = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-7-sonnet-20250219-v1:0')
+BEDROCK_MAX_TOKENS = int(os.getenv('BEDROCK_MAX_TOKENS', 4000))
+
+# HTTP connections kept open to Bedrock; one per concurrent chat
+BEDROCK_MAX_CONNECTIONS = int(os.getenv('BEDROCK_MAX_CONNECTIONS', 10))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_bedrock_client():
+    """
+    Get the process-wide bedrock-runtime client
+
+    Built once, so credentials are resolved and TLS connections are pooled
+    across messages (boto3 clients are thread safe).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.client(
+                    service_name='bedrock-runtime',
+                    region_name=os.getenv('AWS_REGION', 'us-east-1'),
+                    config=Config(
+                        max_pool_connections=BEDROCK_MAX_CONNECTIONS,
+                        connect_timeout=5,
+                        read_timeout=120,
+                        retries={'max_attempts': 2, 'mode': 'standard'},
+                        tcp_keepalive=True
+                    )
+                )
+    return _client
+
+
+def claude_request_body(prompt, max_tokens=BEDROCK_MAX_TOKENS, system=None):
+    """
+    Request body for Anthropic Claude models on Bedrock
+    system is the fixed instruction prefix, sent before the prompt
+    """
+    body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "top_k": 250,
+        "stop_sequences": [],
+        "temperature": 1,
+        "top_p": 0.999,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": prompt
+                    }
+                ]
+            }
+        ]
+    }
+    if system:
+        body["system"] = [{"type": "text", "text": system}]
+    return json.dumps(body)
+
+
+def stream_text(response, on_usage=None):
+    """
+    Yield the text deltas of an invoke_model_with_response_stream response
+    on_usage, if given, receives the prompt's token usage from message_start
+    """
+    for event in response.get('body'):
+        chunk = event.get('chunk')
+        if not chunk:
+            continue
+        payload = json.loads(chunk['bytes'])
+        if payload.get('type') == 'message_start' and on_usage:
+            on_usage(payload.get('message', {}).get('usage'))
+        elif payload.get('type') == 'content_block_delta':
+            text = payload.get('delta', {}).get('text')
+            if text:
+                yield text
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.chart_data import CHART_MAX_POINTS, lttb
+from app.history_store import HISTORY_SYNC_INTERVAL
+from app.single_flight import single_flight
+
+# History kept in memory per index; matches the history store's bootstrap,
+# so loading it never downloads more than the store already holds
+BENCHMARK_PERIOD = '10y'
+
+
+def _daily_closes(hist_data):
+    """Close series indexed by tz-naive dates"""
+    closes = hist_data['Close'].dropna()
+    index = closes.index.tz_localize(None) if closes.index.tz is not None else closes.index
+    return pd.Series(closes.to_numpy(dtype=float), index=index.normalize())
+
+
+def relative_performance(stock_history, index_closes, start=None, end=None, max_points=CHART_MAX_POINTS):
+    """
+    Stock and index performance over a window, both rebased to 0% at the
+    window's first day, and the relative strength line (stock / index,
+    rebased to 100). The index is aligned to the stock's trading days,
+    carrying its last close over days only the stock traded.
+
+    Returns:
+        dict: x (dates), stock and index (% change), relative; or None if
+        the window holds no data
+    """
+    stock = _daily_closes(stock_history)
+    if start is not None:
+        stock = stock[stock.index >= pd.Timestamp(start)]
+    if end is not None:
+        stock = stock[stock.index <= pd.Timestamp(end)]
+
+    index = index_closes.reindex(stock.index, method='ffill')
+    aligned = pd.DataFrame({'stock': stock, 'index': index}).dropna()
+    if aligned.empty:
+        return None
+
+    stock_values = aligned['stock'].to_numpy()
+    index_values = aligned['index'].to_numpy()
+    stock_change = (stock_values / stock_values[0] - 1) * 100
+    index_change = (index_values / index_values[0] - 1) * 100
+    relative = (stock_values / index_values) / (stock_values[0] / index_values[0]) * 100
+
+    # One set of points for all three lines, picked on the relative line
+    kept = lttb(aligned.index.asi8 / 1e9, relative, max_points)
+    return {
+        'x': aligned.index[kept].strftime('%Y-%m-%d').tolist(),
+        'stock': np.round(stock_change[kept], 2).tolist(),
+        'index': np.round(index_change[kept], 2).tolist(),
+        'relative': np.round(relative[kept], 2).tolist(),
+    }
+
+
+class BenchmarkSeries:
+    """
+    One in-memory close series per market index, shared by every symbol
+    and session
+
+    Series are read from the history store, which syncs the index
+    incrementally; a series is reloaded from there at most once per
+    HISTORY_SYNC_INTERVAL, and concurrent reloads share one call. Chart
+    overlays therefore cost no upstream requests per view.
+    """
+
+    def __init__(self, loader, refresh_interval=HISTORY_SYNC_INTERVAL):
+        # loader(market, period) returns (history DataFrame or None, index name)
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self._series = {}  # market -> (loaded at, closes, index name)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.loads = 0
+        self.failures = 0
+
+    def get(self, market='US'):
+        """
+        Get (closes, index name) for a market's benchmark; closes is None
+        if the index history is unavailable
+        """
+        with self._lock:
+            entry = self._series.get(market)
+            if entry is not None and time.monotonic() - entry[0] < self.refresh_interval:
+                self.hits += 1
+                return entry[1], entry[2]
+
+        closes, name = single_flight.do(('benchmark', market), lambda: self._load(market))
+        if closes is None and entry is not None:
+            # Keep serving the last good series if a reload fails
+            return entry[1], entry[2]
+        return closes, name
+
+    def _load(self, market):
+        hist_data, name = self.loader(market, BENCHMARK_PERIOD)
+        if hist_data is None or hist_data.empty:
+            with self._lock:
+                self.failures += 1
+            return None, name
+
+        closes = _daily_closes(hist_data)
+        with self._lock:
+            self._series[market] = (time.monotonic(), closes, name)
+            self.loads += 1
+        return closes, name
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'markets': sorted(self._series),
+                'hits': self.hits,
+                'loads': self.loads,
+                'failures': self.failures,
+            }
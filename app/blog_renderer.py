@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+import bleach
+import markdown
+from sqlalchemy import inspect
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+# Posts per page of the blog listing
+BLOG_PAGE_SIZE = int(os.getenv('BLOG_PAGE_SIZE', 20))
+
+# Characters of plain text shown for each post in the listing
+EXCERPT_LENGTH = 200
+
+# Directory holding the precompressed pages of published posts
+BLOG_PAGE_CACHE_DIR = os.getenv('BLOG_PAGE_CACHE_DIR', os.path.join(basedir, 'cache', 'blogs'))
+
+MARKDOWN_EXTENSIONS = ['extra', 'codehilite', 'nl2br', 'tables']
+
+# Sanitization whitelist (prevents XSS in rendered posts)
+ALLOWED_TAGS = [
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'p', 'a', 'abbr', 'acronym', 'b', 'blockquote',
+    'code', 'em', 'i', 'li', 'ol', 'strong', 'ul',
+    'br', 'del', 'ins', 'img', 'pre', 'table', 'tbody',
+    'td', 'th', 'thead', 'tr', 'hr', 'span', 'div'
+]
+
+ALLOWED_ATTRS = {
+    '*': ['class', 'style'],
+    'a': ['href', 'title', 'rel'],
+    'img': ['src', 'alt', 'title', 'width', 'height']
+}
+
+# Changes whenever the rendering pipeline does, so stored HTML from an
+# older configuration no longer matches its content hash
+RENDERER_VERSION = hashlib.sha1(json.dumps([
+    MARKDOWN_EXTENSIONS, ALLOWED_TAGS, ALLOWED_ATTRS, markdown.__version__, bleach.__version__
+], sort_keys=True).encode()).hexdigest()[:12]
+
+
+def content_hash(content):
+    """Hash of a post's Markdown and the renderer version"""
+    return hashlib.sha256(f"{RENDERER_VERSION}\x1f{content}".encode('utf-8')).hexdigest()
+
+
+def render_markdown(content):
+    """Convert Markdown to sanitized HTML"""
+    html_content = markdown.markdown(content, extensions=MARKDOWN_EXTENSIONS)
+    return bleach.clean(
+        html_content,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRS,
+        strip=True
+    )
+
+
+def make_excerpt(rendered_html, length=EXCERPT_LENGTH):
+    """Plain-text start of a rendered post, cut at a word boundary"""
+    text = ' '.join(html.unescape(bleach.clean(rendered_html or '', tags=[], strip=True)).split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0] + '…'
+
+
+def render_blog(blog, force=False):
+    """
+    Store the sanitized HTML and excerpt on a MarkdownBlog if its content
+    hash changed (the caller commits)
+
+    Rendering doesn't edit the post, so a stored post keeps its updated_at
+    (and its place in the listing) unless the caller changed it.
+
+    Returns:
+        bool: whether the post was re-rendered
+    """
+    digest = content_hash(blog.content)
+    if not force and blog.rendered_html is not None and blog.excerpt is not None and blog.content_hash == digest:
+        return False
+    blog.rendered_html = render_markdown(blog.content)
+    blog.excerpt = make_excerpt(blog.rendered_html)
+    blog.content_hash = digest
+    blog.rendered_at = datetime.utcnow()
+
+    state = inspect(blog)
+    if state.persistent and not state.attrs.updated_at.history.has_changes():
+        # Set to itself in SQL, so the column's onupdate doesn't fire
+        blog.updated_at = type(blog).updated_at
+    return True
+
+
+class BlogPageCache:
+    """
+    Precompressed HTML pages of published posts, on disk
+
+    Each page is stored as .html and .html.gz under a key built from the
+    post's content hash and update time, so a web server can also serve
+    the files directly. Writing a new page for a post removes its old ones.
+    """
+
+    def __init__(self, directory=BLOG_PAGE_CACHE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def page_key(blog, year):
+        """Key of a post's page; year is the footer's copyright year"""
+        return f"{blog.id}_{blog.updated_at:%Y%m%d%H%M%S%f}_{blog.content_hash[:16]}_{year}"
+
+    def get(self, key, compressed=True):
+        """Get a stored page as bytes (gzipped or plain), or None"""
+        path = os.path.join(self.directory, f"{key}.html.gz" if compressed else f"{key}.html")
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return body
+
+    def put(self, key, page):
+        """Store a rendered page, compressed once at the highest level"""
+        blog_id = key.split('_', 1)[0]
+        body = page.encode('utf-8')
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for suffix, data in (('.html', body), ('.html.gz', gzip.compress(body, compresslevel=9))):
+                path = os.path.join(self.directory, key + suffix)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self.invalidate(blog_id, keep=key)
+        except OSError as e:
+            print(f"Error writing blog page cache for {key}: {e}")
+
+    def invalidate(self, blog_id, keep=None):
+        """Remove the stored pages of a post (except the one for keep)"""
+        if not os.path.isdir(self.directory):
+            return
+        pattern = re.compile(rf"^{blog_id}_.*\.html(\.gz)?$")
+        for filename in os.listdir(self.directory):
+            if pattern.match(filename) and not (keep and filename.startswith(keep + '.')):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+
+    def clear(self):
+        """Remove every stored page"""
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.endswith(('.html', '.html.gz')):
+                os.remove(os.path.join(self.directory, filename))
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+# Shared page cache for published posts
+blog_pages = BlogPageCache()
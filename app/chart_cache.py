@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+# Directory holding the cached chart JSON files
+CHART_CACHE_DIR = os.getenv('CHART_CACHE_DIR', os.path.join(basedir, 'cache', 'charts'))
+
+
+class ChartCache:
+    """
+    On-disk cache of generated chart JSON
+
+    Entries are keyed by (symbol, market, period, last bar, chart options),
+    so a new daily bar makes a new entry. When the last bar's close changes
+    intraday the old chart is served while a new one is built in the background.
+    """
+
+    def __init__(self, directory=CHART_CACHE_DIR):
+        self.directory = directory
+        self._building = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def get_or_build(self, symbol, market, period, last_bar, last_close, options, builder):
+        """
+        Get the chart JSON for a history ending at last_bar, calling builder() on a miss
+        """
+        prefix = self._prefix(symbol, market, period, options)
+        path = os.path.join(self.directory, f"{prefix}{self._slug(str(last_bar))}.json")
+
+        entry = self._read(path)
+        if entry is not None:
+            if entry.get('last_close') == last_close:
+                with self._lock:
+                    self.hits += 1
+                return entry['chart']
+
+            # Same bar but the close moved - serve the old chart, rebuild it in the background
+            with self._lock:
+                self.stale_hits += 1
+            self._build_in_background(prefix, path, last_close, builder)
+            return entry['chart']
+
+        with self._lock:
+            self.misses += 1
+        chart_json = builder()
+        if chart_json:
+            self._write(prefix, path, last_close, chart_json)
+        return chart_json
+
+    def clear(self):
+        """Remove every cached chart"""
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(self.directory, filename))
+
+    def stats(self):
+        """Get cache counters"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'rebuilds': self.rebuilds,
+            }
+
+    def _prefix(self, symbol, market, period, options):
+        options_hash = hashlib.sha1(json.dumps(options, sort_keys=True).encode()).hexdigest()[:12]
+        return f"{self._slug(symbol)}_{market}_{period}_{options_hash}_"
+
+    @staticmethod
+    def _slug(value):
+        return re.sub(r'[^A-Za-z0-9.-]', '_', value)
+
+    def _read(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable chart cache file {path}: {e}")
+            return None
+
+    def _write(self, prefix, path, last_close, chart_json):
+        """Atomically write an entry and drop older entries for the same chart"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'last_close': last_close, 'chart': chart_json}, f)
+            os.replace(tmp_path, path)
+
+            for filename in os.listdir(self.directory):
+                old_path = os.path.join(self.directory, filename)
+                if filename.startswith(prefix) and filename.endswith('.json') and old_path != path:
+                    os.remove(old_path)
+        except OSError as e:
+            print(f"Error writing chart cache file {path}: {e}")
+
+    def _build_in_background(self, prefix, path, last_close, builder):
+        with self._lock:
+            if path in self._building:
+                return
+            self._building.add(path)
+            self.rebuilds += 1
+
+        def build():
+            try:
+                chart_json = builder()
+                if chart_json:
+                    self._write(prefix, path, last_close, chart_json)
+            except Exception as e:
+                print(f"Background chart rebuild failed for {path}: {e}")
+            finally:
+                with self._lock:
+                    self._building.discard(path)
+
+        threading.Thread(target=build, name='chart-rebuild', daemon=True).start()
+
+
+# Shared chart cache used by StockService
+chart_cache = ChartCache()
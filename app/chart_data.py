@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+# Target number of points for the price line - roughly one per pixel of
+# the chart width in stock_detail.html
+CHART_MAX_POINTS = 1000
+
+# Candles are aggregated once the visible range is wider than these spans
+WEEKLY_CANDLES_AFTER = pd.Timedelta(days=366)
+MONTHLY_CANDLES_AFTER = pd.Timedelta(days=3 * 366)
+
+CANDLE_RULES = {
+    'daily': None,
+    'weekly': 'W-FRI',
+    'monthly': 'ME',
+}
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Picks threshold points of (x, y) that preserve the visual shape of the
+    line (peaks and troughs survive). Returns the indices of the kept points.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    bucket_size = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third corner of the triangle
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+
+    return indices
+
+
+def candle_interval(start, end):
+    """Pick the candle interval ('daily', 'weekly', 'monthly') for a date range"""
+    span = end - start
+    if span > MONTHLY_CANDLES_AFTER:
+        return 'monthly'
+    if span > WEEKLY_CANDLES_AFTER:
+        return 'weekly'
+    return 'daily'
+
+
+def aggregate_ohlc(frame, interval):
+    """Aggregate daily OHLC bars to weekly or monthly bars"""
+    rule = CANDLE_RULES[interval]
+    if rule is None:
+        return frame[['Open', 'High', 'Low', 'Close']]
+
+    bars = frame.resample(rule).agg({
+        'Open': 'first',
+        'High': 'max',
+        'Low': 'min',
+        'Close': 'last',
+    })
+    return bars.dropna(subset=['Close'])
+
+
+def build_chart_series(hist_data, start=None, end=None, max_points=CHART_MAX_POINTS):
+    """
+    Slice history to a date window and reduce it to chart-sized series
+
+    Returns:
+        dict: 'line' with the downsampled close series, 'candles' with OHLC
+        bars at the picked interval, and the 'interval' name; or None if the
+        window holds no data.
+    """
+    frame = hist_data
+    if frame.index.tz is not None:
+        frame = frame.tz_localize(None)
+    if start is not None:
+        frame = frame[frame.index >= pd.Timestamp(start)]
+    if end is not None:
+        frame = frame[frame.index <= pd.Timestamp(end)]
+
+    frame = frame.dropna(subset=['Close'])
+    if frame.empty:
+        return None
+
+    # Shape preserving downsample of the close line
+    x = frame.index.asi8 / 1e9
+    y = frame['Close'].to_numpy(dtype=float)
+    kept = lttb(x, y, max_points)
+    line = frame['Close'].iloc[kept]
+
+    interval = candle_interval(frame.index[0], frame.index[-1])
+    candles = aggregate_ohlc(frame, interval)
+
+    return {
+        'interval': interval,
+        'line': line,
+        'candles': candles,
+    }
+
+
+def series_to_json(series):
+    """Convert build_chart_series output into a JSON friendly dict"""
+    line = series['line']
+    candles = series['candles']
+    return {
+        'interval': series['interval'],
+        'line': {
+            'x': line.index.strftime('%Y-%m-%d').tolist(),
+            'y': line.round(4).tolist(),
+        },
+        'candles': {
+            'x': candles.index.strftime('%Y-%m-%d').tolist(),
+            'open': candles['Open'].round(4).tolist(),
+            'high': candles['High'].round(4).tolist(),
+            'low': candles['Low'].round(4).tolist(),
+            'close': candles['Close'].round(4).tolist(),
+        },
+    }
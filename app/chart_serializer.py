@@ -0,0 +1,139 @@
+import base64
+import json
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objs as go
+import plotly.io as pio
+
+# Plotly.js typed array spec: {"dtype": ..., "bdata": base64 of the raw buffer}
+TYPED_ARRAY_DTYPE = 'f8'
+
+
+def typed_array(values):
+    """Encode a numeric array as a Plotly.js base64 typed array"""
+    array = np.ascontiguousarray(values, dtype='<f8')
+    return {'dtype': TYPED_ARRAY_DTYPE, 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def epoch_ms(index):
+    """Convert a naive DatetimeIndex to epoch milliseconds (Plotly date axes accept these)"""
+    return index.asi8 // 1_000_000
+
+
+@lru_cache(maxsize=1)
+def _template_json():
+    """
+    JSON of plotly.py's default template, serialized once
+
+    fig.to_json() embeds it in every figure; shipping the same template
+    keeps the fast path rendering identically.
+    """
+    return json.dumps(pio.templates[pio.templates.default].to_plotly_json(), separators=(',', ':'))
+
+
+def chart_layout(display_symbol):
+    """Layout shared by the Plotly figure and the fast serializer"""
+    return dict(
+        title=f'5-Year Price History: {display_symbol}',
+        yaxis=dict(
+            title='Price (USD)',
+            tickformat='.2f',
+            hoverformat='.2f',
+            showgrid=True,
+            zeroline=True,
+            zerolinecolor='black',
+            autorange=True
+        ),
+        xaxis=dict(
+            title='Date (2019-2024)',
+            rangeslider=dict(visible=False)
+        ),
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5),
+        height=600,
+        hovermode='x unified'
+    )
+
+
+def plotly_figure_json(series, display_symbol):
+    """
+    Build the price chart as a validated plotly Figure and serialize it
+    This is the reference path the fast serializer must match
+    """
+    line = series['line']
+    candles = series['candles']
+
+    # Create figure
+    fig = go.Figure()
+
+    # Add stock price line - actual price, not normalized
+    fig.add_trace(go.Scatter(
+        x=line.index,
+        y=line,
+        name=display_symbol,
+        line=dict(color='rgb(0, 100, 255)', width=3),
+        mode='lines',
+        hovertemplate='$%{y:.2f}'
+    ))
+
+    # Add candlestick view for more detailed price information
+    fig.add_trace(go.Candlestick(
+        x=candles.index,
+        open=candles['Open'],
+        high=candles['High'],
+        low=candles['Low'],
+        close=candles['Close'],
+        name=f"OHLC ({series['interval']})",
+        visible='legendonly'  # Hidden by default, can be enabled from legend
+    ))
+
+    # Layout settings
+    fig.update_layout(**chart_layout(display_symbol))
+
+    return fig.to_json()
+
+
+def figure_json(series, display_symbol):
+    """
+    Write the price chart figure JSON straight from build_chart_series output
+
+    Skips plotly.graph_objs validation; numeric columns and timestamps are
+    written as typed arrays (timestamps as epoch-ms on a date axis).
+    """
+    line = series['line']
+    candles = series['candles']
+
+    data = [
+        {
+            'type': 'scatter',
+            'mode': 'lines',
+            'name': display_symbol,
+            'x': typed_array(epoch_ms(line.index)),
+            'y': typed_array(line.to_numpy()),
+            'line': {'color': 'rgb(0, 100, 255)', 'width': 3},
+            'hovertemplate': '$%{y:.2f}',
+        },
+        {
+            'type': 'candlestick',
+            'name': f"OHLC ({series['interval']})",
+            'x': typed_array(epoch_ms(candles.index)),
+            'open': typed_array(candles['Open'].to_numpy()),
+            'high': typed_array(candles['High'].to_numpy()),
+            'low': typed_array(candles['Low'].to_numpy()),
+            'close': typed_array(candles['Close'].to_numpy()),
+            'visible': 'legendonly',
+        },
+    ]
+
+    layout = chart_layout(display_symbol)
+    # Numeric x values must be read as dates, not plain numbers
+    layout['xaxis']['type'] = 'date'
+    layout['title'] = {'text': layout['title']}
+    layout['xaxis']['title'] = {'text': layout['xaxis']['title']}
+    layout['yaxis']['title'] = {'text': layout['yaxis']['title']}
+
+    layout_json = json.dumps(layout, separators=(',', ':'))
+    # Splice in the pre-serialized template instead of re-encoding it
+    layout_json = layout_json[:-1] + ',"template":' + _template_json() + '}'
+
+    return '{"data":' + json.dumps(data, separators=(',', ':')) + ',"layout":' + layout_json + '}'
@@ -0,0 +1,146 @@
+import os
+
+from sqlalchemy import func, tuple_
+
+from app.models import Stock
+from app.quote_stream import quote_row
+
+# Rows per page of the dashboard API, and the most a client may ask for
+DASHBOARD_PAGE_SIZE = int(os.getenv('DASHBOARD_PAGE_SIZE', 100))
+DASHBOARD_MAX_PAGE_SIZE = 500
+
+# Portfolios larger than this open in the virtualized table by default
+DASHBOARD_VIRTUAL_THRESHOLD = int(os.getenv('DASHBOARD_VIRTUAL_THRESHOLD', 200))
+
+# Sortable columns; each has an index (see Stock.__table_args__), whose
+# implicit rowid suffix also covers the id tie-break
+SORT_COLUMNS = {
+    'display_order': Stock.display_order,
+    'prospect_return': Stock.prospect_return,
+    'roe': Stock.roe,
+    'change_percent': Stock.change_percent,
+    'ytd_change_percent': Stock.ytd_change_percent,
+    'eps': Stock.eps,
+    'current_price': Stock.current_price,
+}
+
+# Columns accepted in min_<column> / max_<column> threshold filters
+FILTER_COLUMNS = [column for column in SORT_COLUMNS if column != 'display_order']
+
+MARKETS = ('US', 'HK', 'CN')
+
+
+class DashboardQueryError(ValueError):
+    """Invalid sort, filter or cursor"""
+
+
+def dashboard_row(stock):
+    """A Stock row as the dashboard table shows it"""
+    row = quote_row(stock)
+    row.update(
+        id=stock.id,
+        symbol=stock.symbol,
+        name=stock.name,
+        chinese_name=stock.chinese_name,
+        market=stock.market,
+        ytd_change_percent=stock.ytd_change_percent,
+    )
+    return row
+
+
+def parse_filters(args):
+    """
+    Read market and min_<column>/max_<column> thresholds from request args
+
+    Returns:
+        tuple: (market or None, [(column, op, value)])
+    """
+    market = (args.get('market') or '').upper() or None
+    if market is not None and market not in MARKETS:
+        raise DashboardQueryError(f"market must be one of {', '.join(MARKETS)}")
+
+    thresholds = []
+    for column in FILTER_COLUMNS:
+        for op in ('min', 'max'):
+            value = args.get(f"{op}_{column}")
+            if value in (None, ''):
+                continue
+            try:
+                thresholds.append((column, op, float(value)))
+            except ValueError:
+                raise DashboardQueryError(f"{op}_{column} must be a number")
+    return market, thresholds
+
+
+def _cursor(value, stock_id):
+    """Cursor after a row: '<sort value>_<id>', 'null_<id>' in the NULLs tail"""
+    return f"{'null' if value is None else repr(value)}_{stock_id}"
+
+
+def _parse_cursor(after, column):
+    try:
+        value, stock_id = after.rsplit('_', 1)
+        stock_id = int(stock_id)
+        if value == 'null':
+            return None, stock_id
+        return (int(value) if column == 'display_order' else float(value)), stock_id
+    except ValueError:
+        raise DashboardQueryError("Invalid cursor")
+
+
+def dashboard_page(sort='display_order', direction='asc', market=None, thresholds=(),
+                   after=None, limit=DASHBOARD_PAGE_SIZE):
+    """
+    One page of the dashboard table, sorted on a column with keyset pagination
+
+    Stocks with no value for the sort column come last in either
+    direction, ordered by id. The page is read in two index-ordered
+    phases, the non-NULL values then the NULL tail, so neither needs a sort.
+
+    Returns:
+        dict: stocks (rows), next (cursor for the following page or None)
+        and, on the first page only, total (rows matching the filters)
+    """
+    column = SORT_COLUMNS.get(sort)
+    if column is None:
+        raise DashboardQueryError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+    if direction not in ('asc', 'desc'):
+        raise DashboardQueryError("dir must be 'asc' or 'desc'")
+    limit = max(1, min(limit, DASHBOARD_MAX_PAGE_SIZE))
+
+    query = Stock.query
+    if market:
+        query = query.filter(Stock.market == market)
+    for name, op, value in thresholds:
+        query = query.filter(SORT_COLUMNS[name] >= value if op == 'min' else SORT_COLUMNS[name] <= value)
+
+    descending = direction == 'desc'
+    cursor_value, cursor_id = _parse_cursor(after, sort) if after else (None, None)
+    in_null_tail = after is not None and cursor_value is None
+
+    stocks = []
+    if not in_null_tail:
+        values = query.filter(column.isnot(None))
+        if after is not None:
+            key = tuple_(column, Stock.id)
+            values = values.filter(key < (cursor_value, cursor_id) if descending else key > (cursor_value, cursor_id))
+        order = (column.desc(), Stock.id.desc()) if descending else (column, Stock.id)
+        stocks = values.order_by(*order).limit(limit + 1).all()
+
+    if len(stocks) <= limit:
+        nulls = query.filter(column.is_(None))
+        if in_null_tail:
+            nulls = nulls.filter(Stock.id < cursor_id if descending else Stock.id > cursor_id)
+        nulls = nulls.order_by(Stock.id.desc() if descending else Stock.id)
+        stocks += nulls.limit(limit + 1 - len(stocks)).all()
+
+    next_cursor = None
+    if len(stocks) > limit:
+        stocks = stocks[:limit]
+        last = stocks[-1]
+        next_cursor = _cursor(getattr(last, sort), last.id)
+
+    page = {'stocks': [dashboard_row(stock) for stock in stocks], 'next': next_cursor}
+    if after is None:
+        page['total'] = query.with_entities(func.count(Stock.id)).scalar()
+    return page
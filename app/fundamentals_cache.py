@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from datetime import datetime, date, timedelta
+
+import pandas as pd
+from sqlalchemy import delete
+
+from app import db
+from app.models import BalanceSheetQuarter, FundamentalsSync
+
+BALANCE_SHEET_FIELDS = [
+    'total_assets', 'total_liabilities', 'equity', 'cash', 'debt',
+    'current_assets', 'current_liabilities', 'inventory',
+    'accounts_receivable', 'accounts_payable',
+]
+RATIO_FIELDS = ['current_ratio', 'debt_equity_ratio', 'cash_ratio']
+
+# Months between reporting periods - HK issuers report half-yearly
+REPORT_PERIOD_MONTHS = {'US': 3, 'HK': 6, 'CN': 3}
+
+# Days after a period ends before its statement is usually published
+REPORTING_LAG_DAYS = {'US': 45, 'HK': 90, 'CN': 60}
+
+# Once a report is due, how often to check until it shows up upstream
+FUNDAMENTALS_RETRY_INTERVAL = float(os.getenv('FUNDAMENTALS_RETRY_INTERVAL', 24 * 3600))
+
+# Seconds before retrying a fetch that failed or came back empty; doubles
+# with each further failure, up to FUNDAMENTALS_RETRY_INTERVAL
+FUNDAMENTALS_FAILURE_BACKOFF = float(os.getenv('FUNDAMENTALS_FAILURE_BACKOFF', 300))
+
+
+def next_report_due(quarter_date, market='US'):
+    """Estimate when the statement after quarter_date becomes available"""
+    period_end = (pd.Timestamp(quarter_date) + pd.DateOffset(months=REPORT_PERIOD_MONTHS.get(market, 3))).date()
+    return period_end + timedelta(days=REPORTING_LAG_DAYS.get(market, 45))
+
+
+class FundamentalsCache:
+    """
+    Persistent cache of quarterly balance sheets and their derived ratios
+
+    A symbol is only re-fetched once its next report is expected (and then at
+    most once per FUNDAMENTALS_RETRY_INTERVAL until it arrives), or when a
+    refresh is requested explicitly. A fetch that fails or returns nothing
+    is not recorded as a check; it is retried after a short backoff.
+    """
+
+    def __init__(self, fetcher, failure_backoff=FUNDAMENTALS_FAILURE_BACKOFF):
+        # fetcher(symbol, market, **fetch_kwargs) returns a list of quarter dicts, most recent first
+        self.fetcher = fetcher
+        self.failure_backoff = failure_backoff
+        self._failures = {}  # (symbol, market) -> (consecutive failures, retry at)
+        self._lock = threading.Lock()
+
+    def get_latest(self, symbol, market='US', refresh=False, **fetch_kwargs):
+        """Get the latest quarter, fetching first only if a new report is due"""
+        sync = db.session.get(FundamentalsSync, (symbol, market))
+        if refresh or (self._due(sync) and not self._backing_off(symbol, market)):
+            self._refresh(symbol, market, sync, fetch_kwargs)
+        return self.latest(symbol, market)
+
+    def latest(self, symbol, market='US'):
+        """Read the latest stored quarter without touching the network"""
+        quarter = BalanceSheetQuarter.query.filter_by(symbol=symbol, market=market) \
+            .order_by(BalanceSheetQuarter.quarter_date.desc()).first()
+        if quarter is None:
+            return None
+
+        # Line items the statement didn't report stay None
+        data = {'quarter_date': quarter.quarter_date.strftime('%Y-%m-%d')}
+        for field in BALANCE_SHEET_FIELDS + RATIO_FIELDS:
+            data[field] = getattr(quarter, field)
+        return data
+
+    def _due(self, sync):
+        if sync is None or sync.last_checked is None:
+            return True
+        if sync.next_report_due is not None and date.today() < sync.next_report_due:
+            return False
+        return (datetime.utcnow() - sync.last_checked).total_seconds() >= FUNDAMENTALS_RETRY_INTERVAL
+
+    def _backing_off(self, symbol, market):
+        with self._lock:
+            failure = self._failures.get((symbol, market))
+        return failure is not None and time.monotonic() < failure[1]
+
+    def _record_failure(self, symbol, market):
+        with self._lock:
+            count = self._failures.get((symbol, market), (0, None))[0] + 1
+            delay = min(self.failure_backoff * 2 ** (count - 1), FUNDAMENTALS_RETRY_INTERVAL)
+            self._failures[(symbol, market)] = (count, time.monotonic() + delay)
+        print(f"No fundamentals for {symbol} ({market}), retrying in {delay:.0f}s")
+
+    def _refresh(self, symbol, market, sync, fetch_kwargs):
+        print(f"Refreshing fundamentals for {symbol} ({market})")
+        quarters = self.fetcher(symbol, market, **fetch_kwargs)
+
+        if not quarters:
+            # Failed or empty - keep the last successful check and retry soon
+            self._record_failure(symbol, market)
+            return
+        with self._lock:
+            self._failures.pop((symbol, market), None)
+
+        if sync is None:
+            sync = FundamentalsSync(symbol=symbol, market=market)
+            db.session.add(sync)
+
+        quarter_dates = [datetime.strptime(q['quarter_date'], '%Y-%m-%d').date() for q in quarters]
+        db.session.execute(delete(BalanceSheetQuarter).where(
+            BalanceSheetQuarter.symbol == symbol,
+            BalanceSheetQuarter.market == market,
+            BalanceSheetQuarter.quarter_date.in_(quarter_dates)
+        ))
+
+        now = datetime.utcnow()
+        for quarter, quarter_date in zip(quarters, quarter_dates):
+            db.session.add(BalanceSheetQuarter(
+                symbol=symbol, market=market, quarter_date=quarter_date, fetched_at=now,
+                **{field: quarter.get(field) for field in BALANCE_SHEET_FIELDS + RATIO_FIELDS}
+            ))
+
+        sync.latest_quarter = max(quarter_dates + ([sync.latest_quarter] if sync.latest_quarter else []))
+
+        # Nothing new yet - keep checking once per retry interval
+        sync.next_report_due = next_report_due(sync.latest_quarter, market)
+        sync.last_checked = now
+        db.session.commit()
@@ -0,0 +1,257 @@
+import os
+from datetime import datetime, date, timedelta
+
+import pandas as pd
+from sqlalchemy import select, delete, func
+
+from app import db
+from app.models import PriceBar, PriceHistorySync
+
+# Period downloaded the first time a symbol is requested, so later
+# requests for shorter periods are answered locally
+HISTORY_BOOTSTRAP_PERIOD = '10y'
+
+# Seconds between incremental syncs of the same symbol
+HISTORY_SYNC_INTERVAL = float(os.getenv('HISTORY_SYNC_INTERVAL', 900))
+
+# Calendar days of already stored bars re-fetched on every sync; if their
+# prices changed, a split or dividend re-adjusted the history
+HISTORY_OVERLAP_DAYS = 10
+
+# Relative price difference treated as a re-adjustment
+ADJUSTMENT_TOLERANCE = 1e-4
+
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=5),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+# yfinance column -> PriceBar column
+BAR_COLUMNS = {
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Close': 'close',
+    'Volume': 'volume',
+    'Dividends': 'dividends',
+    'Stock Splits': 'stock_splits',
+}
+
+
+def sync_due(sync, start=None, now=None):
+    """
+    Check whether a symbol's stored history (its PriceHistorySync row, or
+    None) must be synced before answering a request starting at start
+    """
+    if sync is None or sync.last_synced is None:
+        return True
+    if sync.first_date is not None and not sync.full_history and (start is None or start < sync.first_date):
+        return True
+    # Symbols whose last download came back empty are retried at the sync interval too
+    now = now or datetime.utcnow()
+    return (now - sync.last_synced).total_seconds() >= HISTORY_SYNC_INTERVAL
+
+
+def period_start(period, today=None):
+    """
+    Get the first date covered by a yfinance style period ('5y', 'ytd', ...)
+    Returns None for 'max'
+    """
+    today = today or date.today()
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return date(today.year, 1, 1)
+    offset = PERIOD_OFFSETS.get(period)
+    if offset is None:
+        raise ValueError(f"Unsupported history period: {period}")
+    return (pd.Timestamp(today) - offset).date()
+
+
+class HistoryStore:
+    """
+    Local daily OHLCV store keyed by (symbol, market)
+
+    The first request downloads HISTORY_BOOTSTRAP_PERIOD of bars; later
+    requests only download the bars added since the last stored date and
+    answer any period by slicing the local table.
+    """
+
+    def __init__(self, fetcher):
+        # fetcher(symbol, market, **history_kwargs) returns a yfinance history DataFrame
+        self.fetcher = fetcher
+
+    def get_history(self, symbol, market='US', period='5y', **fetch_kwargs):
+        """
+        Get daily history for a period, syncing the local store first if needed
+        Returns a DataFrame shaped like yfinance's Ticker.history(), or None
+        fetch_kwargs are passed through to the fetcher
+        """
+        start = period_start(period)
+        sync = db.session.get(PriceHistorySync, (symbol, market))
+
+        if sync_due(sync, start):
+            if sync is None or sync.first_date is None or (
+                    not sync.full_history and (start is None or start < sync.first_date)):
+                self._bootstrap(symbol, market, start, fetch_kwargs)
+            else:
+                self._sync(symbol, market, sync, fetch_kwargs)
+
+        return self.load(symbol, market, start)
+
+    def load(self, symbol, market='US', start=None, end=None):
+        """
+        Read stored bars without touching the network
+        Returns a DataFrame indexed by date, or None if nothing is stored
+        """
+        query = select(
+            PriceBar.date, PriceBar.open, PriceBar.high, PriceBar.low, PriceBar.close,
+            PriceBar.volume, PriceBar.dividends, PriceBar.stock_splits
+        ).where(PriceBar.symbol == symbol, PriceBar.market == market)
+        if start is not None:
+            query = query.where(PriceBar.date >= start)
+        if end is not None:
+            query = query.where(PriceBar.date <= end)
+        query = query.order_by(PriceBar.date)
+
+        frame = pd.read_sql(query, db.session.connection())
+        if frame.empty:
+            return None
+
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop('date')), name='Date')
+        return frame.rename(columns={column: name for name, column in BAR_COLUMNS.items()})
+
+    def last_bar_date(self, symbol, market='US'):
+        """Get the date of the latest stored bar without touching the network"""
+        sync = db.session.get(PriceHistorySync, (symbol, market))
+        return sync.last_date if sync else None
+
+    def _bootstrap(self, symbol, market, start, fetch_kwargs):
+        """Download a full range of history and replace whatever is stored"""
+        bootstrap_start = period_start(HISTORY_BOOTSTRAP_PERIOD)
+        fetch_period = HISTORY_BOOTSTRAP_PERIOD if start is not None and start >= bootstrap_start else 'max'
+
+        print(f"Bootstrapping {fetch_period} history for {symbol} ({market})")
+        bars = self.fetcher(symbol, market, period=fetch_period, **fetch_kwargs)
+        if bars is None or bars.empty:
+            # Record the attempt, so the symbol isn't downloaded again on every view
+            self._save_sync(symbol, market)
+            return
+
+        # Listed after the bootstrap window started, so we hold everything there is
+        first_date = bars.index[0].date()
+        full_history = fetch_period == 'max' or first_date > bootstrap_start + timedelta(days=7)
+
+        self._write(symbol, market, bars)
+        self._save_sync(symbol, market, full_history=full_history, rewrite=True)
+
+    def _sync(self, symbol, market, sync, fetch_kwargs):
+        """Download the bars missing since the last stored date"""
+        fetch_from = sync.last_date - timedelta(days=HISTORY_OVERLAP_DAYS)
+        bars = self.fetcher(symbol, market, start=fetch_from.isoformat(), **fetch_kwargs)
+
+        if bars is None or bars.empty:
+            sync.last_synced = datetime.utcnow()
+            db.session.commit()
+            return
+
+        if self._readjusted(symbol, market, bars, sync.last_date):
+            # A split or dividend changed past prices - rewrite the stored range
+            print(f"History of {symbol} ({market}) was re-adjusted, rewriting stored range")
+            if sync.full_history:
+                bars = self.fetcher(symbol, market, period='max', **fetch_kwargs)
+            else:
+                bars = self.fetcher(symbol, market, start=sync.first_date.isoformat(), **fetch_kwargs)
+            if bars is None or bars.empty:
+                sync.last_synced = datetime.utcnow()
+                db.session.commit()
+                return
+            self._write(symbol, market, bars)
+            self._save_sync(symbol, market, full_history=sync.full_history, rewrite=True)
+            return
+
+        self._write(symbol, market, bars, from_date=bars.index[0].date())
+        self._save_sync(symbol, market, full_history=sync.full_history)
+
+    def _readjusted(self, symbol, market, bars, last_date):
+        """
+        Check whether freshly downloaded bars disagree with the stored ones
+
+        Only bars before the last stored date are compared: the last one is
+        usually today's intraday bar, which moves without any re-adjustment
+        and is simply overwritten.
+        """
+        dates = bars.index.date
+        stored = self.load(symbol, market, start=dates[0], end=last_date)
+
+        # New split/dividend events from the last stored bar on re-adjust earlier prices
+        trailing = bars[dates >= last_date]
+        for name in ('Dividends', 'Stock Splits'):
+            if name not in trailing.columns:
+                continue
+            events = trailing[name].fillna(0)
+            if stored is not None and pd.Timestamp(last_date) in stored.index:
+                known = stored[name].fillna(0).loc[pd.Timestamp(last_date)]
+                events = events[(events != 0) & ((trailing.index.date > last_date) | (events != known))]
+            else:
+                events = events[events != 0]
+            if not events.empty:
+                return True
+
+        if stored is None:
+            return False
+
+        fetched_close = pd.Series(bars['Close'].values, index=pd.DatetimeIndex(dates))
+        settled = stored['Close'][stored.index.date < last_date]
+        overlap = settled.index.intersection(fetched_close.index)
+        if overlap.empty:
+            return False
+
+        old = settled.loc[overlap]
+        new = fetched_close.loc[overlap]
+        return bool(((new - old).abs() > old.abs() * ADJUSTMENT_TOLERANCE).any())
+
+    def _write(self, symbol, market, bars, from_date=None):
+        """Replace stored bars from from_date onwards (or all bars) with bars"""
+        stmt = delete(PriceBar).where(PriceBar.symbol == symbol, PriceBar.market == market)
+        if from_date is not None:
+            stmt = stmt.where(PriceBar.date >= from_date)
+        db.session.execute(stmt)
+
+        frame = bars[[name for name in BAR_COLUMNS if name in bars.columns]].rename(columns=BAR_COLUMNS)
+        frame = frame.astype(float).astype(object).where(frame.notna(), None)
+        rows = frame.to_dict('records')
+        for row, bar_date in zip(rows, bars.index.date):
+            row.update(symbol=symbol, market=market, date=bar_date)
+
+        if rows:
+            db.session.execute(PriceBar.__table__.insert(), rows)
+
+    def _save_sync(self, symbol, market, full_history=False, rewrite=False):
+        """Record the stored date range and commit the written bars"""
+        first_date, last_date = db.session.execute(
+            select(func.min(PriceBar.date), func.max(PriceBar.date))
+            .where(PriceBar.symbol == symbol, PriceBar.market == market)
+        ).one()
+
+        sync = db.session.get(PriceHistorySync, (symbol, market))
+        if sync is None:
+            sync = PriceHistorySync(symbol=symbol, market=market)
+            db.session.add(sync)
+
+        now = datetime.utcnow()
+        sync.first_date = first_date
+        sync.last_date = last_date
+        sync.full_history = full_history
+        sync.last_synced = now
+        if rewrite:
+            sync.last_rewrite = now
+
+        db.session.commit()
@@ -0,0 +1,119 @@
+import math
+import os
+import re
+import threading
+
+# Tokens the stock context may add to a chatbot prompt
+INSIGHTS_CONTEXT_TOKENS = int(os.getenv('INSIGHTS_CONTEXT_TOKENS', 300))
+
+# Fixed instructions, sent as the system prompt; anything per-request
+# goes in the user prompt after them
+INSIGHTS_SYSTEM_PROMPT = """You are a helpful assistant focused on financial topics and markets. Your name is ValueBot.
+
+Use the language which the user input, and provide a helpful, accurate, and concise response.
+When stock data is provided, base figures on it rather than on memory and say which figures you used.
+If you don't have specific information to answer the question, acknowledge that limitation.
+Format your response with clean line breaks and bullet points where appropriate.
+"""
+
+_CJK = re.compile(r'[　-ヿ㐀-鿿가-힯＀-￯]')
+_PIECES = re.compile(r'[A-Za-z]+|\d+|[^\sA-Za-z\d]')
+
+
+def count_tokens(text):
+    """
+    Estimate the Claude token count of text
+
+    Errs on the high side: CJK characters and punctuation count one token
+    each, words and numbers one per four characters. Compare with the
+    measured counts in PromptStats to check the estimate.
+    """
+    if not text:
+        return 0
+    tokens = len(_CJK.findall(text))
+    for piece in _PIECES.findall(_CJK.sub(' ', text)):
+        tokens += math.ceil(len(piece) / 4)
+    return tokens
+
+
+def fit_to_budget(lines, budget=INSIGHTS_CONTEXT_TOKENS):
+    """Keep lines in order (most important first) while they fit in budget tokens"""
+    kept = []
+    used = 0
+    for line in lines:
+        cost = count_tokens(line) + 1  # the line break
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return kept
+
+
+def build_user_prompt(user_message, context_lines=None):
+    """The per-request part of the prompt: optional stock data, then the question"""
+    parts = []
+    if context_lines:
+        parts.append("Stock data from the user's portfolio:\n" + '\n'.join(context_lines))
+    parts.append(f'The user has asked: "{user_message}"')
+    return '\n\n'.join(parts)
+
+
+class PromptStats:
+    """
+    Estimated vs. measured prompt sizes, to check the context budget
+
+    Estimates are recorded for every prompt built; measured input tokens
+    come from Bedrock's usage report.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.estimated_tokens = 0
+        self.max_estimated = 0
+        self.context_tokens = 0
+        self.max_context = 0
+        self.over_budget = 0
+        self.measured = 0
+        self.input_tokens = 0
+        self.max_input = 0
+
+    def record_prompt(self, prompt_tokens, context_tokens, budget=INSIGHTS_CONTEXT_TOKENS):
+        with self._lock:
+            self.prompts += 1
+            self.estimated_tokens += prompt_tokens
+            self.max_estimated = max(self.max_estimated, prompt_tokens)
+            self.context_tokens += context_tokens
+            self.max_context = max(self.max_context, context_tokens)
+            if context_tokens > budget:
+                self.over_budget += 1
+
+    def record_usage(self, usage):
+        """Record a Claude 'usage' object (input_tokens)"""
+        if not usage:
+            return
+        with self._lock:
+            total = usage.get('input_tokens') or 0
+            self.measured += 1
+            self.input_tokens += total
+            self.max_input = max(self.max_input, total)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'context_budget': INSIGHTS_CONTEXT_TOKENS,
+                'system_prompt_tokens': count_tokens(INSIGHTS_SYSTEM_PROMPT),
+                'prompts': self.prompts,
+                'avg_estimated_tokens': round(self.estimated_tokens / self.prompts, 1) if self.prompts else None,
+                'max_estimated_tokens': self.max_estimated,
+                'avg_context_tokens': round(self.context_tokens / self.prompts, 1) if self.prompts else None,
+                'max_context_tokens': self.max_context,
+                'over_budget': self.over_budget,
+                'measured': self.measured,
+                'avg_input_tokens': round(self.input_tokens / self.measured, 1) if self.measured else None,
+                'max_input_tokens': self.max_input,
+            }
+
+
+# Shared prompt size counters
+prompt_stats = PromptStats()
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+
+from app import app, db
+from app.models import LLMResponse
+
+# Seconds a cached reply is served
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', 24 * 3600))
+
+# Least recently used replies are evicted beyond either cap
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 1000))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', 20 * 1024 * 1024))
+
+_PUNCTUATION = re.compile(r"[?!.,;:'\"“”‘’。？！，；：、]")
+
+
+def normalize_prompt(prompt):
+    """Lowercase, drop punctuation and collapse whitespace, so trivially different asks match"""
+    return ' '.join(_PUNCTUATION.sub(' ', prompt.lower()).split())
+
+
+def cache_key(prompt, model_id, data_version=None):
+    raw = '\x1f'.join([model_id, data_version or '', normalize_prompt(prompt)])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed cache of chatbot replies
+
+    Keys combine the normalized prompt, the model ID and a data version (e.g.
+    the symbol and quote date the answer was based on), so a reply is only
+    reused while the data behind it is unchanged. Entries expire after the
+    TTL and the least recently used ones are evicted past the entry and size
+    caps. Safe to call outside a request; each call uses its own app context.
+    """
+
+    def __init__(self, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, prompt, model_id, data_version=None):
+        """Get a cached reply, or None (also when the cache can't be read)"""
+        try:
+            return self._get(prompt, model_id, data_version)
+        except Exception as e:
+            print(f"Error reading LLM response cache: {e}")
+            return None
+
+    def _get(self, prompt, model_id, data_version):
+        key = cache_key(prompt, model_id, data_version)
+        with app.app_context():
+            entry = db.session.get(LLMResponse, key)
+            now = datetime.utcnow()
+            if entry is not None and (now - entry.created_at).total_seconds() > self.ttl:
+                db.session.delete(entry)
+                db.session.commit()
+                entry = None
+
+            if entry is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_used_at = now
+            response = entry.response
+            db.session.commit()
+
+        with self._lock:
+            self.hits += 1
+        return response
+
+    def put(self, prompt, model_id, response, data_version=None):
+        """Store a reply, then evict past the caps"""
+        if not response:
+            return
+        try:
+            self._put(prompt, model_id, response, data_version)
+        except Exception as e:
+            print(f"Error writing LLM response cache: {e}")
+
+    def _put(self, prompt, model_id, response, data_version):
+        key = cache_key(prompt, model_id, data_version)
+        normalized = normalize_prompt(prompt)
+        now = datetime.utcnow()
+
+        with app.app_context():
+            entry = db.session.get(LLMResponse, key) or LLMResponse(key=key)
+            entry.model_id = model_id
+            entry.data_version = data_version
+            entry.prompt = normalized
+            entry.response = response
+            entry.size = len(normalized.encode('utf-8')) + len(response.encode('utf-8'))
+            entry.hits = entry.hits or 0
+            entry.created_at = now
+            entry.last_used_at = now
+            db.session.add(entry)
+            db.session.commit()
+            self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones beyond the caps"""
+        expired_before = datetime.utcnow() - timedelta(seconds=self.ttl)
+        removed = db.session.execute(delete(LLMResponse).where(LLMResponse.created_at < expired_before)).rowcount
+
+        rows = db.session.execute(
+            select(LLMResponse.key, LLMResponse.size).order_by(LLMResponse.last_used_at.desc())
+        ).all()
+        kept_bytes = 0
+        evict = []
+        for index, (key, size) in enumerate(rows):
+            kept_bytes += size
+            if index >= self.max_entries or kept_bytes > self.max_bytes:
+                evict.append(key)
+        if evict:
+            db.session.execute(delete(LLMResponse).where(LLMResponse.key.in_(evict)))
+        db.session.commit()
+
+        with self._lock:
+            self.evictions += removed + len(evict)
+
+    def purge(self, model_id=None, older_than=None):
+        """
+        Delete cached replies, optionally only for one model or older than a number of seconds
+
+        Returns:
+            int: number of entries deleted
+        """
+        query = delete(LLMResponse)
+        if model_id:
+            query = query.where(LLMResponse.model_id == model_id)
+        if older_than is not None:
+            query = query.where(LLMResponse.created_at < datetime.utcnow() - timedelta(seconds=older_than))
+
+        with app.app_context():
+            purged = db.session.execute(query).rowcount
+            db.session.commit()
+        print(f"Purged {purged} cached LLM responses")
+        return purged
+
+    def stats(self):
+        with app.app_context():
+            entries, total_bytes = db.session.execute(
+                select(func.count(LLMResponse.key), func.coalesce(func.sum(LLMResponse.size), 0))
+            ).one()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'bytes': total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
+
+
+# Shared chatbot response cache
+llm_cache = LLMCache()
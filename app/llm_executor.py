@@ -0,0 +1,186 @@
+import math
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Bedrock calls running at once; the rest wait in a bounded queue
+LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', 4))
+LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', 8))
+
+# Seconds a non-streaming chatbot request may take in total, queueing included
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', 60))
+
+# Streamed replies can run long, so they have no total deadline: the first
+# chunk must arrive within LLM_FIRST_TOKEN_TIMEOUT (queueing included) and
+# each later one within LLM_STREAM_IDLE_TIMEOUT of the previous
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv('LLM_FIRST_TOKEN_TIMEOUT', LLM_REQUEST_TIMEOUT))
+LLM_STREAM_IDLE_TIMEOUT = float(os.getenv('LLM_STREAM_IDLE_TIMEOUT', 30))
+
+_END = object()
+
+
+class LLMBusy(Exception):
+    """The LLM queue is full; retry after retry_after seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMTimeout(Exception):
+    """An LLM request did not finish within its timeout"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMExecutor:
+    """
+    Dedicated, bounded pool for LLM calls
+
+    At most max_in_flight calls run at once and max_queue more may wait;
+    beyond that submissions fail fast with LLMBusy, so a burst of chatbot
+    messages can't tie up the threads serving quotes and pages.
+    """
+
+    def __init__(self, max_in_flight=LLM_MAX_IN_FLIGHT, max_queue=LLM_MAX_QUEUE, timeout=LLM_REQUEST_TIMEOUT,
+                 first_token_timeout=LLM_FIRST_TOKEN_TIMEOUT, idle_timeout=LLM_STREAM_IDLE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.first_token_timeout = first_token_timeout
+        self.idle_timeout = idle_timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='llm')
+        self._lock = threading.Lock()
+        self._pending = 0  # running + queued
+        self._avg_duration = 10.0  # seconds, moving average of finished calls
+
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def retry_after(self):
+        """Seconds until a slot is likely to free up"""
+        with self._lock:
+            waves = max(self._pending - self.max_in_flight + 1, 1) / self.max_in_flight
+            return max(1, math.ceil(waves * self._avg_duration))
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn for the LLM pool, or raise LLMBusy if the queue is full"""
+        with self._lock:
+            if self._pending >= self.max_in_flight + self.max_queue:
+                self.rejected += 1
+                busy = True
+            else:
+                self._pending += 1
+                busy = False
+        if busy:
+            raise LLMBusy("The chatbot is busy, please try again shortly", self.retry_after())
+
+        def run():
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.completed += 1
+                    self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.monotonic() - started)
+
+        future = self._executor.submit(run)
+        # Also fires when a queued call is cancelled before it ran
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def call(self, fn, *args, timeout=None, **kwargs):
+        """Run fn on the LLM pool and wait for its result"""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeout:
+            # Drops it if it never started; a running call finishes in the background
+            future.cancel()
+            self._timed_out()
+            raise LLMTimeout("The chatbot took too long to respond", self.retry_after())
+
+    def stream(self, make_stream, *args, first_token_timeout=None, idle_timeout=None, **kwargs):
+        """
+        Run a chunk generator on the LLM pool and relay its chunks
+
+        Raises LLMBusy immediately if the queue is full. The returned iterator
+        raises LLMTimeout if the first chunk takes longer than
+        first_token_timeout or any later one longer than idle_timeout after
+        the previous; closing it early stops the producer at its next chunk.
+        """
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            if cancelled.is_set():
+                return
+            stream = make_stream(*args, **kwargs)
+            try:
+                for chunk in stream:
+                    if cancelled.is_set():
+                        break
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                # Stops e.g. the Bedrock event stream if the client went away
+                close = getattr(stream, 'close', None)
+                if close:
+                    close()
+                chunks.put(_END)
+
+        future = self.submit(produce)
+        wait = first_token_timeout or self.first_token_timeout
+        idle = idle_timeout or self.idle_timeout
+
+        def relay():
+            nonlocal wait
+            try:
+                while True:
+                    try:
+                        chunk = chunks.get(timeout=wait)
+                    except queue.Empty:
+                        future.cancel()
+                        self._timed_out()
+                        raise LLMTimeout("The chatbot took too long to respond", self.retry_after())
+                    if chunk is _END:
+                        return
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    wait = idle
+                    yield chunk
+            finally:
+                cancelled.set()
+
+        return relay()
+
+    def _timed_out(self):
+        with self._lock:
+            self.timed_out += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'pending': self._pending,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_duration': round(self._avg_duration, 2),
+            }
+
+
+# Shared pool for every Bedrock call
+llm_executor = LLMExecutor()
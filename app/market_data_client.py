@@ -0,0 +1,298 @@
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import pandas as pd
+
+try:
+    import aiohttp
+except ImportError:  # Optional: without aiohttp StockService falls back to yfinance
+    aiohttp = None
+
+# 'yfinance' (default) uses the blocking yfinance fetchers; 'async' opts in
+# to this client when aiohttp is installed
+MARKET_DATA_BACKEND = os.getenv('MARKET_DATA_BACKEND', 'yfinance')
+
+# Connection pool limits; Yahoo throttles bursts from one client hard
+MARKET_DATA_MAX_CONNECTIONS = int(os.getenv('MARKET_DATA_MAX_CONNECTIONS', 32))
+MARKET_DATA_PER_HOST = int(os.getenv('MARKET_DATA_PER_HOST', 8))
+MARKET_DATA_TIMEOUT = float(os.getenv('MARKET_DATA_TIMEOUT', 10))
+
+YAHOO_QUERY_URL = 'https://query2.finance.yahoo.com'
+YAHOO_COOKIE_URL = 'https://fc.yahoo.com'
+YAHOO_CRUMB_URL = 'https://query1.finance.yahoo.com/v1/test/getcrumb'
+
+# Yahoo rejects requests without a browser-like user agent
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/124.0 Safari/537.36')
+
+# quoteSummary modules that together cover the fields of yf.Ticker.info we use
+QUOTE_MODULES = 'price,summaryDetail,defaultKeyStatistics,financialData'
+
+# Yahoo fundamentals-timeseries types -> yf.Ticker.quarterly_balance_sheet rows
+BALANCE_SHEET_TYPES = {
+    'quarterlyTotalAssets': 'Total Assets',
+    'quarterlyTotalLiabilitiesNetMinorityInterest': 'Total Liabilities Net Minority Interest',
+    'quarterlyTotalEquityGrossMinorityInterest': 'Total Equity Gross Minority Interest',
+    'quarterlyCashAndCashEquivalents': 'Cash And Cash Equivalents',
+    'quarterlyTotalDebt': 'Total Debt',
+    'quarterlyCurrentAssets': 'Total Current Assets',
+    'quarterlyCurrentLiabilities': 'Total Current Liabilities',
+    'quarterlyInventory': 'Inventory',
+    'quarterlyAccountsReceivable': 'Accounts Receivable',
+    'quarterlyAccountsPayable': 'Accounts Payable',
+}
+
+
+class MarketDataError(Exception):
+    """Upstream market data request failed"""
+
+
+class MarketDataClient:
+    """
+    Asyncio Yahoo Finance client on one pooled aiohttp session
+
+    The session lives on a dedicated event loop thread, so connections (and
+    the per-host limits) are shared by every caller: async views await the
+    coroutines directly, sync code uses run(). Results are shaped like the
+    yfinance objects StockService already consumes.
+    """
+
+    def __init__(self, max_connections=MARKET_DATA_MAX_CONNECTIONS,
+                 per_host=MARKET_DATA_PER_HOST, timeout=MARKET_DATA_TIMEOUT):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+
+        self._loop = None
+        self._session = None
+        self._crumb = None
+        self._crumb_lock = None
+        self._start_lock = threading.Lock()
+
+        self.requests = Counter()  # per host
+        self.errors = Counter()
+        self.in_flight = 0
+
+    @property
+    def enabled(self):
+        """Whether StockService should use this client instead of yfinance"""
+        return aiohttp is not None and MARKET_DATA_BACKEND == 'async'
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='market-data', daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def run(self, coro, timeout=None):
+        """Run a client coroutine from sync code and wait for its result"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        return future.result(timeout)
+
+    async def _on_loop(self, coro):
+        """Await coro on the client loop, wherever the caller's loop is"""
+        loop = self._ensure_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    limit_per_host=self.per_host,
+                    ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT}
+            )
+            self._crumb_lock = asyncio.Lock()
+        return self._session
+
+    async def _request(self, url, params=None, as_json=True):
+        session = await self._get_session()
+        host = url.split('/')[2]
+        self.requests[host] += 1
+        self.in_flight += 1
+        try:
+            async with session.get(url, params=params) as response:
+                if as_json:
+                    body = await response.json(content_type=None)
+                else:
+                    body = await response.text()
+                return response.status, body
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.errors[host] += 1
+            raise MarketDataError(f"{url}: {e!r}") from e
+        finally:
+            self.in_flight -= 1
+
+    async def _get_crumb(self, renew=False):
+        """Get the crumb quoteSummary requires, tied to the session cookie"""
+        await self._get_session()
+        async with self._crumb_lock:
+            if self._crumb is None or renew:
+                # Sets the consent cookie; the page itself is a 404
+                await self._request(YAHOO_COOKIE_URL, as_json=False)
+                status, crumb = await self._request(YAHOO_CRUMB_URL, as_json=False)
+                if status != 200 or not crumb or '<' in crumb:
+                    raise MarketDataError(f"Could not get a Yahoo crumb (HTTP {status})")
+                self._crumb = crumb.strip()
+            return self._crumb
+
+    async def quote_info(self, query_symbol):
+        """Get a yf.Ticker.info-like dict, or {} if the symbol is unknown"""
+        return await self._on_loop(self._quote_info(query_symbol))
+
+    async def _quote_info(self, query_symbol):
+        url = f"{YAHOO_QUERY_URL}/v10/finance/quoteSummary/{query_symbol}"
+        for attempt in range(2):
+            crumb = await self._get_crumb(renew=attempt > 0)
+            status, body = await self._request(url, {'modules': QUOTE_MODULES, 'crumb': crumb})
+            if status != 401:
+                break
+
+        if status == 404:
+            return {}
+        result = ((body or {}).get('quoteSummary') or {}).get('result')
+        if status != 200 or not result:
+            error = ((body or {}).get('quoteSummary') or {}).get('error')
+            if error and error.get('code') == 'Not Found':
+                return {}
+            raise MarketDataError(f"quoteSummary {query_symbol} failed (HTTP {status}): {error}")
+
+        info = {}
+        for module_name, module in result[0].items():
+            if not isinstance(module, dict):
+                continue
+            for key, value in module.items():
+                if isinstance(value, dict):
+                    value = value.get('raw')
+                    if value is None:
+                        continue
+                if module_name == 'price' and key == 'regularMarketChangePercent':
+                    value = value * 100  # a fraction in quoteSummary, a percentage in .info
+                # First module wins, matching yfinance's merge order
+                info.setdefault(key, value)
+        return info
+
+    async def history(self, query_symbol, period=None, start=None):
+        """
+        Get daily bars shaped like yf.Ticker.history() (auto adjusted,
+        Dividends and Stock Splits columns), or None if there are none
+        """
+        return await self._on_loop(self._history(query_symbol, period, start))
+
+    async def _history(self, query_symbol, period=None, start=None):
+        params = {'interval': '1d', 'events': 'div,splits', 'includeAdjustedClose': 'true'}
+        if start is not None:
+            start = pd.Timestamp(start)
+            params['period1'] = int(start.tz_localize('UTC').timestamp() if start.tzinfo is None else start.timestamp())
+            params['period2'] = int(time.time())
+        else:
+            params['range'] = period or '1mo'
+
+        url = f"{YAHOO_QUERY_URL}/v8/finance/chart/{query_symbol}"
+        status, body = await self._request(url, params)
+        chart = (body or {}).get('chart') or {}
+        if status == 404 or (chart.get('error') or {}).get('code') == 'Not Found':
+            return None
+        if status != 200 or not chart.get('result'):
+            raise MarketDataError(f"chart {query_symbol} failed (HTTP {status}): {chart.get('error')}")
+
+        result = chart['result'][0]
+        timestamps = result.get('timestamp')
+        if not timestamps:
+            return None
+
+        tz = (result.get('meta') or {}).get('exchangeTimezoneName') or 'UTC'
+        index = pd.to_datetime(timestamps, unit='s', utc=True).tz_convert(tz).normalize()
+        quote = result['indicators']['quote'][0]
+        frame = pd.DataFrame({
+            'Open': quote.get('open'),
+            'High': quote.get('high'),
+            'Low': quote.get('low'),
+            'Close': quote.get('close'),
+            'Volume': quote.get('volume'),
+        }, index=pd.DatetimeIndex(index, name='Date'), dtype='float64')
+
+        # Auto adjust OHLC for splits and dividends, like yfinance's default
+        adjclose = (result['indicators'].get('adjclose') or [{}])[0].get('adjclose')
+        if adjclose:
+            ratio = pd.Series(adjclose, index=frame.index, dtype='float64') / frame['Close']
+            for column in ('Open', 'High', 'Low', 'Close'):
+                frame[column] = frame[column] * ratio
+
+        frame['Dividends'] = 0.0
+        frame['Stock Splits'] = 0.0
+        events = result.get('events') or {}
+        for event in (events.get('dividends') or {}).values():
+            day = pd.Timestamp(event['date'], unit='s', tz='UTC').tz_convert(tz).normalize()
+            if day in frame.index:
+                frame.loc[day, 'Dividends'] = event['amount']
+        for event in (events.get('splits') or {}).values():
+            day = pd.Timestamp(event['date'], unit='s', tz='UTC').tz_convert(tz).normalize()
+            if day in frame.index and event.get('denominator'):
+                frame.loc[day, 'Stock Splits'] = event['numerator'] / event['denominator']
+
+        # Drop the live, not yet complete bar duplicates and empty rows
+        frame = frame[~frame.index.duplicated(keep='last')].dropna(subset=['Close'])
+        return frame if not frame.empty else None
+
+    async def quarterly_balance_sheet(self, query_symbol):
+        """
+        Get quarterly balance sheets shaped like yf.Ticker.quarterly_balance_sheet
+        (rows are line items, columns are quarter dates, most recent first)
+        """
+        return await self._on_loop(self._quarterly_balance_sheet(query_symbol))
+
+    async def _quarterly_balance_sheet(self, query_symbol):
+        url = f"{YAHOO_QUERY_URL}/ws/fundamentals-timeseries/v1/finance/timeseries/{query_symbol}"
+        params = {
+            'symbol': query_symbol,
+            'type': ','.join(BALANCE_SHEET_TYPES),
+            'period1': 493590046,  # 1985, as yfinance asks for
+            'period2': int(datetime.now(timezone.utc).timestamp()),
+        }
+        status, body = await self._request(url, params)
+        if status != 200:
+            raise MarketDataError(f"timeseries {query_symbol} failed (HTTP {status})")
+
+        columns = {}
+        for series in ((body or {}).get('timeseries') or {}).get('result') or []:
+            series_type = ((series.get('meta') or {}).get('type') or [None])[0]
+            row = BALANCE_SHEET_TYPES.get(series_type)
+            for point in series.get(series_type) or []:
+                if row and point and point.get('asOfDate'):
+                    value = (point.get('reportedValue') or {}).get('raw')
+                    columns.setdefault(pd.Timestamp(point['asOfDate']), {})[row] = value
+
+        if not columns:
+            return None
+        frame = pd.DataFrame(columns, dtype='float64')
+        return frame[sorted(frame.columns, reverse=True)]
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'max_connections': self.max_connections,
+            'per_host': self.per_host,
+            'in_flight': self.in_flight,
+            'requests': dict(self.requests),
+            'errors': dict(self.errors),
+        }
+
+
+# Shared client (one connection pool for the whole process)
+market_data = MarketDataClient()
@@ -0,0 +1,194 @@
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, select, text
+
+from app import app, db
+from app.models import ORDER_GAP, SchemaMigration, Stock
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a schema migration; versions are applied in ascending order"""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+class MigrationContext:
+    """Connection a migration runs on; records every statement it executes"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.applied = []
+
+    def execute(self, sql, params=None):
+        result = self.conn.execute(text(sql), params if params is not None else {})
+        rows = len(params) if isinstance(params, list) else result.rowcount
+        self.applied.append(f"{' '.join(sql.split())} -- {rows} rows" if rows and rows > 0 else ' '.join(sql.split()))
+        return result
+
+    def columns(self, table):
+        return {row[1] for row in self.conn.execute(text(f"PRAGMA table_info({table})"))}
+
+    def add_column(self, table, column, column_type):
+        if column not in self.columns(table):
+            self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def create_index(self, name, table, columns, unique=False):
+        self.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+    def has_unique(self, table, columns):
+        """Whether a unique index or constraint covers exactly these columns"""
+        for index in self.conn.execute(text(f"PRAGMA index_list({table})")).mappings():
+            if index['unique']:
+                indexed = [row[2] for row in self.conn.execute(text(f"PRAGMA index_info({index['name']})"))]
+                if indexed == list(columns):
+                    return True
+        return False
+
+
+@migration(1, "Create missing tables")
+def create_missing_tables(ctx):
+    existing = {row[0] for row in ctx.conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    missing = [table for name, table in db.metadata.tables.items() if name not in existing]
+    db.metadata.create_all(ctx.conn, tables=missing)
+    ctx.applied.extend(f"CREATE TABLE {table.name}" for table in missing)
+
+
+@migration(2, "Add quote columns to stock and number display_order")
+def stock_columns(ctx):
+    for column, column_type in (('ytd_change_percent', 'FLOAT'), ('display_order', 'INTEGER'),
+                                ('eps', 'FLOAT'), ('prospect_return', 'FLOAT'), ('roe', 'FLOAT'),
+                                ('chinese_name', 'VARCHAR(100)')):
+        ctx.add_column('stock', column, column_type)
+
+    # One statement instead of an UPDATE per row; keys ORDER_GAP apart, so
+    # drag and drop moves can slot rows in between without renumbering
+    if ctx.conn.execute(text("SELECT COUNT(*) FROM stock WHERE display_order IS NULL")).scalar():
+        ctx.execute("""
+            UPDATE stock SET display_order = (
+                SELECT numbered.position * :gap FROM (
+                    SELECT id, ROW_NUMBER() OVER (ORDER BY display_order IS NULL, display_order, id) AS position
+                    FROM stock
+                ) AS numbered
+                WHERE numbered.id = stock.id
+            )
+        """, {'gap': ORDER_GAP})
+
+
+@migration(3, "Make stock unique on (symbol, market) and index display_order")
+def stock_unique_symbol_market(ctx):
+    if not ctx.has_unique('stock', ['symbol', 'market']):
+        # SQLite can't drop a constraint, so the table is rebuilt from the
+        # model and the rows copied over in one statement
+        ctx.execute("ALTER TABLE stock RENAME TO stock_old")
+        Stock.__table__.create(ctx.conn)
+        ctx.applied.append("CREATE TABLE stock (UNIQUE (symbol, market))")
+        columns = ', '.join(sorted(ctx.columns('stock') & ctx.columns('stock_old')))
+        ctx.execute(f"INSERT INTO stock ({columns}) SELECT {columns} FROM stock_old")
+        ctx.execute("DROP TABLE stock_old")
+    ctx.create_index('ix_stock_display_order', 'stock', ['display_order'])
+
+
+@migration(4, "Add rendered HTML and excerpt to markdown_blog, index the listing")
+def blog_rendering(ctx):
+    from app.blog_renderer import content_hash, make_excerpt, render_markdown
+
+    for column, column_type in (('rendered_html', 'TEXT'), ('content_hash', 'VARCHAR(64)'),
+                                ('rendered_at', 'DATETIME'), ('excerpt', 'VARCHAR(300)')):
+        ctx.add_column('markdown_blog', column, column_type)
+    ctx.create_index('ix_markdown_blog_updated_at_id', 'markdown_blog', ['updated_at', 'id'])
+
+    # Render in Python, write back with one executemany UPDATE
+    rows = ctx.conn.execute(text(
+        "SELECT id, content FROM markdown_blog WHERE rendered_html IS NULL OR excerpt IS NULL"
+    )).all()
+    if rows:
+        now = datetime.utcnow()
+        params = []
+        for blog_id, content in rows:
+            rendered = render_markdown(content)
+            params.append({'id': blog_id, 'html': rendered, 'hash': content_hash(content),
+                           'excerpt': make_excerpt(rendered), 'now': now})
+        ctx.execute(
+            "UPDATE markdown_blog SET rendered_html = :html, content_hash = :hash, "
+            "excerpt = :excerpt, rendered_at = :now WHERE id = :id",
+            params
+        )
+
+
+@migration(5, "Index the sortable stock columns of the dashboard API")
+def stock_sort_indexes(ctx):
+    for column in ('prospect_return', 'roe', 'change_percent', 'ytd_change_percent', 'eps', 'current_price'):
+        ctx.create_index(f'ix_stock_{column}', 'stock', [column])
+
+
+def _migration_engine():
+    """
+    Engine for migrations with real transactions around DDL
+
+    pysqlite commits implicitly before DDL statements, which would leave a
+    half-applied migration behind on failure; this engine issues BEGIN itself.
+    """
+    engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+
+    @event.listens_for(engine, 'connect')
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def begin_immediate(conn):
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+    return engine
+
+
+def applied_migrations():
+    """Get the recorded migrations, oldest first"""
+    with app.app_context():
+        SchemaMigration.__table__.create(db.engine, checkfirst=True)
+        return SchemaMigration.query.order_by(SchemaMigration.version).all()
+
+
+def run_migrations(target=None):
+    """
+    Apply pending migrations up to target (default: all), each in its own
+    transaction, and record them in schema_migrations
+
+    Returns:
+        list: versions applied
+    """
+    engine = _migration_engine()
+    done = []
+    try:
+        with engine.connect() as conn:
+            SchemaMigration.__table__.create(conn, checkfirst=True)
+            conn.commit()
+            applied = set(conn.execute(select(SchemaMigration.version)).scalars())
+            conn.commit()
+
+            for version, description, fn in sorted(MIGRATIONS, key=lambda entry: entry[0]):
+                if version in applied or (target is not None and version > target):
+                    continue
+                print(f"Applying migration {version}: {description}")
+                started = time.monotonic()
+                with conn.begin():
+                    ctx = MigrationContext(conn)
+                    fn(ctx)
+                    conn.execute(SchemaMigration.__table__.insert().values(
+                        version=version,
+                        description=description,
+                        applied_at=datetime.utcnow(),
+                        duration=round(time.monotonic() - started, 3),
+                        statements=json.dumps(ctx.applied)
+                    ))
+                for statement in ctx.applied:
+                    print(f"  {statement}")
+                done.append(version)
+    finally:
+        engine.dispose()
+    return done
@@ -2,9 +2,13 @@ from app import db
 from datetime import datetime
 from sqlalchemy import func
 
+# Spacing between Stock.display_order keys, so a stock can be moved
+# between two others by rewriting only its own key (see app.stock_order)
+ORDER_GAP = 1024
+
 class Stock(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    symbol = db.Column(db.String(20), unique=True, nullable=False)
+    symbol = db.Column(db.String(20), nullable=False)
     name = db.Column(db.String(100), nullable=True)
     chinese_name = db.Column(db.String(100), nullable=True)  # Chinese name for HK/CN stocks
     market = db.Column(db.String(20), nullable=False)  # US, HK, CN
@@ -22,14 +26,27 @@ class Stock(db.Model):
     # For ordering in the display
     display_order = db.Column(db.Integer, default=lambda: Stock.next_order())
     
+    # The same symbol may be listed in more than one market; the column
+    # indexes serve the sorted, keyset-paginated dashboard API
+    __table_args__ = (
+        db.UniqueConstraint('symbol', 'market', name='uq_stock_symbol_market'),
+        db.Index('ix_stock_display_order', 'display_order'),
+        db.Index('ix_stock_prospect_return', 'prospect_return'),
+        db.Index('ix_stock_roe', 'roe'),
+        db.Index('ix_stock_change_percent', 'change_percent'),
+        db.Index('ix_stock_ytd_change_percent', 'ytd_change_percent'),
+        db.Index('ix_stock_eps', 'eps'),
+        db.Index('ix_stock_current_price', 'current_price'),
+    )
+    
     def __repr__(self):
         return f'<Stock {self.symbol}>'
         
     @staticmethod
     def next_order():
-        """Get the next available display order number"""
+        """Get the display order key after the last stock (an index lookup)"""
         max_order = db.session.query(func.max(Stock.display_order)).scalar()
-        return (max_order or 0) + 1
+        return (max_order or 0) + ORDER_GAP
 
 class MarkdownBlog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -39,5 +56,121 @@ class MarkdownBlog(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_published = db.Column(db.Boolean, default=False)
     
+    # Sanitized HTML, rendered when the post is saved (see app.blog_renderer)
+    rendered_html = db.Column(db.Text, nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True)
+    rendered_at = db.Column(db.DateTime, nullable=True)
+    excerpt = db.Column(db.String(300), nullable=True)  # plain-text start, for the listing
+    
+    # Keyset pagination of the listing (newest first)
+    __table_args__ = (db.Index('ix_markdown_blog_updated_at_id', 'updated_at', 'id'),)
+    
+    def __repr__(self):
+        return f'<MarkdownBlog {self.title}>'
+
+class PriceBar(db.Model):
+    """Daily OHLCV bar of the local price history store"""
+    symbol = db.Column(db.String(20), primary_key=True)
+    market = db.Column(db.String(20), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    open = db.Column(db.Float, nullable=True)
+    high = db.Column(db.Float, nullable=True)
+    low = db.Column(db.Float, nullable=True)
+    close = db.Column(db.Float, nullable=True)
+    volume = db.Column(db.Float, nullable=True)
+    dividends = db.Column(db.Float, nullable=True)
+    stock_splits = db.Column(db.Float, nullable=True)
+
+    def __repr__(self):
+        return f'<PriceBar {self.symbol} {self.date}>'
+
+class PriceHistorySync(db.Model):
+    """Tracks which date range of a symbol's history is stored locally"""
+    symbol = db.Column(db.String(20), primary_key=True)
+    market = db.Column(db.String(20), primary_key=True)
+    first_date = db.Column(db.Date, nullable=True)
+    last_date = db.Column(db.Date, nullable=True)
+    full_history = db.Column(db.Boolean, default=False)  # first_date is the listing date
+    last_synced = db.Column(db.DateTime, nullable=True)
+    last_rewrite = db.Column(db.DateTime, nullable=True)  # last split/dividend re-adjustment
+
+    def __repr__(self):
+        return f'<PriceHistorySync {self.symbol} {self.first_date}..{self.last_date}>'
+
+class BalanceSheetQuarter(db.Model):
+    """One quarter of a stock's balance sheet, kept by the fundamentals cache"""
+    symbol = db.Column(db.String(20), primary_key=True)
+    market = db.Column(db.String(20), primary_key=True)
+    quarter_date = db.Column(db.Date, primary_key=True)
+    total_assets = db.Column(db.Float, nullable=True)
+    total_liabilities = db.Column(db.Float, nullable=True)
+    equity = db.Column(db.Float, nullable=True)
+    cash = db.Column(db.Float, nullable=True)
+    debt = db.Column(db.Float, nullable=True)
+    current_assets = db.Column(db.Float, nullable=True)
+    current_liabilities = db.Column(db.Float, nullable=True)
+    inventory = db.Column(db.Float, nullable=True)
+    accounts_receivable = db.Column(db.Float, nullable=True)
+    accounts_payable = db.Column(db.Float, nullable=True)
+
+    # Derived ratios, stored so they are never recomputed on page views
+    current_ratio = db.Column(db.Float, nullable=True)
+    debt_equity_ratio = db.Column(db.Float, nullable=True)
+    cash_ratio = db.Column(db.Float, nullable=True)
+
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<BalanceSheetQuarter {self.symbol} {self.quarter_date}>'
+
+class FundamentalsSync(db.Model):
+    """Tracks when a symbol's fundamentals were fetched and when the next report is due"""
+    symbol = db.Column(db.String(20), primary_key=True)
+    market = db.Column(db.String(20), primary_key=True)
+    latest_quarter = db.Column(db.Date, nullable=True)
+    next_report_due = db.Column(db.Date, nullable=True)
+    last_checked = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<FundamentalsSync {self.symbol} due {self.next_report_due}>'
+
+class SymbolMaster(db.Model):
+    """Listed security in the offline symbol master behind name search"""
+    symbol = db.Column(db.String(20), primary_key=True)
+    market = db.Column(db.String(20), primary_key=True)  # US, HK, CN
+    name = db.Column(db.String(200), nullable=True)
+    chinese_name = db.Column(db.String(100), nullable=True)
+    pinyin = db.Column(db.String(200), nullable=True)  # e.g. guizhoumaotai
+    pinyin_initials = db.Column(db.String(50), nullable=True)  # e.g. gzmt
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SymbolMaster {self.symbol} ({self.market})>'
+
+class LLMResponse(db.Model):
+    """Cached chatbot reply, keyed by normalized prompt, model and data version"""
+    __tablename__ = 'llm_response_cache'
+    key = db.Column(db.String(64), primary_key=True)  # sha256 hex
+    model_id = db.Column(db.String(200), nullable=False)
+    data_version = db.Column(db.String(100), nullable=True)
+    prompt = db.Column(db.Text, nullable=False)  # normalized
+    response = db.Column(db.Text, nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # bytes of prompt + response
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<LLMResponse {self.key[:12]} ({self.model_id})>'
+
+class SchemaMigration(db.Model):
+    """Schema migration applied by app.migrations, with the statements it ran"""
+    __tablename__ = 'schema_migrations'
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    duration = db.Column(db.Float, nullable=True)  # seconds
+    statements = db.Column(db.Text, nullable=True)  # JSON list
+
     def __repr__(self):
-        return f'<MarkdownBlog {self.title}>'
\ No newline at end of file
+        return f'<SchemaMigration {self.version}>'
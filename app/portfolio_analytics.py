@@ -0,0 +1,304 @@
+import os
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import tuple_
+
+from app import app, db
+from app.history_store import period_start, sync_due
+from app.models import PriceBar, PriceHistorySync, Stock
+from app.stock_service import INDEX_MARKET, QUOTE_MAX_WORKERS, StockService
+
+# Default look-back of the dashboard analytics panel
+ANALYTICS_PERIOD = os.getenv('ANALYTICS_PERIOD', '1y')
+
+TRADING_DAYS = 252
+
+# (symbol, market) pairs per query, under SQLite's variable limit
+_KEY_CHUNK = 300
+
+# Julian day number of 1970-01-01, to turn SQLite dates into datetime64[D]
+_UNIX_EPOCH_JULIAN = 2440587.5
+
+# Pool syncing missing or stale histories before a computation
+_sync_executor = ThreadPoolExecutor(max_workers=QUOTE_MAX_WORKERS, thread_name_prefix='analytics-sync')
+
+
+def load_close_matrix(keys, start=None):
+    """
+    Read stored closes for (symbol, market) keys into one date-aligned matrix
+
+    Returns:
+        tuple: (dates, closes) where closes[i, j] is keys[j]'s close on
+        dates[i], NaN where it has no bar; forward-filled over holidays of
+        other markets but not before a key's first bar
+    """
+    # Straight from the DB-API cursor, as (column, day number, close): ORM
+    # rows and date strings cost more than the query itself for the
+    # hundreds of thousands of bars a large portfolio has
+    cursor = db.session.connection().connection.cursor()
+    rows = []
+    for offset in range(0, len(keys), _KEY_CHUNK):
+        chunk = keys[offset:offset + _KEY_CHUNK]
+        sql = f"""
+            WITH wanted (col, symbol, market) AS (VALUES {', '.join(['(?, ?, ?)'] * len(chunk))})
+            SELECT wanted.col, CAST(julianday(bar.date) - {_UNIX_EPOCH_JULIAN} AS INTEGER), bar.close
+            FROM wanted JOIN {PriceBar.__tablename__} AS bar
+                ON bar.symbol = wanted.symbol AND bar.market = wanted.market
+        """
+        params = [value for index, key in enumerate(chunk, offset) for value in (index, *key)]
+        if start is not None:
+            sql += " AND bar.date >= ?"
+            params.append(start.isoformat())
+        rows.extend(cursor.execute(sql, params).fetchall())
+    cursor.close()
+    if not rows:
+        return np.array([], dtype='datetime64[D]'), np.empty((0, len(keys)))
+
+    # Pivot with integer codes instead of a pandas pivot_table
+    bars = np.array(rows, dtype=float)
+    days, date_codes = np.unique(bars[:, 1].astype(np.int64), return_inverse=True)
+    dates = days.astype('datetime64[D]')
+    closes = np.full((len(dates), len(keys)), np.nan)
+    closes[date_codes, bars[:, 0].astype(np.intp)] = bars[:, 2]
+    return dates, _forward_fill(closes)
+
+
+def _forward_fill(matrix):
+    """Fill NaNs down each column with the last value above them"""
+    valid = ~np.isnan(matrix)
+    last = np.where(valid, np.arange(matrix.shape[0])[:, None], 0)
+    np.maximum.accumulate(last, axis=0, out=last)
+    filled = matrix[last, np.arange(matrix.shape[1])]
+    # Rows before a column's first value stay NaN
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+
+def _max_drawdown(returns):
+    """Largest peak-to-trough fall of each column of a return matrix"""
+    wealth = np.cumprod(1 + np.nan_to_num(returns), axis=0)
+    wealth = np.vstack([np.ones((1, wealth.shape[1])), wealth])
+    return (wealth / np.maximum.accumulate(wealth, axis=0) - 1).min(axis=0)
+
+
+def _paired_stats(x, y):
+    """
+    Per-column covariance of x with y and variance of y over the rows
+    where both are present (x and y have the same shape)
+    """
+    mask = ~(np.isnan(x) | np.isnan(y))
+    count = mask.sum(axis=0)
+    x = np.where(mask, x, 0.0)
+    y = np.where(mask, y, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = x.sum(axis=0) / count
+        mean_y = y.sum(axis=0) / count
+        dx = np.where(mask, x - mean_x, 0.0)
+        dy = np.where(mask, y - mean_y, 0.0)
+        cov = (dx * dy).sum(axis=0) / (count - 1)
+        var_y = (dy * dy).sum(axis=0) / (count - 1)
+    return cov, var_y, count
+
+
+def correlation_matrix(returns):
+    """
+    Pairwise correlation of the columns of a return matrix, each pair over
+    the days both have a return, as a handful of matrix products
+    """
+    mask = (~np.isnan(returns)).astype(float)
+    x = np.nan_to_num(returns)
+    count = mask.T @ mask                  # days both i and j have a return
+    sum_x = x.T @ mask                     # sum of i's returns on those days
+    sum_xx = (x * x).T @ mask
+    sum_xy = x.T @ x
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_xy - sum_x * sum_x.T / count
+        var_i = sum_xx - sum_x ** 2 / count
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[count < 3] = np.nan
+    np.fill_diagonal(corr, 1.0)
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _round(values, digits=4):
+    """Array or scalar to JSON-friendly floats (NaN -> None)"""
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 0:
+        return round(float(values), digits) if np.isfinite(values) else None
+    rounded = np.round(values, digits).astype(object)
+    rounded[~np.isfinite(values)] = None
+    return rounded.tolist()
+
+
+def compute_analytics(keys, benchmarks, dates, closes):
+    """
+    Portfolio and per-holding analytics from a close matrix
+
+    keys are the holdings' (symbol, market) and take the first len(keys)
+    columns of closes; the rest are the benchmark indexes, one per market
+    in benchmarks ({market: (ticker, name)}). The portfolio is weighted
+    equally across the holdings quoted each day.
+    """
+    holdings = len(keys)
+    markets = list(benchmarks)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = closes[1:] / closes[:-1] - 1
+    stock_returns = returns[:, :holdings]
+    index_returns = returns[:, holdings:]
+
+    # Equal weight across the holdings with a return that day
+    quoted = (~np.isnan(stock_returns)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        portfolio = np.where(quoted > 0, np.nansum(stock_returns, axis=1) / quoted, np.nan)
+    portfolio = portfolio[:, None]
+
+    # Each holding against its own market's index
+    market_column = {market: index for index, market in enumerate(markets)}
+    own_index = index_returns[:, [market_column[market] for _, market in keys]] if holdings else stock_returns
+    cov, var_index, count = _paired_stats(stock_returns, own_index)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stock_beta = np.where(count > 2, cov / var_index, np.nan)
+
+    # The portfolio against every benchmark it holds stocks of
+    portfolio_cov, portfolio_var, portfolio_count = _paired_stats(
+        np.repeat(portfolio, len(markets), axis=1), index_returns
+    )
+    with np.errstate(invalid='ignore', divide='ignore'):
+        portfolio_beta = np.where(portfolio_count > 2, portfolio_cov / portfolio_var, np.nan)
+
+    total_return = np.nanprod(1 + returns, axis=0) - 1
+    total_return[np.isnan(returns).all(axis=0)] = np.nan
+    with warnings.catch_warnings():
+        # Columns with fewer than two returns come out as NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        volatility = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    drawdown = _max_drawdown(returns)
+    portfolio_valid = portfolio[~np.isnan(portfolio)]
+    beta = _round(portfolio_beta)
+    # Per-column figures as lists of rounded floats: holdings, then benchmarks
+    total_return, volatility, drawdown, stock_beta = (
+        _round(total_return), _round(volatility), _round(drawdown), _round(stock_beta)
+    )
+
+    return {
+        'start': str(dates[0]) if len(dates) else None,
+        'end': str(dates[-1]) if len(dates) else None,
+        'days': int(max(len(dates) - 1, 0)),
+        'portfolio': {
+            'return': _round(np.prod(1 + portfolio_valid) - 1) if portfolio_valid.size else None,
+            'volatility': _round(np.std(portfolio_valid, ddof=1) * np.sqrt(TRADING_DAYS)) if portfolio_valid.size > 1 else None,
+            'max_drawdown': _round(_max_drawdown(portfolio)[0]) if portfolio_valid.size else None,
+            'beta': {benchmarks[market][1]: beta[index] for index, market in enumerate(markets)},
+        },
+        'benchmarks': [
+            {'market': market, 'symbol': benchmarks[market][0], 'name': benchmarks[market][1],
+             'return': total_return[holdings + index],
+             'volatility': volatility[holdings + index],
+             'max_drawdown': drawdown[holdings + index]}
+            for index, market in enumerate(markets)
+        ],
+        'holdings': [
+            {'symbol': symbol, 'market': market, 'benchmark': benchmarks[market][1],
+             'return': total_return[index], 'volatility': volatility[index],
+             'beta': stock_beta[index], 'max_drawdown': drawdown[index]}
+            for index, (symbol, market) in enumerate(keys)
+        ],
+        'correlation': _round(correlation_matrix(stock_returns), 3) if holdings else [],
+    }
+
+
+class PortfolioAnalytics:
+    """
+    Portfolio-level return, risk, beta and correlation from the local
+    history store
+
+    All holdings and their market indexes are read with one query into a
+    date-aligned close matrix, and every metric is computed from it with
+    vectorized NumPy. Histories that are missing or due a sync are
+    brought up to date first, concurrently.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.synced = 0
+        self.last_holdings = 0
+        self.last_compute_ms = None
+        self.last_sync_ms = None
+
+    def _stale_keys(self, keys, start):
+        """Keys whose stored history doesn't reach back to start or is due a sync"""
+        syncs = {}
+        for offset in range(0, len(keys), _KEY_CHUNK):
+            for sync in PriceHistorySync.query.filter(
+                    tuple_(PriceHistorySync.symbol, PriceHistorySync.market).in_(keys[offset:offset + _KEY_CHUNK])):
+                syncs[(sync.symbol, sync.market)] = sync
+        now = datetime.utcnow()
+        return [key for key in keys if sync_due(syncs.get(key), start, now)]
+
+    def sync_history(self, keys, period):
+        """Sync the stale histories among keys concurrently"""
+        stale = self._stale_keys(keys, period_start(period))
+        if not stale:
+            return 0
+
+        def sync(key):
+            with app.app_context():
+                StockService.get_historical_data(key[0], key[1], period=period)
+
+        list(_sync_executor.map(sync, stale))
+        db.session.expire_all()
+        with self._lock:
+            self.synced += len(stale)
+        return len(stale)
+
+    def analyze(self, stocks=None, period=ANALYTICS_PERIOD, sync=True):
+        """
+        Compute the analytics of the given Stock rows (default: the whole
+        portfolio) over a yfinance style period
+        """
+        if stocks is None:
+            stocks = Stock.query.order_by(Stock.display_order, Stock.id).all()
+        keys = [(stock.symbol, stock.market) for stock in stocks]
+        benchmarks = {}
+        for _, market in keys:
+            if market not in benchmarks:
+                benchmarks[market] = StockService.MARKET_INDEXES.get(market, StockService.MARKET_INDEXES['US'])
+        index_keys = [(ticker, INDEX_MARKET) for ticker, _ in benchmarks.values()]
+
+        started = time.perf_counter()
+        if sync:
+            self.sync_history(keys + index_keys, period)
+        synced = time.perf_counter()
+
+        dates, closes = load_close_matrix(keys + index_keys, period_start(period))
+        result = compute_analytics(keys, benchmarks, dates, closes)
+        finished = time.perf_counter()
+
+        result['period'] = period
+        result['compute_ms'] = round((finished - synced) * 1000, 1)
+        with self._lock:
+            self.runs += 1
+            self.last_holdings = len(keys)
+            self.last_compute_ms = result['compute_ms']
+            self.last_sync_ms = round((synced - started) * 1000, 1)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'histories_synced': self.synced,
+                'last_holdings': self.last_holdings,
+                'last_compute_ms': self.last_compute_ms,
+                'last_sync_ms': self.last_sync_ms,
+            }
+
+
+# Shared analytics engine for the dashboard
+portfolio_analytics = PortfolioAnalytics()
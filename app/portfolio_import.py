@@ -0,0 +1,218 @@
+import csv
+import io
+import json
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import ORDER_GAP, Stock
+from app.stock_service import StockService
+
+# Symbols validated per get_quotes call; progress is reported after each batch
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 50))
+
+# Largest import accepted in one request or file
+IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', 5000))
+
+MARKETS = ('US', 'HK', 'CN')
+
+# Column names accepted for the symbol and market in CSV headers and JSON objects
+SYMBOL_COLUMNS = ('symbol', 'ticker', 'code', 'stock', '代码', '股票代码')
+MARKET_COLUMNS = ('market', 'exchange', '市场')
+
+# Yahoo-style suffixes in broker exports, e.g. 0700.HK, 600519.SS
+SUFFIX_MARKETS = {'HK': 'HK', 'SS': 'CN', 'SH': 'CN', 'SZ': 'CN'}
+
+
+class ImportFormatError(ValueError):
+    """The import file can't be parsed"""
+
+
+def normalize_holding(raw_symbol, raw_market=None, default_market='US'):
+    """
+    Normalize a symbol as brokers export it into (symbol, market)
+
+    Yahoo suffixes set the market (0700.HK -> ('0700', 'HK'),
+    600519.SS -> ('600519', 'CN')); HK codes are padded to 4 digits.
+    Raises ValueError for an empty symbol or unknown market.
+    """
+    symbol = (raw_symbol or '').strip().upper()
+    market = (raw_market or '').strip().upper() or None
+    if not symbol:
+        raise ValueError("Missing symbol")
+
+    match = re.fullmatch(r'(.+)\.([A-Z]{2})', symbol)
+    if match and match.group(2) in SUFFIX_MARKETS:
+        symbol, market = match.group(1), market or SUFFIX_MARKETS[match.group(2)]
+
+    market = market or default_market
+    if market not in MARKETS:
+        raise ValueError(f"Unknown market {market}")
+    if market == 'HK' and symbol.isdigit():
+        symbol = symbol.lstrip('0').zfill(4)
+    return symbol, market
+
+
+def parse_import(content, fmt=None):
+    """
+    Parse a CSV or JSON import into rows of {'line', 'symbol', 'market'}
+    (raw values; see normalize_holding)
+
+    CSV needs a header with a symbol column (symbol, ticker, code ...) and
+    may have a market column. JSON is a list of symbols or of objects with
+    the same keys, optionally wrapped as {"stocks": [...]}.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    fmt = fmt or ('json' if content.lstrip()[:1] in ('[', '{') else 'csv')
+
+    if fmt == 'json':
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            raise ImportFormatError(f"Invalid JSON: {e}")
+        if isinstance(data, dict):
+            data = data.get('stocks')
+        if not isinstance(data, list):
+            raise ImportFormatError('JSON must be a list of stocks or {"stocks": [...]}')
+        items = [(index + 1, item) for index, item in enumerate(data)]
+    else:
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames:
+            raise ImportFormatError("CSV file is empty")
+        # Line numbers as shown in a spreadsheet (header is line 1)
+        items = [(index + 2, row) for index, row in enumerate(reader)]
+
+    rows = []
+    for line, item in items:
+        if isinstance(item, str):
+            rows.append({'line': line, 'symbol': item, 'market': None})
+            continue
+        if not isinstance(item, dict):
+            rows.append({'line': line, 'symbol': None, 'market': None})
+            continue
+        fields = {str(key).strip().lower(): value for key, value in item.items() if key is not None}
+        symbol = next((fields[name] for name in SYMBOL_COLUMNS if fields.get(name)), None)
+        market = next((fields[name] for name in MARKET_COLUMNS if fields.get(name)), None)
+        if symbol is None and not any(fields.values()):
+            continue  # Blank CSV line
+        rows.append({'line': line, 'symbol': symbol, 'market': market})
+
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise ImportFormatError(f"Too many rows ({len(rows)}); the limit is {IMPORT_MAX_ROWS}")
+    return rows
+
+
+def stock_from_data(symbol, market, stock_data, display_order=None):
+    """Build a Stock row from get_stock_data output"""
+    # Leave display_order unset (not None) so the column default applies
+    order = {'display_order': display_order} if display_order is not None else {}
+    return Stock(
+        symbol=symbol,
+        name=stock_data.get('name', symbol),
+        chinese_name=stock_data.get('chinese_name'),
+        market=market,
+        current_price=stock_data.get('current_price'),
+        change_percent=stock_data.get('change_percent'),
+        ytd_change_percent=stock_data.get('ytd_change_percent'),
+        eps=stock_data.get('eps'),
+        prospect_return=stock_data.get('prospect_return'),  # ROI
+        roe=stock_data.get('roe'),
+        last_updated=datetime.utcnow(),
+        **order
+    )
+
+
+def iter_import(rows, default_market='US', dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate and insert parsed rows, yielding progress as it goes
+
+    Yields {'event': 'progress', 'validated', 'total'} after each batch of
+    quotes, then {'event': 'done', ...report}. Invalid, duplicate and
+    already held rows are reported, not fatal; valid ones are inserted
+    together in one transaction.
+    """
+    skipped = []
+    holdings = {}  # (symbol, market) -> line, first occurrence wins
+    for row in rows:
+        try:
+            key = normalize_holding(row['symbol'], row['market'], default_market)
+        except ValueError as e:
+            skipped.append({'line': row['line'], 'symbol': row['symbol'], 'reason': str(e)})
+            continue
+        if key in holdings:
+            skipped.append({'line': row['line'], 'symbol': key[0], 'market': key[1],
+                            'reason': f"Duplicate of line {holdings[key]}"})
+            continue
+        holdings[key] = row['line']
+
+    # One query for everything already in the portfolio
+    existing = set()
+    keys = list(holdings)
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        existing.update(db.session.query(Stock.symbol, Stock.market)
+                        .filter(tuple_(Stock.symbol, Stock.market).in_(chunk)).all())
+    for key in sorted(existing, key=holdings.get):
+        skipped.append({'line': holdings.pop(key), 'symbol': key[0], 'market': key[1],
+                        'reason': "Already in portfolio"})
+
+    # Validate in batches; each batch is fetched concurrently by get_quotes
+    pending = list(holdings)
+    valid = {}
+    total = len(pending)
+    for start in range(0, total, batch_size):
+        batch = pending[start:start + batch_size]
+        results, errors = StockService.get_quotes(batch)
+        for key in batch:
+            stock_data = results.get(key)
+            if stock_data and stock_data.get('current_price'):
+                valid[key] = stock_data
+            else:
+                skipped.append({'line': holdings[key], 'symbol': key[0], 'market': key[1],
+                                'reason': errors.get(key) or "No price data found"})
+        yield {'event': 'progress', 'validated': min(start + batch_size, total), 'total': total}
+
+    added = []
+    if valid and not dry_run:
+        # Keys for the whole import from one MAX() lookup, in file order
+        base = Stock.next_order()
+        stocks = [
+            stock_from_data(symbol, market, valid[(symbol, market)], base + index * ORDER_GAP)
+            for index, (symbol, market) in enumerate(sorted(valid, key=holdings.get))
+        ]
+        try:
+            db.session.add_all(stocks)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            yield {'event': 'done', 'error': "Another import or add changed the portfolio; nothing was imported",
+                   'added': [], 'skipped': sorted(skipped, key=lambda entry: entry['line'] or 0)}
+            return
+        added = [{'line': holdings[(stock.symbol, stock.market)], 'id': stock.id,
+                  'symbol': stock.symbol, 'market': stock.market, 'name': stock.name}
+                 for stock in stocks]
+    elif dry_run:
+        added = [{'line': holdings[key], 'symbol': key[0], 'market': key[1], 'name': valid[key].get('name')}
+                 for key in sorted(valid, key=holdings.get)]
+
+    print(f"Imported {len(added)} stocks ({len(skipped)} skipped){' [dry run]' if dry_run else ''}")
+    yield {'event': 'done', 'dry_run': dry_run, 'added': added,
+           'skipped': sorted(skipped, key=lambda entry: entry['line'] or 0)}
+
+
+def import_stocks(rows, default_market='US', dry_run=False, progress=None):
+    """
+    Run iter_import to completion, calling progress(validated, total)
+    after each batch; returns the final report
+    """
+    for event in iter_import(rows, default_market, dry_run):
+        if event['event'] == 'progress':
+            if progress:
+                progress(event['validated'], event['total'])
+        else:
+            return event
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a cached quote stays fresh, per market and field group.
+# 'price' covers the fast moving fields (price, change, volume), while
+# 'fundamentals' covers EPS, ROE, names etc. which only change with filings.
+DEFAULT_TTLS = {
+    'US': {'price': 60, 'fundamentals': 6 * 3600},
+    'HK': {'price': 60, 'fundamentals': 6 * 3600},
+    'CN': {'price': 60, 'fundamentals': 6 * 3600},
+}
+
+# Seconds a "symbol not found" result is remembered
+DEFAULT_NEGATIVE_TTL = 120
+
+# Entries older than their TTL plus this window are refetched synchronously
+# instead of being served stale
+DEFAULT_MAX_STALE = 3600
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class QuoteCache:
+    """
+    Bounded in-process LRU cache for quote data with stale-while-revalidate
+
+    Entries are keyed by (symbol, market). A stale entry is returned
+    immediately while a single background refresh replaces it.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttls=None,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL, max_stale=DEFAULT_MAX_STALE):
+        self.max_entries = max_entries
+        self.ttls = ttls or DEFAULT_TTLS
+        self.negative_ttl = negative_ttl
+        self.max_stale = max_stale
+
+        self._entries = OrderedDict()  # key -> (value, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a cache configured from environment variables:
+        QUOTE_CACHE_MAX_ENTRIES, QUOTE_CACHE_NEGATIVE_TTL, QUOTE_CACHE_MAX_STALE
+        and QUOTE_CACHE_TTL_<MARKET>_<GROUP> (e.g. QUOTE_CACHE_TTL_HK_PRICE)
+        """
+        ttls = {market: dict(groups) for market, groups in DEFAULT_TTLS.items()}
+        for market, groups in ttls.items():
+            for group in groups:
+                value = os.getenv(f'QUOTE_CACHE_TTL_{market}_{group.upper()}')
+                if value:
+                    groups[group] = float(value)
+
+        return cls(
+            max_entries=int(os.getenv('QUOTE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+            ttls=ttls,
+            negative_ttl=float(os.getenv('QUOTE_CACHE_NEGATIVE_TTL', DEFAULT_NEGATIVE_TTL)),
+            max_stale=float(os.getenv('QUOTE_CACHE_MAX_STALE', DEFAULT_MAX_STALE)),
+        )
+
+    def ttl(self, market, group='price'):
+        """Get the TTL in seconds for a market and field group"""
+        groups = self.ttls.get(market) or self.ttls.get('US') or {}
+        return groups.get(group, groups.get('price', 60))
+
+    def peek(self, key, group='price'):
+        """
+        Look up a key without loading it
+
+        Returns:
+            tuple: (state, value) where state is 'fresh', 'stale' or 'missing'.
+            A cached "not found" result is returned as ('fresh', None).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 'missing', None
+            self._entries.move_to_end(key)
+
+        value, fetched_at = entry
+        age = time.monotonic() - fetched_at
+
+        if value is None:
+            return ('fresh', None) if age <= self.negative_ttl else ('missing', None)
+
+        ttl = self.ttl(key[1], group)
+        if age <= ttl:
+            return 'fresh', value
+        if age <= ttl + self.max_stale:
+            return 'stale', value
+        return 'missing', value
+
+    def get(self, key, loader, group='price'):
+        """
+        Get a value, calling loader() on a miss
+
+        Stale values are returned immediately and refreshed in the background.
+        A loader result of None is cached as "not found" for negative_ttl seconds.
+        """
+        state, value = self.peek(key, group)
+
+        if state == 'fresh':
+            with self._lock:
+                if value is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+            return value
+
+        if state == 'stale':
+            with self._lock:
+                self.stale_hits += 1
+            self._refresh_in_background(key, loader)
+            return value
+
+        with self._lock:
+            self.misses += 1
+        value = loader()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store a value (None records a "not found" result)"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Drop one key, or the whole cache when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """Get cache counters for sizing and monitoring"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.negative_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'refreshes': self.refreshes,
+                'hit_rate': (lookups - self.misses) / lookups if lookups else None,
+            }
+
+    def _refresh_in_background(self, key, loader):
+        """Start a refresh for key unless one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.refreshes += 1
+
+        def refresh():
+            try:
+                value = loader()
+                # Keep serving the stale value if the refresh came back empty
+                if value is not None:
+                    self.put(key, value)
+            except Exception as e:
+                print(f"Background refresh failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"quote-refresh-{key[0]}", daemon=True).start()
+
+
+# Shared cache used by StockService
+quote_cache = QuoteCache.from_env()
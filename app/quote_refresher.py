@@ -0,0 +1,189 @@
+import os
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every process refreshes
+    fcntl = None
+
+from app import app, db
+from app.models import Stock
+from app.stock_service import StockService
+from app.quote_stream import quote_broadcaster, quote_row, STREAM_FIELDS
+
+# Seconds between refresh passes; rows older than this are refetched.
+# One loop serves every open dashboard, so this no longer scales with tabs
+QUOTE_REFRESH_INTERVAL = float(os.getenv('QUOTE_REFRESH_INTERVAL', 60))
+
+# Set to 0 to run no refresher in this process (e.g. when a separate
+# process keeps the quotes fresh)
+QUOTE_REFRESHER_ENABLED = os.getenv('QUOTE_REFRESHER', '1').lower() not in ('0', 'false', 'no', 'off')
+
+# Lock file electing the one process (of a multi-worker WSGI server) that
+# calls the market data API; the others only relay its updates
+QUOTE_REFRESHER_LOCK = os.getenv(
+    'QUOTE_REFRESHER_LOCK',
+    os.path.join(os.path.abspath(os.path.dirname(__file__)), 'cache', 'quote_refresher.lock')
+)
+
+
+class QuoteRefresher:
+    """
+    Background thread keeping the quote columns of every Stock row fresh
+
+    The first pass refreshes every row (startup warm-up); later passes only
+    refetch rows whose last_updated is older than the refresh interval.
+    Rows whose quote values changed are published to the dashboard stream.
+
+    Under a multi-worker server every process starts the thread, but only
+    the one holding QUOTE_REFRESHER_LOCK refreshes; the others read the
+    rows it updated from the database and publish them to their own
+    dashboard streams. If the refreshing process exits, another takes
+    over on its next tick.
+    """
+
+    def __init__(self, interval=QUOTE_REFRESH_INTERVAL, lock_path=QUOTE_REFRESHER_LOCK,
+                 enabled=QUOTE_REFRESHER_ENABLED):
+        self.interval = interval
+        self.lock_path = lock_path
+        self.enabled = enabled
+        self.last_run = None
+        self.last_error = None
+        self.is_leader = False
+
+        self._lock_file = None
+        self._watermark = None  # last_updated of the newest row relayed by a follower
+
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the refresh thread (safe to call more than once)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='quote-refresher', daemon=True)
+            self._thread.start()
+            print(f"Quote refresher started (interval: {self.interval:.0f}s)")
+
+    def stop(self):
+        """Stop the refresh thread after its current pass"""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def trigger(self):
+        """Run a refresh pass now instead of waiting for the next tick"""
+        self._wakeup.set()
+
+    def _acquire_leadership(self):
+        """Try to take the cross-process refresher lock (kept until exit)"""
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            return True
+        try:
+            if self._lock_file is None:
+                os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+                self._lock_file = open(self.lock_path, 'a')
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        self.is_leader = True
+        print(f"Quote refresher lock taken by process {os.getpid()}")
+        return True
+
+    def _run(self):
+        force = True  # warm every row on startup
+        while not self._stopped.is_set():
+            try:
+                if self._acquire_leadership():
+                    self.refresh(force=force)
+                    force = False
+                else:
+                    self.relay()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Quote refresh failed: {e}")
+
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def refresh(self, force=False):
+        """
+        Refresh quote columns for stale stocks in one batch
+
+        Returns:
+            list: the ids of the stocks that were updated
+        """
+        with app.app_context():
+            now = datetime.utcnow()
+            stocks = Stock.query.all()
+            if not force:
+                stocks = [
+                    stock for stock in stocks
+                    if not stock.last_updated or (now - stock.last_updated).total_seconds() >= self.interval
+                ]
+
+            updated = []
+            changed = {}
+            if stocks:
+                quotes, errors = StockService.get_quotes(
+                    ((stock.symbol, stock.market) for stock in stocks),
+                    use_cache=False
+                )
+                for stock in stocks:
+                    data = quotes.get((stock.symbol, stock.market))
+                    if data and data.get('current_price') is not None:
+                        before = [getattr(stock, field) for field in STREAM_FIELDS]
+                        stock.current_price = data['current_price']
+                        stock.change_percent = data.get('change_percent', 0)
+                        stock.eps = data.get('eps')
+                        stock.prospect_return = data.get('prospect_return')  # ROI
+                        stock.roe = data.get('roe')
+                        stock.last_updated = datetime.utcnow()
+                        updated.append(stock.id)
+                        if before != [getattr(stock, field) for field in STREAM_FIELDS]:
+                            changed[stock.id] = quote_row(stock)
+                    elif (stock.symbol, stock.market) in errors:
+                        print(f"Failed to refresh {stock.symbol}: {errors[(stock.symbol, stock.market)]}")
+
+                # Save all updates at once
+                db.session.commit()
+
+            # Push only after the commit so a reconnecting client's snapshot agrees
+            quote_broadcaster.publish(changed)
+
+            self.last_run = datetime.utcnow()
+            print(f"Quote refresh pass updated {len(updated)} of {len(stocks)} stocks ({len(changed)} changed)")
+            return updated
+
+    def relay(self):
+        """
+        Publish the rows another process refreshed since the last relay,
+        from the database, without calling the market data API
+
+        Returns:
+            list: the ids of the stocks published
+        """
+        with app.app_context():
+            query = Stock.query.filter(Stock.last_updated.isnot(None))
+            if self._watermark is not None:
+                query = query.filter(Stock.last_updated > self._watermark)
+            stocks = query.all()
+            if stocks:
+                self._watermark = max(stock.last_updated for stock in stocks)
+                quote_broadcaster.publish({stock.id: quote_row(stock) for stock in stocks})
+            self.last_run = datetime.utcnow()
+            return [stock.id for stock in stocks]
+
+
+# Shared refresher, started by run.py or on the first request
+quote_refresher = QuoteRefresher()
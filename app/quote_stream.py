@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+
+# Seconds between keep-alive comments on an idle stream, so proxies don't
+# close it and disconnected clients are noticed
+QUOTE_STREAM_KEEPALIVE = float(os.getenv('QUOTE_STREAM_KEEPALIVE', 15))
+
+# Quote columns pushed to dashboards
+STREAM_FIELDS = ['current_price', 'change_percent', 'prospect_return', 'eps', 'roe']
+
+
+def quote_row(stock):
+    """The streamed view of a Stock row"""
+    row = {field: getattr(stock, field) for field in STREAM_FIELDS}
+    row['last_updated'] = stock.last_updated.isoformat() if stock.last_updated else None
+    return row
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class _Subscriber:
+    """One connected dashboard; pending changes are merged until it reads them"""
+
+    def __init__(self):
+        self.pending = {}
+        self.event = threading.Event()
+
+
+class QuoteBroadcaster:
+    """
+    Fans quote updates from the shared refresh loop out to every open dashboard
+
+    Each subscriber keeps a dict of pending rows keyed by stock id, so a slow
+    client only ever receives the latest values instead of a growing backlog.
+    """
+
+    def __init__(self, keepalive=QUOTE_STREAM_KEEPALIVE):
+        self.keepalive = keepalive
+        self.published = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = _Subscriber()
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, rows):
+        """Queue changed rows ({stock id: row}) for every subscriber"""
+        if not rows:
+            return
+        with self._lock:
+            self.published += 1
+            for subscriber in self._subscribers:
+                subscriber.pending.update(rows)
+                subscriber.event.set()
+
+    def stream(self, subscriber, snapshot=None):
+        """
+        Generate the SSE stream for one subscriber
+
+        Sends the snapshot (if any) first, then batches of changed rows as
+        the refresh loop publishes them.
+        """
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield f"retry: {int(self.keepalive * 1000)}\n\n"
+            if snapshot:
+                yield sse_event('quotes', snapshot)
+
+            while True:
+                if not subscriber.event.wait(self.keepalive):
+                    yield ": keep-alive\n\n"
+                    continue
+
+                with self._lock:
+                    rows = subscriber.pending
+                    subscriber.pending = {}
+                    subscriber.event.clear()
+                if rows:
+                    yield sse_event('quotes', rows)
+        finally:
+            # Client went away
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'published': self.published}
+
+
+# Shared broadcaster fed by the quote refresher
+quote_broadcaster = QuoteBroadcaster()
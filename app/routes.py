@@ -1,37 +1,56 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify
+from flask import render_template, request, redirect, url_for, flash, jsonify, Response, session, stream_with_context
 from app import app, db
 from app.models import Stock, MarkdownBlog
-from app.stock_service import StockService
+from app.stock_service import StockService, benchmark_series
+from app.quote_cache import quote_cache
+from app.quote_refresher import quote_refresher
+from app.quote_stream import quote_broadcaster, quote_row, sse_event
+from app.bedrock_client import BEDROCK_MODEL_ID
+from app.llm_cache import llm_cache
+from app.llm_executor import llm_executor, LLMBusy, LLMTimeout
+from app.insights_prompt import prompt_stats
+from app.chart_data import CHART_MAX_POINTS
+from app.chart_cache import chart_cache
+from app.symbol_index import symbol_index
+from app.single_flight import single_flight
+from app.market_data_client import market_data
+from app.blog_renderer import BLOG_PAGE_SIZE, blog_pages, render_blog
+from app.stock_order import stock_order, ReorderError
+from app.dashboard_query import (DASHBOARD_PAGE_SIZE, DASHBOARD_VIRTUAL_THRESHOLD, FILTER_COLUMNS,
+                                 DashboardQueryError, dashboard_page, parse_filters)
+from app.portfolio_analytics import ANALYTICS_PERIOD, portfolio_analytics
+from app.portfolio_import import ImportFormatError, iter_import, parse_import, stock_from_data
 from datetime import datetime, date
-import markdown
-import bleach
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import load_only
 import json
 
+@app.before_request
+def ensure_quote_refresher():
+    """
+    Make sure the background quote refresher runs under any WSGI server
+    Only one process refreshes from the market data API (see QuoteRefresher)
+    """
+    quote_refresher.start()
+
 @app.route('/')
 def index():
-    """Display the portfolio dashboard"""
-    stocks = Stock.query.order_by(Stock.display_order).all()
-    
-    # Update latest prices for all stocks
-    for stock in stocks:
-        try:
-            # Only update if it's been a while since last update
-            if not stock.last_updated or (datetime.utcnow() - stock.last_updated).seconds > 3600:
-                data = StockService.get_stock_data(stock.symbol, stock.market)
-                if data and 'current_price' in data:
-                    stock.current_price = data['current_price']
-                    stock.change_percent = data.get('change_percent', 0)
-                    stock.ytd_change_percent = data.get('ytd_change_percent')
-                    stock.eps = data.get('eps')
-                    stock.prospect_return = data.get('prospect_return')  # ROI
-                    stock.roe = data.get('roe')
-                        
-                    stock.last_updated = datetime.utcnow()
-                    db.session.commit()
-        except Exception as e:
-            print(f"Failed to update {stock.symbol}: {e}")
-    
-    return render_template('index.html', stocks=stocks)
+    """
+    Display the portfolio dashboard
+    Large portfolios (or ?view=virtual) get the virtualized table, which
+    loads its rows page by page from /api/dashboard
+    """
+    stock_count = db.session.query(func.count(Stock.id)).scalar()
+    view = request.args.get('view')
+    virtual = view == 'virtual' or (view != 'table' and stock_count > DASHBOARD_VIRTUAL_THRESHOLD)
+    
+    # Quote columns are kept fresh by the background refresher, so
+    # rendering the dashboard is a pure database read
+    stocks = [] if virtual else Stock.query.order_by(Stock.display_order, Stock.id).all()
+    
+    return render_template('index.html', stocks=stocks, stock_count=stock_count, virtual=virtual,
+                           sort_columns=FILTER_COLUMNS, page_size=DASHBOARD_PAGE_SIZE,
+                           stale_after=quote_refresher.interval * 2)
 
 @app.route('/add_stock', methods=['GET', 'POST'])
 def add_stock():
@@ -54,19 +73,7 @@ def add_stock():
             return render_template('add_stock.html')
         
         # Create new stock
-        new_stock = Stock(
-            symbol=symbol,
-            name=stock_data.get('name', symbol),
-            chinese_name=stock_data.get('chinese_name'),
-            market=market,
-            current_price=stock_data.get('current_price'),
-            change_percent=stock_data.get('change_percent'),
-            ytd_change_percent=stock_data.get('ytd_change_percent'),
-            eps=stock_data.get('eps'),
-            prospect_return=stock_data.get('prospect_return'),  # ROI
-            roe=stock_data.get('roe'),
-            last_updated=datetime.utcnow()
-        )
+        new_stock = stock_from_data(symbol, market, stock_data)
         
         db.session.add(new_stock)
         db.session.commit()
@@ -76,52 +83,122 @@ def add_stock():
     
     return render_template('add_stock.html')
 
+@app.route('/import_stocks', methods=['POST'])
+def import_stocks():
+    """
+    API endpoint to import many stocks from a CSV or JSON file
+    Accepts an uploaded 'file' or the file as the request body. Form or
+    query options: market (default for rows without one), dry_run, and
+    stream to get SSE 'progress' events before the final 'done' report
+    """
+    options = request.values
+    upload = request.files.get('file')
+    content = upload.read() if upload else request.get_data()
+    filename = (upload.filename if upload else '') or ''
+    fmt = 'json' if filename.lower().endswith('.json') or request.is_json else \
+        'csv' if filename.lower().endswith('.csv') else None
+    default_market = options.get('market', 'US').upper()
+    dry_run = options.get('dry_run', '').lower() in ('1', 'true', 'yes', 'on')
+    
+    try:
+        rows = parse_import(content, fmt)
+    except (ImportFormatError, UnicodeDecodeError) as e:
+        return jsonify({'error': str(e)}), 400
+    if not rows:
+        return jsonify({'error': 'No stocks found in the file'}), 400
+    
+    events = iter_import(rows, default_market, dry_run)
+    if options.get('stream', '').lower() in ('1', 'true', 'yes', 'on'):
+        def generate():
+            for event in events:
+                yield sse_event(event.pop('event'), event)
+            
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+            }
+        )
+    
+    report = [event for event in events if event['event'] == 'done'][-1]
+    report.pop('event')
+    return jsonify(report), (409 if 'error' in report else 200)
+
 @app.route('/stock/<int:stock_id>')
-def stock_detail(stock_id):
+async def stock_detail(stock_id):
     """Display detailed information for a specific stock"""
     stock = Stock.query.get_or_404(stock_id)
     
-    # Get latest data
-    stock_data = StockService.get_stock_data(stock.symbol, stock.market)
-    
-    # Get balance sheet data
-    try:
-        balance_sheet_data = StockService.get_balance_sheet_data(stock.symbol, stock.market)
-        if balance_sheet_data:
-            print(f"Balance sheet data retrieved for {stock.symbol}")
-        else:
-            print(f"No balance sheet data available for {stock.symbol}")
-    except Exception as e:
-        print(f"Error fetching balance sheet data for {stock.symbol}: {e}")
-        balance_sheet_data = None
+    # Await quote, balance sheet and history concurrently; sections missing
+    # the page deadline are rendered as delayed
+    detail = await StockService.get_stock_detail_async(stock.symbol, stock.market)
+    stock_data = detail['stock_data']
+    balance_sheet_data = detail['balance_sheet_data']
+    hist_data = detail['hist_data']
+    chart_data = detail['chart_data']
+    print(f"Historical data for {stock.symbol}: {len(hist_data) if hist_data is not None else 0} rows, chart: {'Yes' if chart_data else 'No'}")
     
-    # Get historical data for charts (5-year history)
-    try:
-        hist_data = StockService.get_historical_data(stock.symbol, stock.market, period='5y')
-        print(f"Historical data for {stock.symbol}: {type(hist_data)} with {len(hist_data) if hist_data is not None else 0} rows")
-        
-        # Determine index name based on market
-        index_name = "S&P 500"
-        if stock.market == "HK":
-            index_name = "Hang Seng Index"
-        elif stock.market == "CN":
-            index_name = "CSI 300"
-            
-        # Pass stock symbol to the chart generation function
-        chart_data = StockService.generate_chart(hist_data, stock.market, stock_symbol=stock.symbol) if hist_data is not None and not hist_data.empty else None
-        print(f"Chart data generated: {'Yes' if chart_data else 'No'}")
-    except Exception as e:
-        print(f"Error generating chart for {stock.symbol}: {e}")
-        hist_data = None
-        chart_data = None
-        index_name = "Market Index"
+    # Benchmark index of the stock's market (see the overlay below the chart)
+    _, index_name = StockService.MARKET_INDEXES.get(stock.market, StockService.MARKET_INDEXES['US'])
     
     return render_template('stock_detail.html', 
                           stock=stock, 
                           stock_data=stock_data,
                           balance_sheet_data=balance_sheet_data,
                           chart_data=chart_data,
-                          index_name=index_name)
+                          index_name=index_name,
+                          delayed=detail['delayed'])
+
+@app.route('/stock/<int:stock_id>/refresh_fundamentals', methods=['POST'])
+def refresh_fundamentals(stock_id):
+    """Re-fetch the balance sheet of a stock, ignoring the reporting cycle"""
+    stock = Stock.query.get_or_404(stock_id)
+    
+    if StockService.get_balance_sheet_data(stock.symbol, stock.market, refresh=True):
+        flash(f'Refreshed balance sheet data for {stock.symbol}.')
+    else:
+        flash(f'Could not refresh balance sheet data for {stock.symbol}.')
+    return redirect(url_for('stock_detail', stock_id=stock.id))
+
+@app.route('/stock/<int:stock_id>/chart_data')
+def stock_chart_data(stock_id):
+    """API endpoint returning chart series for a zoomed date window"""
+    stock = Stock.query.get_or_404(stock_id)
+    
+    try:
+        start = datetime.strptime(request.args['start'][:10], '%Y-%m-%d') if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'][:10], '%Y-%m-%d') if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+        
+    max_points = min(max(request.args.get('points', CHART_MAX_POINTS, type=int), 50), 5000)
+    
+    chart_data = StockService.get_chart_data(stock.symbol, stock.market, start=start, end=end, max_points=max_points)
+    if not chart_data:
+        return jsonify({'error': 'No chart data for this range'}), 404
+        
+    return jsonify(chart_data)
+
+@app.route('/stock/<int:stock_id>/benchmark_data')
+def stock_benchmark_data(stock_id):
+    """API endpoint returning the stock vs. market index overlay for a date window"""
+    stock = Stock.query.get_or_404(stock_id)
+    
+    try:
+        start = datetime.strptime(request.args['start'][:10], '%Y-%m-%d') if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'][:10], '%Y-%m-%d') if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+        
+    max_points = min(max(request.args.get('points', CHART_MAX_POINTS, type=int), 50), 5000)
+    
+    comparison = StockService.get_benchmark_comparison(stock.symbol, stock.market, start=start, end=end, max_points=max_points)
+    if not comparison:
+        return jsonify({'error': 'No benchmark data for this range'}), 404
+        
+    return jsonify(comparison)
 
 @app.route('/delete_stock/<int:stock_id>', methods=['POST'])
 def delete_stock(stock_id):
@@ -162,39 +239,76 @@ def search_by_name():
     
     return jsonify({'matches': results})
     
+@app.route('/autocomplete')
+def autocomplete():
+    """Type-ahead suggestions from the symbol master (no market data calls)"""
+    query = request.args.get('q', '').strip()
+    market = request.args.get('market') or None
+    
+    if not query:
+        return jsonify({'matches': []})
+    
+    matches = symbol_index.search(query, market=market, limit=8)
+    return jsonify({'matches': [{
+        'symbol': match['symbol'],
+        'market': match['market'],
+        'name': match['name'],
+        'chinese_name': match['chinese_name']
+    } for match in matches]})
+    
 @app.route('/move_stock/<int:stock_id>/<direction>', methods=['POST'])
 def move_stock(stock_id, direction):
-    """Move a stock up or down in the display order"""
+    """Move a stock up or down in the display order (form fallback for /stocks/reorder)"""
     if direction not in ['up', 'down']:
         flash('Invalid direction')
         return redirect(url_for('index'))
         
     stock = Stock.query.get_or_404(stock_id)
-    stocks = Stock.query.order_by(Stock.display_order).all()
-    
-    # Find the current index of the stock
-    current_index = next((i for i, s in enumerate(stocks) if s.id == stock_id), None)
-    if current_index is None:
-        flash('Stock not found')
-        return redirect(url_for('index'))
-        
-    # Calculate new position
-    if direction == 'up' and current_index > 0:
-        # Swap with the stock above
-        prev_stock = stocks[current_index - 1]
-        temp_order = stock.display_order
-        stock.display_order = prev_stock.display_order
-        prev_stock.display_order = temp_order
-    elif direction == 'down' and current_index < len(stocks) - 1:
-        # Swap with the stock below
-        next_stock = stocks[current_index + 1]
-        temp_order = stock.display_order
-        stock.display_order = next_stock.display_order
-        next_stock.display_order = temp_order
     
-    db.session.commit()
+    # Only the moved stock's key changes (see app.stock_order)
+    stock_order.step(stock, direction)
     return redirect(url_for('index'))
 
+@app.route('/stocks/reorder', methods=['POST'])
+def reorder_stocks():
+    """
+    API endpoint to reorder the dashboard
+    JSON body: {"stock_id": id, "position": 0-based index} to move one stock,
+    or {"order": [stock ids]} for a complete new ordering
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        if 'order' in data:
+            if not isinstance(data['order'], list):
+                raise ReorderError("order must be a list of stock ids")
+            updated = stock_order.apply_order([int(stock_id) for stock_id in data['order']])
+        else:
+            stock = db.session.get(Stock, int(data['stock_id']))
+            if stock is None:
+                return jsonify({'error': 'Stock not found'}), 404
+            updated = stock_order.move(stock, int(data['position']))
+    except (KeyError, TypeError, ValueError) as e:
+        # ReorderError is a ValueError
+        message = str(e) if isinstance(e, ReorderError) else 'Provide "stock_id" and "position", or "order"'
+        return jsonify({'error': message}), 400
+        
+    return jsonify({'updated': updated})
+
+@app.route('/portfolio/analytics')
+def get_portfolio_analytics():
+    """
+    API endpoint for portfolio return, volatility, beta, max drawdown and
+    correlations over ?period= (default ANALYTICS_PERIOD); sync=0 uses
+    only the history already stored locally
+    """
+    period = request.args.get('period', ANALYTICS_PERIOD)
+    sync = request.args.get('sync', '1').lower() not in ('0', 'false', 'no')
+    try:
+        return jsonify(portfolio_analytics.analyze(period=period, sync=sync))
+    except ValueError as e:
+        # Unsupported period
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/get_latest_stock_data/<int:stock_id>')
 def get_latest_stock_data(stock_id):
     """API endpoint to get the latest stock data for auto-refresh"""
@@ -208,42 +322,111 @@ def get_latest_stock_data(stock_id):
     
     return jsonify(stock_data)
 
+@app.route('/api/dashboard')
+def dashboard_api():
+    """
+    API endpoint for one page of the dashboard table
+    ?sort=<column>&dir=asc|desc, market=US|HK|CN, min_<column>= / max_<column>=
+    thresholds, limit= and after=<cursor> (the 'next' of the previous page)
+    """
+    try:
+        market, thresholds = parse_filters(request.args)
+        page = dashboard_page(
+            sort=request.args.get('sort', 'display_order'),
+            direction=request.args.get('dir', 'asc'),
+            market=market,
+            thresholds=thresholds,
+            after=request.args.get('after') or None,
+            limit=request.args.get('limit', DASHBOARD_PAGE_SIZE, type=int)
+        )
+    except DashboardQueryError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    return jsonify(page)
+
 @app.route('/get_all_stocks_data')
 def get_all_stocks_data():
     """API endpoint to get latest data for all stocks in portfolio"""
-    stocks = Stock.query.order_by(Stock.display_order).all()
-    result = {}
+    # Reads what the background refresher stored; it never calls the market
+    # data API, however many clients ask
+    stocks = Stock.query.order_by(Stock.display_order, Stock.id).all()
+    return jsonify({stock.id: quote_row(stock) for stock in stocks if stock.current_price is not None})
+
+@app.route('/stream/quotes')
+def stream_quotes():
+    """Server-Sent Events stream of quote updates from the shared refresher"""
+    subscriber = quote_broadcaster.subscribe()
+    # Snapshot after subscribing, so no update can fall between the two
+    stocks = Stock.query.all()
+    snapshot = {stock.id: quote_row(stock) for stock in stocks if stock.current_price is not None}
+    db.session.remove()  # Don't hold a connection for the life of the stream
+    
+    return Response(
+        quote_broadcaster.stream(subscriber, snapshot),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+        }
+    )
     
-    for stock in stocks:
+@app.route('/admin/cache_stats')
+def cache_stats():
+    """API endpoint exposing cache counters for sizing and monitoring"""
+    return jsonify({
+        'quote_cache': quote_cache.stats(),
+        'chart_cache': chart_cache.stats(),
+        'symbol_index': symbol_index.stats(),
+        'quote_stream': quote_broadcaster.stats(),
+        'single_flight': single_flight.stats(),
+        'market_data': market_data.stats(),
+        'llm_cache': llm_cache.stats(),
+        'llm_executor': llm_executor.stats(),
+        'insights_prompt': prompt_stats.stats(),
+        'blog_pages': blog_pages.stats(),
+        'stock_order': stock_order.stats(),
+        'portfolio_analytics': portfolio_analytics.stats(),
+        'benchmark_series': benchmark_series.stats()
+    })
+
+def stock_data_version(stock):
+    """Data version for chatbot answers about a stock: its quote date"""
+    quote_date = (stock.last_updated or datetime.utcnow()).date()
+    return f"{stock.symbol}:{stock.market}:{quote_date.isoformat()}"
+
+@app.errorhandler(LLMBusy)
+@app.errorhandler(LLMTimeout)
+def llm_overloaded(e):
+    """Chatbot queue full (429) or reply timed out (503); clients retry after Retry-After"""
+    status = 429 if isinstance(e, LLMBusy) else 503
+    return jsonify({'error': str(e), 'retry_after': e.retry_after}), status, {'Retry-After': str(e.retry_after)}
+
+def insights_stream(user_message, data_version=None, stock=None, **extra):
+    """
+    SSE response relaying the chatbot reply as it is generated:
+    'token' events carry text chunks, 'done' closes the stream and
+    'error' ends it early if the reply times out
+    """
+    cached, chunks = StockService.stream_stock_insights(user_message, data_version, stock)
+    
+    def generate():
         try:
-            # Get latest data for this stock
-            data = StockService.get_stock_data(stock.symbol, stock.market)
-            
-            if data and 'current_price' in data:
-                # Update stock in database
-                stock.current_price = data['current_price']
-                stock.change_percent = data.get('change_percent', 0)
-                
-                # Calculate updated ROI (Prospect Return) = (EPS / Price) * 100
-                if stock.eps and stock.current_price > 0:
-                    stock.prospect_return = (stock.eps / stock.current_price) * 100
-                
-                stock.last_updated = datetime.utcnow()
-                
-                # Add to result - price, change percent, and ROI for frequent updates
-                result[stock.id] = {
-                    'current_price': stock.current_price,
-                    'change_percent': stock.change_percent,
-                    'prospect_return': stock.prospect_return
-                }
-        except Exception as e:
-            print(f"Failed to update {stock.symbol}: {e}")
-            
-    # Save all updates at once
-    db.session.commit()
-    
-    return jsonify(result)
-    
+            for text in chunks:
+                yield sse_event('token', {'text': text})
+        except LLMTimeout as e:
+            yield sse_event('error', {'error': str(e), 'retry_after': e.retry_after})
+            return
+        yield sse_event('done', dict(extra, model_id=BEDROCK_MODEL_ID, cached=cached))
+        
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+        }
+    )
+
 @app.route('/stock_insights/<int:stock_id>', methods=['POST'])
 def stock_insights(stock_id):
     """API endpoint for LLM chatbot responses about a stock"""
@@ -255,20 +438,23 @@ def stock_insights(stock_id):
         return jsonify({'error': 'No message provided'}), 400
         
     user_message = data['message']
+    data_version = stock_data_version(stock)
     
-    # Get insight from LLM via the service
-    response = StockService.get_stock_insights(user_message)
+    # Stream tokens as they are generated if the client asks for it
+    if data.get('stream'):
+        return insights_stream(user_message, data_version, stock, stock_symbol=stock.symbol, stock_name=stock.name)
     
-    # Get the model ID (fallback to default if not available)
-    import os
-    model_id = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-7-sonnet-20250219-v1:0')
+    # Get insight from LLM via the service (or the response cache), grounded
+    # in the stock's locally held data
+    response, cached = StockService.get_stock_insights(user_message, data_version, stock)
     
     # Return response as JSON
     return jsonify({
         'response': response,
         'stock_symbol': stock.symbol,
         'stock_name': stock.name,
-        'model_id': model_id
+        'model_id': BEDROCK_MODEL_ID,
+        'cached': cached
     })
     
 @app.route('/dashboard_insights', methods=['POST'])
@@ -281,27 +467,70 @@ def dashboard_insights():
         return jsonify({'error': 'No message provided'}), 400
         
     user_message = data['message']
+    data_version = f"dashboard:{date.today().isoformat()}"
     
-    # Get insight from LLM via the service
-    response = StockService.get_stock_insights(user_message)
+    # Stream tokens as they are generated if the client asks for it
+    if data.get('stream'):
+        return insights_stream(user_message, data_version)
     
-    # Get the model ID (fallback to default if not available)
-    import os
-    model_id = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-7-sonnet-20250219-v1:0')
+    # Get insight from LLM via the service (or the response cache)
+    response, cached = StockService.get_stock_insights(user_message, data_version)
     
     # Return response as JSON
     return jsonify({
         'response': response,
-        'model_id': model_id
+        'model_id': BEDROCK_MODEL_ID,
+        'cached': cached
     })
+
+@app.route('/admin/llm_cache/purge', methods=['POST'])
+def purge_llm_cache():
+    """
+    API endpoint to purge cached chatbot responses
+    Optional JSON body: {"model_id": "...", "older_than": seconds}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        older_than = float(data['older_than']) if data.get('older_than') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'older_than must be a number of seconds'}), 400
+        
+    purged = llm_cache.purge(model_id=data.get('model_id'), older_than=older_than)
+    return jsonify({'purged': purged})
     
 # ValueMD Blog Routes
 
 @app.route('/blogs')
 def markdown_blogs():
-    """Display all markdown blogs"""
-    blogs = MarkdownBlog.query.order_by(MarkdownBlog.updated_at.desc()).all()
-    return render_template('markdown_blogs.html', blogs=blogs)
+    """
+    Display markdown blogs, most recently updated first, a page at a time
+    ?before=<cursor> continues after the last post of the previous page
+    """
+    # Only the listing columns; content and rendered HTML stay unloaded
+    query = MarkdownBlog.query.options(load_only(
+        MarkdownBlog.id, MarkdownBlog.title, MarkdownBlog.excerpt, MarkdownBlog.created_at,
+        MarkdownBlog.updated_at, MarkdownBlog.is_published
+    ))
+    
+    before = request.args.get('before')
+    if before:
+        try:
+            updated_at, blog_id = before.rsplit('_', 1)
+            query = query.filter(
+                tuple_(MarkdownBlog.updated_at, MarkdownBlog.id) < (datetime.fromisoformat(updated_at), int(blog_id))
+            )
+        except ValueError:
+            return redirect(url_for('markdown_blogs'))
+            
+    # Keyset pagination on (updated_at, id), served by its index
+    blogs = query.order_by(MarkdownBlog.updated_at.desc(), MarkdownBlog.id.desc()).limit(BLOG_PAGE_SIZE + 1).all()
+    next_cursor = None
+    if len(blogs) > BLOG_PAGE_SIZE:
+        blogs = blogs[:BLOG_PAGE_SIZE]
+        last = blogs[-1]
+        next_cursor = f"{last.updated_at.isoformat()}_{last.id}"
+        
+    return render_template('markdown_blogs.html', blogs=blogs, next_cursor=next_cursor, is_first_page=not before)
 
 @app.route('/blogs/create', methods=['GET', 'POST'])
 def create_blog():
@@ -318,6 +547,7 @@ def create_blog():
             title=title,
             content=content
         )
+        render_blog(new_blog)
         
         db.session.add(new_blog)
         db.session.commit()
@@ -332,35 +562,32 @@ def view_blog(blog_id):
     """View a markdown blog"""
     blog = MarkdownBlog.query.get_or_404(blog_id)
     
-    # Convert markdown to HTML (with sanitization for security)
-    html_content = markdown.markdown(
-        blog.content,
-        extensions=['extra', 'codehilite', 'nl2br', 'tables']
-    )
-    
-    # Sanitize HTML to prevent XSS attacks
-    allowed_tags = [
-        'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-        'p', 'a', 'abbr', 'acronym', 'b', 'blockquote',
-        'code', 'em', 'i', 'li', 'ol', 'strong', 'ul',
-        'br', 'del', 'ins', 'img', 'pre', 'table', 'tbody',
-        'td', 'th', 'thead', 'tr', 'hr', 'span', 'div'
-    ]
-    
-    allowed_attrs = {
-        '*': ['class', 'style'],
-        'a': ['href', 'title', 'rel'],
-        'img': ['src', 'alt', 'title', 'width', 'height']
-    }
-    
-    sanitized_html = bleach.clean(
-        html_content,
-        tags=allowed_tags,
-        attributes=allowed_attrs,
-        strip=True
-    )
-    
-    return render_template('view_blog.html', blog=blog, rendered_content=sanitized_html)
+    # The sanitized HTML is rendered on save; this only catches posts saved
+    # before that, or rendered with an older configuration
+    if render_blog(blog):
+        db.session.commit()
+        
+    # Drafts and pages carrying flash messages are rendered per request
+    if not blog.is_published or session.get('_flashes'):
+        return render_template('view_blog.html', blog=blog, rendered_content=blog.rendered_html)
+        
+    # Published posts are served from precompressed pages
+    key = blog_pages.page_key(blog, datetime.utcnow().year)
+    compressed = 'gzip' in request.accept_encodings
+    body = blog_pages.get(key, compressed)
+    if body is None:
+        page = render_template('view_blog.html', blog=blog, rendered_content=blog.rendered_html)
+        blog_pages.put(key, page)
+        body = blog_pages.get(key, compressed)
+        if body is None:
+            return page
+            
+    response = Response(body, mimetype='text/html')
+    if compressed:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.set_etag(f"{key}{'-gz' if compressed else ''}")
+    return response.make_conditional(request)
 
 @app.route('/blogs/<int:blog_id>/edit', methods=['GET', 'POST'])
 def edit_blog(blog_id):
@@ -378,8 +605,10 @@ def edit_blog(blog_id):
         blog.title = title
         blog.content = content
         blog.updated_at = datetime.utcnow()
+        render_blog(blog)
         
         db.session.commit()
+        blog_pages.invalidate(blog.id)
         
         flash('Blog updated successfully!')
         return redirect(url_for('view_blog', blog_id=blog.id))
@@ -393,6 +622,7 @@ def delete_blog(blog_id):
     
     db.session.delete(blog)
     db.session.commit()
+    blog_pages.invalidate(blog_id)
     
     flash('Blog deleted successfully!')
     return redirect(url_for('markdown_blogs'))
@@ -404,6 +634,8 @@ def toggle_publish(blog_id):
     
     blog.is_published = not blog.is_published
     db.session.commit()
+    if not blog.is_published:
+        blog_pages.invalidate(blog.id)
     
     status = 'published' if blog.is_published else 'unpublished'
     flash(f'Blog {status} successfully!')
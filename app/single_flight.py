@@ -0,0 +1,79 @@
+import threading
+from collections import Counter
+
+
+class _Call:
+    """An upstream call in progress, shared by everyone asking for its key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one upstream call
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait and get the same result, or the same exception. Keys start with
+    the method name, e.g. ('history', 'AAPL', 'US', '5y'), which is also how
+    the counters are grouped.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.executions = Counter()
+        self.deduplicated = Counter()
+        self.errors = Counter()
+
+    def do(self, key, fn):
+        """Run fn() for key, or wait for the call already running for it"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions[key[0]] += 1
+            else:
+                self.deduplicated[key[0]] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.errors[key[0]] += 1
+            raise
+        finally:
+            # Later callers start a fresh call; waiters already hold this one
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self):
+        """Get per-method counters of executed and deduplicated calls"""
+        with self._lock:
+            in_flight = Counter(key[0] for key in self._calls)
+            return {
+                method: {
+                    'executions': self.executions[method],
+                    'deduplicated': self.deduplicated[method],
+                    'errors': self.errors[method],
+                    'in_flight': in_flight[method],
+                }
+                for method in sorted(set(self.executions) | set(self.deduplicated))
+            }
+
+
+# Shared coalescing layer used by StockService
+single_flight = SingleFlight()
@@ -0,0 +1,99 @@
+// Streaming helpers for the ValueBot chat (dashboard and stock detail)
+
+// POST a message to an insights endpoint and read its Server-Sent Events
+// reply, calling onToken(text) per chunk. Resolves with the 'done' payload.
+// When the chatbot is busy or times out it rejects with an Error whose
+// busy flag is set and whose message can be shown to the user.
+async function streamInsights(url, message, onToken) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ message: message, stream: true }),
+    });
+    if (response.status === 429 || response.status === 503) {
+        const body = await response.json().catch(function() { return {}; });
+        throw busyError(body.error, body.retry_after || response.headers.get('Retry-After'));
+    }
+    if (!response.ok || !response.body) {
+        throw new Error(`Insights request failed: HTTP ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(function(line) {
+                if (line.startsWith('event: ')) eventName = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (!data) continue;
+
+            const payload = JSON.parse(data);
+            if (eventName === 'token') onToken(payload.text);
+            else if (eventName === 'done') result = payload;
+            else if (eventName === 'error') throw busyError(payload.error, payload.retry_after);
+        }
+    }
+    return result;
+}
+
+function busyError(message, retryAfter) {
+    let text = message || 'The chatbot is busy, please try again shortly';
+    if (retryAfter) text += ` (retry in about ${retryAfter}s)`;
+    const error = new Error(text);
+    error.busy = true;
+    return error;
+}
+
+// Escape the reply and convert line breaks and bullet points for display
+function formatChatText(text) {
+    const escaped = $('<div>').text(text).html();
+    return escaped.replace(/\n/g, '<br>').replace(/•/g, '&bull;');
+}
+
+// Readable model name, e.g. 'anthropic.claude-3-sonnet-20240229-v1:0' -> 'Claude 3 Sonnet'
+function modelDisplayName(modelId) {
+    const match = modelId ? modelId.match(/claude-(\d+)-([a-z]+)/i) : null;
+    return match ? `Claude ${match[1]} ${match[2].charAt(0).toUpperCase() + match[2].slice(1)}` : null;
+}
+
+// Append an empty assistant bubble that streamed text is written into
+function startAssistantMessage(chatContainer) {
+    const message = document.createElement('div');
+    message.className = 'chat-message assistant';
+    message.innerHTML = '<div class="chat-bubble"><p></p></div>';
+    chatContainer.appendChild(message);
+
+    const paragraph = message.querySelector('p');
+    let text = '';
+    return {
+        append: function(chunk) {
+            text += chunk;
+            paragraph.innerHTML = formatChatText(text);
+            chatContainer.scrollTop = chatContainer.scrollHeight;
+        },
+        finish: function(modelId, cached) {
+            const name = modelDisplayName(modelId);
+            if (name) {
+                const note = cached ? `Via ${name} (cached answer)` : `Via ${name}`;
+                $(message).find('.chat-bubble').append($('<small class="text-muted d-block mt-1">').text(note));
+            }
+        }
+    };
+}
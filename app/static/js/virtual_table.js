@@ -0,0 +1,135 @@
+// Virtualized dashboard table for large portfolios
+//
+// Rows come from /api/dashboard a page at a time (keyset pagination, so
+// pages are fetched in order as the user scrolls) and only the rows in
+// view, plus a few either side, are in the DOM. Two spacer rows stand in
+// for everything above and below, so the scrollbar matches the full list.
+
+function escapeHtml(text) {
+    return String(text ?? '').replace(/[&<>"']/g, char => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[char]);
+}
+
+class VirtualTable {
+    constructor(options) {
+        this.viewport = options.viewport;       // scrolling element
+        this.tbody = options.tbody;             // tbody the rows are drawn into
+        this.url = options.url;
+        this.pageSize = options.pageSize || 100;
+        this.rowHeight = options.rowHeight || 49;
+        this.columns = options.columns;         // for the spacer rows' colspan
+        this.renderRow = options.renderRow;     // row data -> <tr> HTML
+        this.onTotal = options.onTotal || function() {};
+        this.overscan = 10;
+
+        this.params = {};
+        this.rows = [];
+        this.rowIndex = new Map();              // stock id -> index in rows
+        this.next = undefined;                  // undefined: not loaded yet, null: no more pages
+        this.total = 0;
+        this.loading = null;
+        this.generation = 0;
+        this.frame = null;
+
+        this.viewport.addEventListener('scroll', () => this.scheduleRender());
+        window.addEventListener('resize', () => this.scheduleRender());
+    }
+
+    // Start over with new sort and filter parameters
+    reset(params) {
+        this.params = params;
+        this.rows = [];
+        this.rowIndex = new Map();
+        this.next = undefined;
+        this.total = 0;
+        this.loading = null;
+        this.generation += 1;
+        this.viewport.scrollTop = 0;
+        this.render();
+    }
+
+    // Fetch the next page; concurrent callers share the request
+    loadMore() {
+        if (this.next === null) return Promise.resolve();
+        if (this.loading) return this.loading;
+
+        const generation = this.generation;
+        const params = new URLSearchParams(this.params);
+        params.set('limit', this.pageSize);
+        if (this.next) params.set('after', this.next);
+
+        this.loading = fetch(`${this.url}?${params.toString()}`)
+            .then(response => response.json().then(body => {
+                if (!response.ok) throw new Error(body.error || `HTTP ${response.status}`);
+                return body;
+            }))
+            .then(page => {
+                if (generation !== this.generation) return;  // parameters changed meanwhile
+                page.stocks.forEach(row => {
+                    this.rowIndex.set(row.id, this.rows.length);
+                    this.rows.push(row);
+                });
+                this.next = page.next;
+                if (page.total !== undefined) {
+                    this.total = page.total;
+                    this.onTotal(page.total);
+                }
+            })
+            .finally(() => {
+                if (generation === this.generation) this.loading = null;
+            });
+        return this.loading;
+    }
+
+    scheduleRender() {
+        if (this.frame) return;
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            this.render();
+        });
+    }
+
+    async render() {
+        const visible = Math.ceil(this.viewport.clientHeight / this.rowHeight);
+        const first = Math.max(0, Math.floor(this.viewport.scrollTop / this.rowHeight) - this.overscan);
+        const last = first + visible + 2 * this.overscan;
+
+        // Pages arrive in order, so reaching row `last` means loading every page before it
+        const generation = this.generation;
+        while (this.rows.length < last && this.next !== null) {
+            try {
+                await this.loadMore();
+            } catch (error) {
+                this.tbody.innerHTML = this.spacer(0) +
+                    `<tr><td colspan="${this.columns}" class="text-danger text-center">${escapeHtml(error.message)}</td></tr>`;
+                return;
+            }
+            if (generation !== this.generation) return;
+        }
+
+        const end = Math.min(last, this.rows.length);
+        const html = [this.spacer(first * this.rowHeight)];
+        for (let index = first; index < end; index++) {
+            html.push(this.renderRow(this.rows[index]));
+        }
+        if (!this.rows.length) {
+            html.push(`<tr><td colspan="${this.columns}" class="text-muted text-center">No stocks match these filters</td></tr>`);
+        }
+        html.push(this.spacer(Math.max(0, this.total - end) * this.rowHeight));
+        this.tbody.innerHTML = html.join('');
+    }
+
+    spacer(height) {
+        return `<tr class="vt-spacer" aria-hidden="true"><td colspan="${this.columns}" style="height: ${height}px; padding: 0; border: 0;"></td></tr>`;
+    }
+
+    // Merge streamed quote updates ({stock id: fields}) into loaded rows,
+    // so rows scrolled back into view show the latest values
+    updateRows(data) {
+        for (const [stockId, fields] of Object.entries(data)) {
+            const index = this.rowIndex.get(Number(stockId));
+            if (index !== undefined) Object.assign(this.rows[index], fields);
+        }
+    }
+}
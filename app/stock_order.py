@@ -0,0 +1,268 @@
+import bisect
+import threading
+
+from sqlalchemy import text, tuple_
+
+from app import app, db
+from app.models import ORDER_GAP, Stock
+
+# Rebalance in the background once a move leaves a gap smaller than this
+MIN_GAP = 4
+
+# Renumber every stock ORDER_GAP apart, keeping the current order, in one statement
+REBALANCE_SQL = """
+    UPDATE stock SET display_order = (
+        SELECT numbered.position * :gap FROM (
+            SELECT id, ROW_NUMBER() OVER (ORDER BY display_order, id) AS position FROM stock
+        ) AS numbered
+        WHERE numbered.id = stock.id
+    )
+"""
+
+
+class ReorderError(ValueError):
+    """Invalid reorder request"""
+
+
+def order_key(stock):
+    """Sort key of a stock in the dashboard (ties broken by id)"""
+    return (stock.display_order, stock.id)
+
+
+class StockOrder:
+    """
+    Sparse display_order keys for the dashboard
+
+    Moving a stock rewrites only its own key, to the midpoint of its new
+    neighbors' keys. When a gap runs out the keys are respaced in one
+    statement: in the background once gaps get small, or inline if a move
+    finds no room at all.
+    """
+
+    def __init__(self):
+        self._rebalancing = False
+        self._lock = threading.Lock()
+        # Serializes key changes, so a move never computes its key from
+        # neighbors a concurrent rebalance is renumbering
+        self._write_lock = threading.RLock()
+
+        self.moves = 0
+        self.rows_updated = 0
+        self.rebalances = 0
+
+    def _neighbors(self, stock, position):
+        """The stocks that will sit just before and after stock at position (0-based)"""
+        others = Stock.query.filter(Stock.id != stock.id).order_by(Stock.display_order, Stock.id)
+        if position <= 0:
+            return None, others.first()
+        pair = others.offset(position - 1).limit(2).all()
+        before = pair[0] if pair else None
+        after = pair[1] if len(pair) > 1 else None
+        if before is None:
+            # Past the end
+            before = others.order_by(None).order_by(Stock.display_order.desc(), Stock.id.desc()).first()
+        return before, after
+
+    @staticmethod
+    def _step_neighbors(stock, direction):
+        """The stocks that will sit around stock after moving it one place up or down"""
+        if direction == 'up':
+            above = Stock.query.filter(tuple_(Stock.display_order, Stock.id) < order_key(stock)) \
+                .order_by(Stock.display_order.desc(), Stock.id.desc()).limit(2).all()
+            if not above:
+                return None, None
+            return (above[1] if len(above) > 1 else None), above[0]
+        below = Stock.query.filter(tuple_(Stock.display_order, Stock.id) > order_key(stock)) \
+            .order_by(Stock.display_order, Stock.id).limit(2).all()
+        if not below:
+            return None, None
+        return below[0], (below[1] if len(below) > 1 else None)
+
+    def move(self, stock, position):
+        """
+        Move a stock to a 0-based position in the dashboard and commit
+
+        Returns:
+            int: number of rows whose key changed
+        """
+        if position < 0:
+            raise ReorderError("position must be 0 or more")
+        with self._write_lock:
+            return self._place(stock, lambda: self._neighbors(stock, position))
+
+    def step(self, stock, direction):
+        """Move a stock one place 'up' or 'down' and commit"""
+        if direction not in ('up', 'down'):
+            raise ReorderError("direction must be 'up' or 'down'")
+        with self._write_lock:
+            return self._place(stock, lambda: self._step_neighbors(stock, direction))
+
+    def _place(self, stock, find_neighbors):
+        """Give stock the key between the neighbors find_neighbors() returns"""
+        db.session.refresh(stock)
+        for attempt in range(2):
+            before, after = find_neighbors()
+            if before is None and after is None:
+                return 0  # Nowhere to go
+            if stock.display_order is not None and \
+                    (before is None or order_key(before) < order_key(stock)) and \
+                    (after is None or order_key(stock) < order_key(after)):
+                return 0  # Already there
+
+            if before is None:
+                key, gap = after.display_order - ORDER_GAP, ORDER_GAP
+            elif after is None:
+                key, gap = before.display_order + ORDER_GAP, ORDER_GAP
+            else:
+                gap = after.display_order - before.display_order
+                key = before.display_order + gap // 2
+
+            if gap >= 2:
+                break
+            # No room between the neighbors: respace now and retry
+            self.rebalance()
+        else:
+            raise ReorderError("Could not find room for the stock")
+
+        stock.display_order = key
+        db.session.commit()
+        with self._lock:
+            self.moves += 1
+            self.rows_updated += 1
+        if gap // 2 < MIN_GAP:
+            self.rebalance_in_background()
+        return 1
+
+    def apply_order(self, stock_ids):
+        """
+        Apply a complete new ordering of the portfolio's stock IDs and commit
+
+        Stocks already in relative order keep their keys (the longest run
+        of increasing keys); only the others are rewritten.
+
+        Returns:
+            int: number of rows whose key changed
+        """
+        with self._write_lock:
+            return self._apply_order(stock_ids)
+
+    def _apply_order(self, stock_ids):
+        # Start from committed keys, not ones loaded before the lock was taken
+        db.session.expire_all()
+        stocks = {stock.id: stock for stock in Stock.query.all()}
+        if len(stock_ids) != len(set(stock_ids)) or set(stock_ids) != set(stocks):
+            raise ReorderError("order must list every stock exactly once")
+
+        ordered = [stocks[stock_id] for stock_id in stock_ids]
+        keep = self._longest_increasing(ordered)
+        keys = self._fill_keys(ordered, keep)
+        if keys is None:
+            # Not enough room between the kept keys: respace the whole list
+            keys = [(index + 1) * ORDER_GAP for index in range(len(ordered))]
+
+        changed = [
+            {'id': stock.id, 'order': key}
+            for stock, key in zip(ordered, keys)
+            if stock.display_order != key
+        ]
+        if changed:
+            db.session.execute(text("UPDATE stock SET display_order = :order WHERE id = :id"), changed)
+        db.session.commit()
+        with self._lock:
+            self.moves += 1
+            self.rows_updated += len(changed)
+        return len(changed)
+
+    @staticmethod
+    def _longest_increasing(ordered):
+        """Indexes of the longest subsequence whose current keys already increase"""
+        tail_keys = []  # smallest key ending a run of each length
+        tail_indexes = []
+        previous = [None] * len(ordered)
+        for index, stock in enumerate(ordered):
+            if stock.display_order is None:
+                continue
+            key = order_key(stock)
+            length = bisect.bisect_left(tail_keys, key)
+            previous[index] = tail_indexes[length - 1] if length else None
+            if length == len(tail_keys):
+                tail_keys.append(key)
+                tail_indexes.append(index)
+            else:
+                tail_keys[length] = key
+                tail_indexes[length] = index
+
+        keep = set()
+        index = tail_indexes[-1] if tail_indexes else None
+        while index is not None:
+            keep.add(index)
+            index = previous[index]
+        return keep
+
+    @staticmethod
+    def _fill_keys(ordered, keep):
+        """Keys for every position, spreading moved stocks between kept ones; None if they don't fit"""
+        keys = [stock.display_order if index in keep else None for index, stock in enumerate(ordered)]
+        index = 0
+        while index < len(keys):
+            if keys[index] is not None:
+                index += 1
+                continue
+            end = index
+            while end < len(keys) and keys[end] is None:
+                end += 1
+            count = end - index
+            low = keys[index - 1] if index > 0 else None
+            high = keys[end] if end < len(keys) else None
+            if low is None and high is None:
+                return None
+            if low is None:
+                low = high - (count + 1) * ORDER_GAP
+            if high is None:
+                high = low + (count + 1) * ORDER_GAP
+            step = (high - low) // (count + 1)
+            if step < 1:
+                return None
+            for offset in range(count):
+                keys[index + offset] = low + step * (offset + 1)
+            index = end
+        return keys
+
+    def rebalance(self):
+        """Respace every key ORDER_GAP apart, keeping the order, and commit"""
+        with self._write_lock:
+            db.session.execute(text(REBALANCE_SQL), {'gap': ORDER_GAP})
+            db.session.commit()
+        with self._lock:
+            self.rebalances += 1
+        print("Rebalanced stock display order keys")
+
+    def rebalance_in_background(self):
+        with self._lock:
+            if self._rebalancing:
+                return
+            self._rebalancing = True
+
+        def run():
+            try:
+                with app.app_context():
+                    self.rebalance()
+            except Exception as e:
+                print(f"Error rebalancing stock display order: {e}")
+            finally:
+                with self._lock:
+                    self._rebalancing = False
+
+        threading.Thread(target=run, name='stock-order-rebalance', daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'moves': self.moves,
+                'rows_updated': self.rows_updated,
+                'rebalances': self.rebalances,
+            }
+
+
+# Shared reordering helper for the dashboard routes
+stock_order = StockOrder()
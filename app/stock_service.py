@@ -2,193 +2,135 @@ import yfinance as yf
 import pandas as pd
 import requests
 from datetime import datetime, date
-import plotly.graph_objs as go
 import json
 from decimal import Decimal
 import locale
 import os
-import boto3
+import re
+import time
+import asyncio
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app import app
+from app.quote_cache import quote_cache
+from app.history_store import HistoryStore
+from app.benchmark_series import BenchmarkSeries, relative_performance
+from app.fundamentals_cache import FundamentalsCache
+from app.chart_data import CHART_MAX_POINTS, build_chart_series, series_to_json
+from app.chart_cache import chart_cache
+from app.chart_serializer import figure_json, plotly_figure_json
+from app.symbol_index import symbol_index
+from app.single_flight import single_flight
+from app.market_data_client import market_data
+from app.llm_cache import llm_cache
+from app.llm_executor import llm_executor, LLMBusy, LLMTimeout
+from app.bedrock_client import BEDROCK_MODEL_ID, get_bedrock_client, claude_request_body, stream_text
+from app.insights_prompt import (INSIGHTS_SYSTEM_PROMPT, INSIGHTS_CONTEXT_TOKENS, count_tokens, fit_to_budget,
+                                 build_user_prompt, prompt_stats)
+
+# History store market key of the benchmark index series
+# (their Yahoo tickers are used as symbols as-is)
+INDEX_MARKET = 'INDEX'
+
+# Batched quote fetching (see StockService.get_quotes)
+QUOTE_BATCH_SIZE = 50
+QUOTE_MAX_WORKERS = 8
+
+# Seconds the stock detail page waits for its data before rendering
+# the missing sections as delayed
+DETAIL_PAGE_DEADLINE = float(os.getenv('DETAIL_PAGE_DEADLINE', 3.0))
+
+# Shared pool for the detail page fan-out; it outlives each request so
+# sections that miss the deadline can finish in the background
+_detail_executor = ThreadPoolExecutor(max_workers=12, thread_name_prefix='stock-detail')
+
+# Graceful chatbot replies for failures; never stored in the response cache
+LLM_ERROR_RESPONSE = "Sorry, I encountered an error while processing your request."
+LLM_UNAVAILABLE_RESPONSE = "I'm having trouble accessing the AI service right now. Please try again later."
+LLM_FAILED_RESPONSE = "I'm having trouble generating a response right now. Please try again later."
+LLM_FALLBACK_RESPONSES = {LLM_ERROR_RESPONSE, LLM_UNAVAILABLE_RESPONSE, LLM_FAILED_RESPONSE}
 
 class StockService:
     @staticmethod
-    def search_by_name(name, market='US'):
+    def search_by_name(name, market='US', limit=10):
         """
         Search for stocks by company name in a specific market
         Returns a list of potential matches with symbol and name
+
+        Matches ticker, English name, Chinese name or pinyin against the
+        offline symbol master (see build_symbol_master.py), with no API calls
         """
         try:
-            # Use yfinance to search by name
-            # This is a basic implementation - in production you might want to use a more robust API
-            results = []
-            
-            # Perform search based on the market
-            if market == 'US':
-                # Try direct symbol search first - handle common tickers
-                # Map for common company names to their symbols
-                common_companies = {
-                    'nvidia': 'NVDA',
-                    'apple': 'AAPL',
-                    'microsoft': 'MSFT',
-                    'amazon': 'AMZN',
-                    'google': 'GOOGL',
-                    'alphabet': 'GOOGL',
-                    'tesla': 'TSLA',
-                    'meta': 'META',
-                    'facebook': 'META',
-                    'netflix': 'NFLX',
-                    'berkshire': 'BRK-B',
-                    'berkshire hathaway': 'BRK-B',
-                    'jpmorgan': 'JPM',
-                    'j.p. morgan': 'JPM',
-                    'coca cola': 'KO',
-                    'coca-cola': 'KO',
-                    'disney': 'DIS',
-                    'walmart': 'WMT',
-                    'johnson & johnson': 'JNJ',
-                    'johnson and johnson': 'JNJ',
-                    'visa': 'V',
-                    'mastercard': 'MA',
-                    'intel': 'INTC',
-                    'amd': 'AMD',
-                    'qualcomm': 'QCOM',
-                    'ibm': 'IBM'
-                }
-                
-                # Check if name matches any common company
-                name_lower = name.lower()
-                for company_name, symbol in common_companies.items():
-                    if company_name in name_lower or name_lower in company_name:
-                        try:
-                            stock = yf.Ticker(symbol)
-                            stock_info = stock.info
-                            if stock_info and ('shortName' in stock_info or 'longName' in stock_info):
-                                stock_name = stock_info.get('shortName', '') or stock_info.get('longName', '')
-                                return [{
-                                    'symbol': symbol,
-                                    'name': stock_name
-                                }]
-                        except Exception as e:
-                            print(f"Error checking common company {company_name} ({symbol}): {e}")
-                            continue
-            
-                # Try direct ticker search as a fallback  
-                try:
-                    stock = yf.Ticker(name.upper())
-                    stock_info = stock.info
-                    # Check if stock_info is None or empty (which can happen with 404 errors)
-                    if not stock_info:
-                        print(f"No data found for ticker {name.upper()} - API returned empty response")
-                        # Continue to other search methods instead of failing
-                    elif ('shortName' in stock_info or 'longName' in stock_info):
-                        stock_name = stock_info.get('shortName', '') or stock_info.get('longName', '')
-                        return [{
-                            'symbol': name.upper(),
-                            'name': stock_name
-                        }]
-                except Exception as e:
-                    print(f"Error with direct ticker search for {name}: {e}")
-                    # Continue to other search methods instead of failing
-                    
-                # Try to load the ticker lists with yahoo_fin
-                try:
-                    import yahoo_fin.stock_info as stock_info
-                    nasdaq_list = stock_info.tickers_nasdaq()
-                    nyse_list = stock_info.tickers_other()
-                    
-                    # Combine both exchanges
-                    all_tickers = nasdaq_list + nyse_list
-                    
-                    # Filter by name (case-insensitive)
-                    name_lower = name.lower()
-                    potential_matches = []
-                    
-                    # First pass: Get info for several potential matches
-                    for ticker in all_tickers[:1000]:  # Limit to avoid too many API calls
-                        if len(potential_matches) >= 10:
-                            break
-                            
-                        try:
-                            stock = yf.Ticker(ticker)
-                            stock_info = stock.info
-                            if stock_info and ('shortName' in stock_info or 'longName' in stock_info):
-                                stock_name = stock_info.get('shortName', '') or stock_info.get('longName', '')
-                                if name_lower in stock_name.lower():
-                                    potential_matches.append({
-                                        'symbol': ticker,
-                                        'name': stock_name
-                                    })
-                        except Exception:
-                            continue
-                    
-                    if potential_matches:
-                        return potential_matches
-                except Exception as e:
-                    print(f"Error with ticker list search: {e}")
-                    
-                # Last resort: Try the simple direct approach
-                try:
-                    print(f"Trying direct search for ticker '{name}'")
-                    stock = yf.Ticker(name)
-                    stock_info = stock.info
-                    # Check if stock_info is None or empty (which can happen with 404 errors)
-                    if not stock_info:
-                        print(f"No data found for ticker {name} - API returned empty response")
-                        # Return helpful message instead of empty results
-                        return [{
-                            'symbol': name,
-                            'name': "No data found for this ticker. Try a different search term."
-                        }]
-                    elif ('shortName' in stock_info or 'longName' in stock_info):
-                        stock_name = stock_info.get('shortName', '') or stock_info.get('longName', '')
-                        return [{
-                            'symbol': name,
-                            'name': stock_name
-                        }]
-                except Exception as e:
-                    print(f"Error with final direct search: {e}")
-                    # Return helpful message instead of empty results
-                    return [{
-                        'symbol': name,
-                        'name': "Error retrieving data. Try a different search term."
-                    }]
-                        
-            # For other markets, provide a simplified search based on common patterns
-            elif market == 'HK':
-                # Return some helpful guidance for HK stocks
+            matches = symbol_index.search(name, market=market, limit=limit)
+            if matches:
                 return [{
-                    'symbol': 'Please use the ticker directly',
-                    'name': 'For HK stocks, use the numeric code (e.g. 0700 for Tencent)'
-                }]
-            elif market == 'CN':
-                # Return some helpful guidance for China stocks
+                    'symbol': match['symbol'],
+                    'name': match['name'] or match['chinese_name'],
+                    'chinese_name': match['chinese_name']
+                } for match in matches]
+
+            # Not in the symbol master (e.g. a new listing) - try it as a ticker
+            stock_data = StockService.get_stock_data(name.strip().upper(), market)
+            if stock_data:
                 return [{
-                    'symbol': 'Please use the ticker directly',
-                    'name': 'For China A-shares, use the numeric code (e.g. 600519 for Kweichow Moutai)'
+                    'symbol': stock_data['symbol'],
+                    'name': stock_data['name'],
+                    'chinese_name': stock_data.get('chinese_name')
                 }]
-                
-            return results
-            
+
+            return []
+
         except Exception as e:
             print(f"Error searching stocks by name: {e}")
             return []
 
     @staticmethod
-    def get_stock_data(symbol, market='US'):
+    def _query_symbol(symbol, market='US'):
+        """
+        Resolve the Yahoo Finance ticker for a symbol in a market
+        HK stocks get a .HK suffix, CN stocks .SS (Shanghai) or .SZ (Shenzhen)
+        """
+        if market == 'HK':
+            return f"{symbol}.HK"
+        elif market == 'CN':
+            return f"{symbol}.SS" if symbol.startswith('6') else f"{symbol}.SZ"
+        else:  # US market
+            return symbol
+
+    @staticmethod
+    def get_stock_data(symbol, market='US', fields='price', ticker=None):
         """
         Get stock data based on symbol and market
         Market can be: US, HK, CN (China Mainland)
+        
+        Results come from the shared quote cache; fields ('price' or
+        'fundamentals') selects which TTL decides whether the entry is fresh.
+        ticker optionally reuses a yf.Ticker shared with other fetches.
+        Concurrent misses for the same symbol share one upstream call.
+        """
+        return quote_cache.get(
+            (symbol, market),
+            lambda: single_flight.do(
+                ('stock_data', symbol, market),
+                lambda: StockService._fetch_stock_data(symbol, market, ticker=ticker)
+            ),
+            group=fields
+        )
+
+    @staticmethod
+    def _fetch_stock_data(symbol, market='US', ticker=None):
+        """
+        Fetch stock data from Yahoo Finance, bypassing the quote cache
+        Uses the async market data client unless a yf.Ticker is passed in
         """
+        if ticker is None and market_data.enabled:
+            return market_data.run(StockService.fetch_stock_data_async(symbol, market))
+            
         try:
             # Adjust the symbol based on market
-            if market == 'HK':
-                query_symbol = f"{symbol}.HK"
-            elif market == 'CN':
-                query_symbol = f"{symbol}.SS" if symbol.startswith('6') else f"{symbol}.SZ"
-            else:  # US market
-                query_symbol = symbol
+            query_symbol = StockService._query_symbol(symbol, market)
                 
-            stock = yf.Ticker(query_symbol)
+            stock = ticker or yf.Ticker(query_symbol)
             info = stock.info
             
             # Check if info is None (which can happen with 404 errors)
@@ -196,105 +138,275 @@ class StockService:
                 print(f"No data found for symbol {query_symbol} - API returned empty response")
                 return None
                 
-            # Get earnings per share (EPS) from trailing 12 months
-            eps = info.get('trailingEps')
-            
-            # Calculate ROI (EPS/Price) as percentage
-            prospect_return = None
-            current_price = info.get('currentPrice', info.get('regularMarketPrice'))
-            if eps is not None and current_price is not None and current_price > 0:
-                prospect_return = (eps / current_price) * 100
+            return StockService._build_stock_data(symbol, market, info)
+            
+        except Exception as e:
+            print(f"Error fetching stock data for {symbol}: {e}")
+            return None
+
+    @staticmethod
+    async def fetch_stock_data_async(symbol, market='US'):
+        """
+        Fetch stock data with the async market data client, bypassing the quote cache
+        """
+        try:
+            query_symbol = StockService._query_symbol(symbol, market)
+            info = await market_data.quote_info(query_symbol)
+            
+            if not info:
+                print(f"No data found for symbol {query_symbol} - API returned empty response")
+                return None
                 
-            # Get Return on Equity (ROE) from last fiscal year
-            roe = None
-            try:
-                roe = info.get('returnOnEquity')
-                if roe is not None:
-                    # Convert from decimal to percentage
-                    roe = roe * 100
-            except Exception as e:
-                print(f"Error fetching ROE for {symbol}: {e}")
-            
-            # Get stock name
-            name = info.get('shortName', info.get('longName', symbol))
-            
-            # Get Chinese name for HK/CN stocks if available
-            chinese_name = None
-            if market in ['HK', 'CN']:
-                # This is a placeholder implementation
-                # In a real-world scenario, you would use a database or API to look up Chinese names
-                # Some common examples for demonstration:
-                common_stocks = {
-                    # HK stocks
-                    '0700': '腾讯控股',
-                    '9988': '阿里巴巴',
-                    '0941': '中国移动',
-                    '0005': '汇丰控股',
-                    '3690': '美团',
-                    # CN stocks
-                    '600519': '贵州茅台',
-                    '601398': '工商银行',
-                    '600036': '招商银行',
-                    '601318': '中国平安',
-                    '000858': '五粮液',
-                }
-                chinese_name = common_stocks.get(symbol)
-            
-            # Get basic data
-            stock_data = {
-                'symbol': symbol,
-                'name': name,
-                'chinese_name': chinese_name,
-                'current_price': current_price,
-                'change_percent': info.get('regularMarketChangePercent'),
-                'ytd_change_percent': None,  # Setting to None as per request
-                'eps': eps,
-                'prospect_return': prospect_return,  # ROI
-                'roe': roe,
-                'market_cap': info.get('marketCap'),
-                'volume': info.get('volume'),
-                'pe_ratio': info.get('trailingPE'),
-                'dividend_yield': info.get('dividendYield'),
-                '52_week_high': info.get('fiftyTwoWeekHigh'),
-                '52_week_low': info.get('fiftyTwoWeekLow'),
-            }
-            
-            return stock_data
+            return StockService._build_stock_data(symbol, market, info)
             
         except Exception as e:
             print(f"Error fetching stock data for {symbol}: {e}")
             return None
 
     @staticmethod
-    def get_historical_data(symbol, market='US', period='5y'):
+    def get_quotes(holdings, max_workers=QUOTE_MAX_WORKERS, batch_size=QUOTE_BATCH_SIZE, use_cache=True):
+        """
+        Get stock data for many stocks at once
+        
+        Args:
+            holdings: iterable of (symbol, market) pairs
+            max_workers (int): maximum number of concurrent upstream requests
+            batch_size (int): number of symbols sharing one yf.Tickers session
+                (yfinance backend only)
+            use_cache (bool): serve fresh entries from the quote cache and only
+                fetch the rest; the fetched results are always cached
+            
+        Returns:
+            tuple: (results, errors) dicts keyed by (symbol, market). results
+            holds the same dict get_stock_data returns, errors holds a message
+            for every symbol that could not be fetched.
+        """
+        if market_data.enabled:
+            return market_data.run(StockService.get_quotes_async(holdings, max_workers, use_cache))
+            
+        results, errors, query_symbols = StockService._pending_quotes(holdings, use_cache)
+        if not query_symbols:
+            return results, errors
+            
+        keys = list(query_symbols)
+        batches = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+        print(f"Fetching quotes for {len(keys)} symbols in {len(batches)} batches")
+        
+        def fetch_info(ticker):
+            # Yahoo has no multi-symbol .info call, so each symbol is one
+            # request - bounded by the executor below
+            return ticker.info
+            
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch in batches:
+                # One yf.Tickers per batch shares the session and crumb
+                tickers = yf.Tickers([query_symbols[key] for key in batch])
+                futures = {
+                    executor.submit(fetch_info, tickers.tickers[query_symbols[key].upper()]): key
+                    for key in batch
+                }
+                
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        StockService._store_quote(key, query_symbols[key], future.result(), results, errors)
+                    except Exception as e:
+                        errors[key] = str(e)
+                        
+        if errors:
+            print(f"Failed to fetch quotes for {len(errors)} symbols: {sorted(s for s, _ in errors)}")
+            
+        return results, errors
+
+    @staticmethod
+    async def get_quotes_async(holdings, max_workers=QUOTE_MAX_WORKERS, use_cache=True):
+        """
+        Async get_quotes: every quote is requested concurrently over the
+        pooled client, at most max_workers at a time
+        """
+        results, errors, query_symbols = StockService._pending_quotes(holdings, use_cache)
+        if not query_symbols:
+            return results, errors
+            
+        print(f"Fetching quotes for {len(query_symbols)} symbols")
+        semaphore = asyncio.Semaphore(max_workers)
+        
+        async def fetch(key):
+            async with semaphore:
+                try:
+                    info = await market_data.quote_info(query_symbols[key])
+                    StockService._store_quote(key, query_symbols[key], info, results, errors)
+                except Exception as e:
+                    errors[key] = str(e)
+                    
+        await asyncio.gather(*(fetch(key) for key in query_symbols))
+        
+        if errors:
+            print(f"Failed to fetch quotes for {len(errors)} symbols: {sorted(s for s, _ in errors)}")
+            
+        return results, errors
+
+    @staticmethod
+    def _pending_quotes(holdings, use_cache=True):
+        """
+        Split holdings into cached results/errors and the query symbols still to fetch
+        """
+        results = {}
+        errors = {}
+        
+        # Resolve market suffixes once, dropping duplicate holdings
+        query_symbols = {}
+        for symbol, market in holdings:
+            key = (symbol, market)
+            if key in query_symbols or key in results or key in errors:
+                continue
+                
+            if use_cache:
+                state, cached = quote_cache.peek(key)
+                if state == 'fresh':
+                    if cached is None:
+                        errors[key] = f"Symbol {symbol} not found"
+                    else:
+                        results[key] = cached
+                    continue
+                    
+            query_symbols[key] = StockService._query_symbol(symbol, market)
+            
+        return results, errors, query_symbols
+
+    @staticmethod
+    def _store_quote(key, query_symbol, info, results, errors):
+        """Build and cache the stock data for one fetched info payload"""
+        if not info:
+            errors[key] = f"No data found for symbol {query_symbol}"
+            quote_cache.put(key, None)
+            return
+        results[key] = StockService._build_stock_data(key[0], key[1], info)
+        quote_cache.put(key, results[key])
+
+    @staticmethod
+    def _build_stock_data(symbol, market, info):
+        """
+        Build the stock data dict from a Yahoo Finance info payload
+        """
+        # Get earnings per share (EPS) from trailing 12 months
+        eps = info.get('trailingEps')
+        
+        # Calculate ROI (EPS/Price) as percentage
+        prospect_return = None
+        current_price = info.get('currentPrice', info.get('regularMarketPrice'))
+        if eps is not None and current_price is not None and current_price > 0:
+            prospect_return = (eps / current_price) * 100
+            
+        # Get Return on Equity (ROE) from last fiscal year
+        roe = None
+        try:
+            roe = info.get('returnOnEquity')
+            if roe is not None:
+                # Convert from decimal to percentage
+                roe = roe * 100
+        except Exception as e:
+            print(f"Error fetching ROE for {symbol}: {e}")
+        
+        # Get stock name
+        name = info.get('shortName', info.get('longName', symbol))
+        
+        # Get Chinese name for HK/CN stocks from the symbol master
+        chinese_name = None
+        if market in ['HK', 'CN']:
+            entry = symbol_index.lookup(symbol, market)
+            chinese_name = entry['chinese_name'] if entry else None
+        
+        # Get basic data
+        return {
+            'symbol': symbol,
+            'name': name,
+            'chinese_name': chinese_name,
+            'current_price': current_price,
+            'change_percent': info.get('regularMarketChangePercent'),
+            'ytd_change_percent': None,  # Setting to None as per request
+            'eps': eps,
+            'prospect_return': prospect_return,  # ROI
+            'roe': roe,
+            'market_cap': info.get('marketCap'),
+            'volume': info.get('volume'),
+            'pe_ratio': info.get('trailingPE'),
+            'dividend_yield': info.get('dividendYield'),
+            '52_week_high': info.get('fiftyTwoWeekHigh'),
+            '52_week_low': info.get('fiftyTwoWeekLow'),
+        }
+
+    @staticmethod
+    def get_historical_data(symbol, market='US', period='5y', ticker=None):
         """
         Get historical price data, default to 5 years
+        Served from the local history store, which only downloads the bars
+        added since the last stored date. Concurrent calls for the same
+        symbol and period share one sync.
         """
         try:
-            # Adjust the symbol based on market
-            if market == 'HK':
-                query_symbol = f"{symbol}.HK"
-            elif market == 'CN':
-                query_symbol = f"{symbol}.SS" if symbol.startswith('6') else f"{symbol}.SZ"
-            else:  # US market
-                query_symbol = symbol
-                
-            print(f"Fetching historical data for {query_symbol} ({period})")
-            hist_data = yf.Ticker(query_symbol).history(period=period)
+            hist_data = single_flight.do(
+                ('history', symbol, market, period),
+                lambda: history_store.get_history(symbol, market, period=period, ticker=ticker)
+            )
             
             if hist_data is None or hist_data.empty:
-                print(f"No historical data returned for {query_symbol}")
+                print(f"No historical data available for {symbol} ({market})")
                 return None
                 
-            print(f"Retrieved {len(hist_data)} historical data points for {query_symbol}")
-            print(f"Columns available: {list(hist_data.columns)}")
-            print(f"Date range: {hist_data.index.min()} to {hist_data.index.max()}")
-            
+            print(f"Retrieved {len(hist_data)} historical data points for {symbol} ({period})")
             return hist_data
         except Exception as e:
-            print(f"Error fetching historical data for {symbol} ({query_symbol}): {e}")
+            print(f"Error fetching historical data for {symbol} ({market}): {e}")
+            return None
+            
+    @staticmethod
+    def _fetch_history(symbol, market='US', ticker=None, **history_kwargs):
+        """
+        Download daily history from Yahoo Finance, bypassing the history store
+        history_kwargs are passed to yf.Ticker.history (period=..., start=...)
+        Uses the async market data client unless a yf.Ticker is passed in
+        """
+        if ticker is None and market_data.enabled:
+            return market_data.run(StockService.fetch_history_async(symbol, market, **history_kwargs))
+            
+        # Adjust the symbol based on market
+        query_symbol = StockService._query_symbol(symbol, market)
+        
+        print(f"Fetching historical data for {query_symbol} ({history_kwargs})")
+        hist_data = (ticker or yf.Ticker(query_symbol)).history(**history_kwargs)
+        
+        if hist_data is None or hist_data.empty:
+            print(f"No historical data returned for {query_symbol}")
+            return None
+            
+        print(f"Downloaded {len(hist_data)} historical data points for {query_symbol}")
+        return hist_data
+
+    @staticmethod
+    async def fetch_history_async(symbol, market='US', period=None, start=None):
+        """
+        Download daily history with the async market data client
+        """
+        query_symbol = StockService._query_symbol(symbol, market)
+        
+        print(f"Fetching historical data for {query_symbol} (period={period}, start={start})")
+        hist_data = await market_data.history(query_symbol, period=period, start=start)
+        
+        if hist_data is None or hist_data.empty:
+            print(f"No historical data returned for {query_symbol}")
             return None
             
+        print(f"Downloaded {len(hist_data)} historical data points for {query_symbol}")
+        return hist_data
+            
+    # Benchmark index per market: (Yahoo ticker, display name)
+    MARKET_INDEXES = {
+        'US': ('^GSPC', 'S&P 500'),
+        'HK': ('^HSI', 'Hang Seng Index'),
+        'CN': ('000300.SS', 'CSI 300'),
+    }
+
     @staticmethod
     def get_index_data(market='US', period='5y'):
         """
@@ -302,31 +414,15 @@ class StockService:
         - US: S&P 500 (^GSPC)
         - HK: Hang Seng Index (^HSI)
         - CN: CSI 300 (000300.SS)
+        Served from the local history store under market INDEX_MARKET, so
+        every caller shares one incrementally synced series per index
         """
-        try:
-            index_ticker = "^GSPC"  # S&P 500 default
-            index_name = "S&P 500"
-            
-            if market == 'HK':
-                index_ticker = "^HSI"  # Hang Seng Index
-                index_name = "Hang Seng Index"
-            elif market == 'CN':
-                index_ticker = "000300.SS"  # CSI 300 Index
-                index_name = "CSI 300"
-                
-            print(f"Fetching {index_name} historical data for {period}")
-            index_data = yf.Ticker(index_ticker).history(period=period)
-            
-            if index_data is None or index_data.empty:
-                print(f"No {index_name} historical data returned")
-                return None, index_name
-                
-            print(f"Retrieved {len(index_data)} {index_name} historical data points")
-            return index_data, index_name
-        except Exception as e:
-            print(f"Error fetching {market} index data: {e}")
-            return None, "Market Index"
-    
+        index_ticker, index_name = StockService.MARKET_INDEXES.get(market, StockService.MARKET_INDEXES['US'])
+        index_data = StockService.get_historical_data(index_ticker, INDEX_MARKET, period=period)
+        if index_data is None:
+            return None, index_name
+        return index_data, index_name
+
     @staticmethod
     def format_currency(value, market='US'):
         """Format currency values based on market"""
@@ -355,20 +451,39 @@ class StockService:
             return str(value)
     
     @staticmethod
-    def get_balance_sheet_data(symbol, market='US'):
+    def get_balance_sheet_data(symbol, market='US', ticker=None, refresh=False):
         """
         Get the latest quarterly balance sheet data
+        Served from the fundamentals cache, which only re-fetches once the
+        next report is expected or when refresh is requested. Concurrent
+        calls for the same symbol share one lookup.
         """
+        try:
+            return single_flight.do(
+                ('balance_sheet', symbol, market, refresh),
+                lambda: fundamentals_cache.get_latest(symbol, market, refresh=refresh, ticker=ticker)
+            )
+        except Exception as e:
+            print(f"Error fetching balance sheet data for {symbol}: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+            
+    @staticmethod
+    def _fetch_balance_sheets(symbol, market='US', ticker=None):
+        """
+        Download quarterly balance sheets from Yahoo Finance, bypassing the cache
+        Returns a list of quarter dicts (most recent first) or None
+        Uses the async market data client unless a yf.Ticker is passed in
+        """
+        if ticker is None and market_data.enabled:
+            return market_data.run(StockService.fetch_balance_sheets_async(symbol, market))
+            
         try:
             # Adjust the symbol based on market
-            if market == 'HK':
-                query_symbol = f"{symbol}.HK"
-            elif market == 'CN':
-                query_symbol = f"{symbol}.SS" if symbol.startswith('6') else f"{symbol}.SZ"
-            else:  # US market
-                query_symbol = symbol
+            query_symbol = StockService._query_symbol(symbol, market)
                 
-            stock = yf.Ticker(query_symbol)
+            stock = ticker or yf.Ticker(query_symbol)
             
             # Get quarterly balance sheet (most recent first)
             balance_sheet = stock.quarterly_balance_sheet
@@ -377,48 +492,10 @@ class StockService:
                 print(f"No balance sheet data available for {query_symbol}")
                 return None
                 
-            # Get the most recent quarter's data (first column)
-            latest_quarter = balance_sheet.columns[0]
-            latest_data = balance_sheet[latest_quarter]
-            
-            # Convert to dictionary
-            balance_sheet_data = {
-                'quarter_date': latest_quarter.strftime('%Y-%m-%d'),
-                'total_assets': float(latest_data.get('Total Assets', 0)),
-                'total_liabilities': float(latest_data.get('Total Liabilities Net Minority Interest', 0)),
-                'equity': float(latest_data.get('Total Equity Gross Minority Interest', 0)),
-                'cash': float(latest_data.get('Cash And Cash Equivalents', 0)),
-                'debt': float(latest_data.get('Total Debt', 0)),
-                'current_assets': float(latest_data.get('Total Current Assets', 0)),
-                'current_liabilities': float(latest_data.get('Total Current Liabilities', 0)),
-                'inventory': float(latest_data.get('Inventory', 0)),
-                'accounts_receivable': float(latest_data.get('Accounts Receivable', 0)),
-                'accounts_payable': float(latest_data.get('Accounts Payable', 0)),
-            }
-            
-            # Calculate some additional ratios
-            try:
-                # Current ratio
-                if balance_sheet_data['current_liabilities'] != 0:
-                    balance_sheet_data['current_ratio'] = balance_sheet_data['current_assets'] / balance_sheet_data['current_liabilities']
-                else:
-                    balance_sheet_data['current_ratio'] = None
-                    
-                # Debt to equity ratio
-                if balance_sheet_data['equity'] != 0:
-                    balance_sheet_data['debt_equity_ratio'] = balance_sheet_data['debt'] / balance_sheet_data['equity']
-                else:
-                    balance_sheet_data['debt_equity_ratio'] = None
-                    
-                # Cash ratio
-                if balance_sheet_data['current_liabilities'] != 0:
-                    balance_sheet_data['cash_ratio'] = balance_sheet_data['cash'] / balance_sheet_data['current_liabilities']
-                else:
-                    balance_sheet_data['cash_ratio'] = None
-            except Exception as e:
-                print(f"Error calculating balance sheet ratios: {e}")
-                
-            return balance_sheet_data
+            return [
+                StockService._balance_sheet_quarter(quarter, balance_sheet[quarter])
+                for quarter in balance_sheet.columns
+            ]
             
         except Exception as e:
             print(f"Error fetching balance sheet data for {symbol}: {e}")
@@ -427,10 +504,73 @@ class StockService:
             return None
 
     @staticmethod
-    def generate_chart(stock_data, market='US', stock_symbol=None):
+    async def fetch_balance_sheets_async(symbol, market='US'):
+        """
+        Download quarterly balance sheets with the async market data client
+        """
+        try:
+            query_symbol = StockService._query_symbol(symbol, market)
+            balance_sheet = await market_data.quarterly_balance_sheet(query_symbol)
+            
+            if balance_sheet is None or balance_sheet.empty:
+                print(f"No balance sheet data available for {query_symbol}")
+                return None
+                
+            return [
+                StockService._balance_sheet_quarter(quarter, balance_sheet[quarter])
+                for quarter in balance_sheet.columns
+            ]
+            
+        except Exception as e:
+            print(f"Error fetching balance sheet data for {symbol}: {e}")
+            return None
+            
+    @staticmethod
+    def _balance_sheet_quarter(quarter, quarter_data):
+        """
+        Convert one quarter column of a Yahoo balance sheet into a dict with ratios
+        """
+        def value(row):
+            # Missing rows and empty cells are None, not 0
+            amount = quarter_data.get(row)
+            return None if amount is None or pd.isna(amount) else float(amount)
+            
+        def ratio(numerator, denominator):
+            if numerator is None or not denominator:
+                return None
+            return numerator / denominator
+            
+        # Convert to dictionary
+        balance_sheet_data = {
+            'quarter_date': quarter.strftime('%Y-%m-%d'),
+            'total_assets': value('Total Assets'),
+            'total_liabilities': value('Total Liabilities Net Minority Interest'),
+            'equity': value('Total Equity Gross Minority Interest'),
+            'cash': value('Cash And Cash Equivalents'),
+            'debt': value('Total Debt'),
+            'current_assets': value('Total Current Assets'),
+            'current_liabilities': value('Total Current Liabilities'),
+            'inventory': value('Inventory'),
+            'accounts_receivable': value('Accounts Receivable'),
+            'accounts_payable': value('Accounts Payable'),
+        }
+        
+        # Calculate some additional ratios
+        balance_sheet_data['current_ratio'] = ratio(balance_sheet_data['current_assets'], balance_sheet_data['current_liabilities'])
+        balance_sheet_data['debt_equity_ratio'] = ratio(balance_sheet_data['debt'], balance_sheet_data['equity'])
+        balance_sheet_data['cash_ratio'] = ratio(balance_sheet_data['cash'], balance_sheet_data['current_liabilities'])
+            
+        return balance_sheet_data
+
+    @staticmethod
+    def generate_chart(stock_data, market='US', stock_symbol=None, max_points=CHART_MAX_POINTS, fast=True):
         """
         Generate interactive chart data for the stock price history
-        Shows 5-year actual price history of the stock
+        Shows 5-year actual price history of the stock, with the price line
+        downsampled to max_points and candles aggregated for wide ranges
+        
+        fast=True writes the figure JSON directly from the NumPy arrays;
+        fast=False builds a validated plotly Figure and calls to_json()
         """
         if stock_data is None or stock_data.empty:
             print("Cannot generate chart: stock_data is None or empty")
@@ -447,55 +587,19 @@ class StockService:
             # Print some details about the data for debugging
             print(f"Stock data date range: {stock_data.index.min()} to {stock_data.index.max()}")
             
-            # Create figure
-            fig = go.Figure()
-            
+            # Reduce the history to what the chart can actually show
+            series = build_chart_series(stock_data, max_points=max_points)
+            if series is None:
+                print("No price data left to chart")
+                return None
             # Use provided stock_symbol if available
             display_symbol = stock_symbol if stock_symbol else "Stock"
             
-            # Add stock price line - actual price, not normalized
-            fig.add_trace(go.Scatter(
-                x=stock_data.index,
-                y=stock_data['Close'],
-                name=display_symbol,
-                line=dict(color='rgb(0, 100, 255)', width=3),
-                mode='lines',
-                hovertemplate='$%{y:.2f}'
-            ))
-            
-            # Add candlestick view for more detailed price information
-            fig.add_trace(go.Candlestick(
-                x=stock_data.index,
-                open=stock_data['Open'],
-                high=stock_data['High'],
-                low=stock_data['Low'],
-                close=stock_data['Close'],
-                name="OHLC",
-                visible='legendonly'  # Hidden by default, can be enabled from legend
-            ))
-            
-            # Layout settings
-            fig.update_layout(
-                title=f'5-Year Price History: {display_symbol}',
-                yaxis=dict(
-                    title='Price (USD)',
-                    tickformat='.2f',
-                    hoverformat='.2f',
-                    showgrid=True,
-                    zeroline=True,
-                    zerolinecolor='black',
-                    autorange=True
-                ),
-                xaxis=dict(
-                    title='Date (2019-2024)',
-                    rangeslider=dict(visible=False)
-                ),
-                legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5),
-                height=600,
-                hovermode='x unified'
-            )
-            
-            chart_json = fig.to_json()
+            if fast:
+                chart_json = figure_json(series, display_symbol)
+            else:
+                chart_json = plotly_figure_json(series, display_symbol)
+                
             print(f"Chart JSON generated successfully (length: {len(chart_json)})")
             return chart_json
             
@@ -506,88 +610,366 @@ class StockService:
             return None
             
     @staticmethod
-    def get_stock_insights(user_message):
+    def get_price_chart(symbol, market='US', hist_data=None, period='5y', max_points=CHART_MAX_POINTS):
+        """
+        Get the price chart JSON for a stock from the chart cache
+        The figure is only built when a new bar arrived or the last close moved
+        """
+        if hist_data is None:
+            hist_data = StockService.get_historical_data(symbol, market, period=period)
+        if hist_data is None or hist_data.empty:
+            return None
+            
+        last_bar = hist_data.index[-1]
+        last_close = float(hist_data['Close'].iloc[-1])
+        options = {'max_points': max_points, 'serializer': 'fast'}
+        
+        return chart_cache.get_or_build(
+            symbol, market, period, last_bar.isoformat(), last_close, options,
+            builder=lambda: StockService.generate_chart(hist_data, market, stock_symbol=symbol, max_points=max_points)
+        )
+        
+    @staticmethod
+    async def get_stock_detail_async(symbol, market='US', deadline=DETAIL_PAGE_DEADLINE):
+        """
+        Fetch everything the stock detail page shows concurrently
+        
+        Quote, balance sheet and history (with its chart) are awaited in
+        parallel; their caches run on the detail pool and their upstream
+        requests share the async market data client (or one yf.Ticker with
+        the yfinance backend). Sections not finished within deadline seconds
+        are reported in 'delayed' and keep running in the background, so
+        their caches are warm for the next view.
+        
+        Returns:
+            dict: stock_data, balance_sheet_data, hist_data, chart_data and
+            delayed (set of section names that missed the deadline)
+        """
+        ticker = None if market_data.enabled else yf.Ticker(StockService._query_symbol(symbol, market))
+        loop = asyncio.get_running_loop()
+        
+        def in_app_context(fn, *args, **kwargs):
+            # History, chart and fundamentals caches read SQLite, which needs an app context
+            with app.app_context():
+                return fn(*args, **kwargs)
+                
+        def history_and_chart():
+            hist_data = StockService.get_historical_data(symbol, market, period='5y', ticker=ticker)
+            if hist_data is None or hist_data.empty:
+                return None, None
+            chart_data = StockService.get_price_chart(symbol, market, hist_data=hist_data, period='5y')
+            return hist_data, chart_data
+            
+        def run(fn, *args, **kwargs):
+            return loop.run_in_executor(_detail_executor, lambda: fn(*args, **kwargs))
+            
+        futures = {
+            'stock_data': run(StockService.get_stock_data, symbol, market, ticker=ticker),
+            'balance_sheet': run(in_app_context, StockService.get_balance_sheet_data, symbol, market, ticker=ticker),
+            'history': run(in_app_context, history_and_chart),
+        }
+        await asyncio.wait(futures.values(), timeout=deadline)
+        
+        results = {}
+        delayed = set()
+        for section, future in futures.items():
+            if not future.done():
+                print(f"{section} for {symbol} missed the {deadline}s page deadline")
+                delayed.add(section)
+                results[section] = None
+                # Only detaches the page; the pool thread finishes and fills the cache
+                future.cancel()
+                continue
+            try:
+                results[section] = future.result()
+            except Exception as e:
+                print(f"Error fetching {section} for {symbol}: {e}")
+                results[section] = None
+                
+        hist_data, chart_data = results['history'] or (None, None)
+        return {
+            'stock_data': results['stock_data'],
+            'balance_sheet_data': results['balance_sheet'],
+            'hist_data': hist_data,
+            'chart_data': chart_data,
+            'delayed': delayed,
+        }
+        
+    @staticmethod
+    def get_chart_data(symbol, market='US', start=None, end=None, max_points=CHART_MAX_POINTS):
+        """
+        Get chart series for a date window, e.g. when the user zooms in
+        Narrow windows come back at full daily resolution, wide ones downsampled
+        """
+        try:
+            hist_data = StockService.get_historical_data(symbol, market, period='5y')
+            if hist_data is None or hist_data.empty:
+                return None
+                
+            series = build_chart_series(hist_data, start=start, end=end, max_points=max_points)
+            return series_to_json(series) if series is not None else None
+        except Exception as e:
+            print(f"Error building chart data for {symbol}: {e}")
+            return None
+            
+    @staticmethod
+    def get_benchmark_comparison(symbol, market='US', start=None, end=None, max_points=CHART_MAX_POINTS):
+        """
+        Get the stock vs. market index overlay for a date window: both
+        rebased to 0% and the relative strength line
+        The index comes from the shared benchmark series, so this makes no
+        upstream call of its own
+        """
+        try:
+            hist_data = StockService.get_historical_data(symbol, market, period='5y')
+            if hist_data is None or hist_data.empty:
+                return None
+                
+            index_closes, index_name = benchmark_series.get(market)
+            if index_closes is None:
+                return None
+                
+            comparison = relative_performance(hist_data, index_closes, start=start, end=end, max_points=max_points)
+            if comparison is None:
+                return None
+            comparison['index_name'] = index_name
+            return comparison
+        except Exception as e:
+            print(f"Error building benchmark comparison for {symbol}: {e}")
+            return None
+            
+    @staticmethod
+    def get_stock_insights(user_message, data_version=None, stock=None):
         """
         Generate responses to user messages using LLM via Amazon Bedrock
         
         Args:
             user_message (str): User's message to the chatbot
+            data_version (str): version of the data the answer depends on;
+                cached replies are only reused for the same version
+            stock (Stock): stock the question is about; a summary of its
+                locally held data is added to the prompt
             
         Returns:
-            str: Response from the LLM
+            tuple: (response text, whether it came from the response cache)
+            
+        Raises:
+            LLMBusy: the LLM queue is full
+            LLMTimeout: no reply within LLM_REQUEST_TIMEOUT
         """
         try:
-            # Create the prompt for the LLM (simple conversational context)
-            prompt = f"""You are a helpful assistant focused on financial topics and markets. Your name is ValueBot.
-
-The user has asked: "{user_message}"
-
-Use the language which the user input, and provide a helpful, accurate, and concise response.
-If you don't have specific information to answer the question, acknowledge that limitation.
-Format your response with clean line breaks and bullet points where appropriate.
-"""
+            prompt, context = StockService._insights_prompt(user_message, stock)
+            cache_prompt = INSIGHTS_SYSTEM_PROMPT + prompt
+            model_id = StockService._llm_model_id()
+            
+            cached = llm_cache.get(cache_prompt, model_id, data_version)
+            if cached is not None:
+                return cached, True
             
             # Check if we should use mock responses for testing
-            if os.getenv('USE_MOCK_LLM', 'false').lower() == 'true':
+            if StockService._use_mock_llm():
                 # Simple mock response for testing
-                return f"This is a mock response to: {user_message}"
-            
-            # Otherwise use Amazon Bedrock API
-            return StockService._call_bedrock_llm(prompt)
+                response = llm_executor.call(StockService._get_mock_reply, user_message, context)
+            else:
+                # Otherwise use Amazon Bedrock API
+                response = llm_executor.call(StockService._call_bedrock_llm, prompt)
                 
+            if response not in LLM_FALLBACK_RESPONSES:
+                llm_cache.put(cache_prompt, model_id, response, data_version)
+            return response, False
+                
+        except (LLMBusy, LLMTimeout):
+            raise
         except Exception as e:
             print(f"Error in get_stock_insights: {e}")
             import traceback
             traceback.print_exc()
-            return "Sorry, I encountered an error while processing your request."
+            return LLM_ERROR_RESPONSE, False
             
     @staticmethod
-    def _call_bedrock_llm(prompt):
+    def stream_stock_insights(user_message, data_version=None, stock=None):
         """
-        Call Amazon Bedrock API to get LLM response
+        Stream the chatbot response as it is generated (arguments as for
+        get_stock_insights)
+        
+        Returns:
+            tuple: (whether the reply came from the response cache, iterator
+            of the reply's text chunks in order)
+            
+        Raises:
+            LLMBusy: the LLM queue is full (raised here, before any chunk);
+                the iterator raises LLMTimeout if the reply doesn't start
+                within LLM_FIRST_TOKEN_TIMEOUT or stalls for
+                LLM_STREAM_IDLE_TIMEOUT
         """
+        prompt, context = StockService._insights_prompt(user_message, stock)
+        cache_prompt = INSIGHTS_SYSTEM_PROMPT + prompt
+        model_id = StockService._llm_model_id()
+        
+        cached = llm_cache.get(cache_prompt, model_id, data_version)
+        if cached is not None:
+            return True, iter([cached])
+            
+        # Queued on the LLM pool now, so a full queue is reported up front
+        if StockService._use_mock_llm():
+            stream = llm_executor.stream(
+                lambda: StockService._mock_token_stream(StockService._get_mock_reply(user_message, context))
+            )
+        else:
+            stream = llm_executor.stream(StockService._stream_bedrock_llm, prompt)
+            
+        def generate():
+            chunks = []
+            try:
+                for text in stream:
+                    chunks.append(text)
+                    yield text
+                    
+            except LLMTimeout:
+                raise
+            except Exception as e:
+                print(f"Error in stream_stock_insights: {e}")
+                import traceback
+                traceback.print_exc()
+                yield LLM_ERROR_RESPONSE
+                return
+                
+            # Only complete replies are cached (not disconnects or errors)
+            if chunks and not any(text in LLM_FALLBACK_RESPONSES for text in chunks):
+                llm_cache.put(cache_prompt, model_id, ''.join(chunks), data_version)
+                
+        return False, generate()
+            
+    @staticmethod
+    def _insights_prompt(user_message, stock=None):
+        """
+        Create the per-request part of the LLM prompt; the fixed instructions
+        (INSIGHTS_SYSTEM_PROMPT) are sent ahead of it as the system prompt
+        
+        Returns:
+            tuple: (prompt, (stock_data, balance_sheet) or None)
+        """
+        context = None
+        context_lines = []
+        if stock is not None:
+            context = StockService._stock_context_data(stock)
+            context_lines = fit_to_budget(StockService._stock_context_lines(stock, *context), INSIGHTS_CONTEXT_TOKENS)
+            
+        prompt = build_user_prompt(user_message, context_lines)
+        prompt_stats.record_prompt(
+            count_tokens(INSIGHTS_SYSTEM_PROMPT) + count_tokens(prompt),
+            sum(count_tokens(line) + 1 for line in context_lines)
+        )
+        return prompt, context
+        
+    @staticmethod
+    def _stock_context_data(stock):
+        """
+        Gather what we already hold locally about a stock, without network calls:
+        the cached quote (falling back to the Stock row) and the latest stored
+        balance sheet quarter
+        """
+        _, cached = quote_cache.peek((stock.symbol, stock.market), 'fundamentals')
+        stock_data = dict(cached or {})
+        for field in ('name', 'chinese_name', 'current_price', 'change_percent', 'eps', 'prospect_return', 'roe'):
+            if stock_data.get(field) is None:
+                stock_data[field] = getattr(stock, field)
+        stock_data['symbol'] = stock.symbol
+        
         try:
-            # Initialize the Bedrock client
-            bedrock_runtime = boto3.client(
-                service_name='bedrock-runtime',
-                region_name=os.getenv('AWS_REGION', 'us-east-1')
+            balance_sheet = fundamentals_cache.latest(stock.symbol, stock.market)
+        except Exception as e:
+            print(f"Error reading stored balance sheet for {stock.symbol}: {e}")
+            balance_sheet = None
+        return stock_data, balance_sheet
+        
+    @staticmethod
+    def _stock_context_lines(stock, stock_data, balance_sheet):
+        """
+        Compact facts about a stock for the prompt, most important first
+        (fit_to_budget drops lines from the end)
+        """
+        market = stock.market
+        
+        def money(value):
+            return StockService.format_currency(value, market)
+            
+        def join(*parts):
+            return '; '.join(part for part in parts if part)
+            
+        def part(label, value, template):
+            return f"{label}: {template.format(value)}" if value is not None else None
+            
+        name = stock_data.get('name') or stock.symbol
+        if stock_data.get('chinese_name'):
+            name = f"{name} / {stock_data['chinese_name']}"
+        lines = [f"{name} ({stock.symbol}, {market} market)"]
+        
+        price = stock_data.get('current_price')
+        if price is not None:
+            quote = f"Price: {money(price)}"
+            if stock_data.get('change_percent') is not None:
+                quote += f" ({stock_data['change_percent']:+.2f}% today)"
+            if stock.last_updated:
+                quote += f", as of {stock.last_updated.strftime('%Y-%m-%d')}"
+            lines.append(quote)
+            
+        lines.append(join(
+            part('EPS (TTM)', money(stock_data.get('eps')), '{}'),
+            part('Earnings yield', stock_data.get('prospect_return'), '{:.2f}%'),
+            part('ROE', stock_data.get('roe'), '{:.2f}%'),
+        ))
+        lines.append(join(
+            part('P/E', stock_data.get('pe_ratio'), '{:.2f}'),
+            part('Dividend yield', stock_data['dividend_yield'] * 100 if stock_data.get('dividend_yield') else None, '{:.2f}%'),
+            part('Market cap', money(stock_data.get('market_cap')), '{}'),
+        ))
+        if stock_data.get('52_week_low') is not None and stock_data.get('52_week_high') is not None:
+            lines.append(f"52-week range: {money(stock_data['52_week_low'])} - {money(stock_data['52_week_high'])}")
+            
+        if balance_sheet:
+            ratios = join(
+                part('current ratio', balance_sheet.get('current_ratio'), '{:.2f}'),
+                part('debt/equity', balance_sheet.get('debt_equity_ratio'), '{:.2f}'),
+                part('cash ratio', balance_sheet.get('cash_ratio'), '{:.2f}'),
             )
+            if ratios:
+                lines.append(f"Balance sheet {balance_sheet['quarter_date']}: {ratios}")
+            lines.append(join(
+                part('Total assets', money(balance_sheet.get('total_assets')), '{}'),
+                part('Liabilities', money(balance_sheet.get('total_liabilities')), '{}'),
+                part('Equity', money(balance_sheet.get('equity')), '{}'),
+                part('Cash', money(balance_sheet.get('cash')), '{}'),
+                part('Debt', money(balance_sheet.get('debt')), '{}'),
+            ))
+        return [line for line in lines if line]
+
+    @staticmethod
+    def _use_mock_llm():
+        return os.getenv('USE_MOCK_LLM', 'false').lower() == 'true'
+        
+    @staticmethod
+    def _llm_model_id():
+        """Model the reply comes from; mock replies are cached separately"""
+        return 'mock' if StockService._use_mock_llm() else BEDROCK_MODEL_ID
             
-            # Define the model parameters
-            # Use Claude 3.5 Sonnet as default
-            model_id = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-7-sonnet-20250219-v1:0')
-            
-            # Prepare the request body for Claude models
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4000,
-                "top_k": 250,
-                "stop_sequences": [],
-                "temperature": 1,
-                "top_p": 0.999,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ]
-                    }
-                ]
-            }
-            
-            # Make the API call
-            response = bedrock_runtime.invoke_model(
-                modelId=model_id,
+    @staticmethod
+    def _call_bedrock_llm(prompt):
+        """
+        Call Amazon Bedrock API to get LLM response
+        """
+        try:
+            # Make the API call on the shared client
+            response = get_bedrock_client().invoke_model(
+                modelId=BEDROCK_MODEL_ID,
                 contentType="application/json",
                 accept="application/json",
-                body=json.dumps(request_body)
+                body=claude_request_body(prompt, system=INSIGHTS_SYSTEM_PROMPT)
             )
             
             # Parse the response for Claude models
             response_body = json.loads(response.get('body').read())
+            prompt_stats.record_usage(response_body.get('usage'))
             
             # Extract the response text from the Claude response format
             return response_body.get('content', [{}])[0].get('text', "No response generated")
@@ -598,14 +980,65 @@ Format your response with clean line breaks and bullet points where appropriate.
             print(f"Bedrock API error: {error_code} - {error_message}")
             
             # Return a graceful fallback response
-            return "I'm having trouble accessing the AI service right now. Please try again later."
+            return LLM_UNAVAILABLE_RESPONSE
         except Exception as e:
             print(f"Error calling Bedrock LLM: {e}")
             import traceback
             traceback.print_exc()
             
             # Return a graceful fallback response
-            return "I'm having trouble generating a response right now. Please try again later."
+            return LLM_FAILED_RESPONSE
+            
+    @staticmethod
+    def _stream_bedrock_llm(prompt):
+        """
+        Call Amazon Bedrock with response streaming, yielding text as it arrives
+        """
+        try:
+            response = get_bedrock_client().invoke_model_with_response_stream(
+                modelId=BEDROCK_MODEL_ID,
+                contentType="application/json",
+                accept="application/json",
+                body=claude_request_body(prompt, system=INSIGHTS_SYSTEM_PROMPT)
+            )
+            yield from stream_text(response, on_usage=prompt_stats.record_usage)
+            
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code")
+            error_message = e.response.get("Error", {}).get("Message")
+            print(f"Bedrock API error: {error_code} - {error_message}")
+            yield LLM_UNAVAILABLE_RESPONSE
+        except Exception as e:
+            print(f"Error streaming from Bedrock LLM: {e}")
+            import traceback
+            traceback.print_exc()
+            yield LLM_FAILED_RESPONSE
+            
+    @staticmethod
+    def _get_mock_chat_response(user_message):
+        """
+        Mock chatbot reply used when USE_MOCK_LLM is set
+        """
+        return f"This is a mock response to: {user_message}"
+        
+    @staticmethod
+    def _get_mock_reply(user_message, context=None):
+        """
+        Mock reply, using the stock data when the question is about a stock
+        """
+        if context is None:
+            return StockService._get_mock_chat_response(user_message)
+        return StockService._get_mock_insight_response(*context, user_message)
+        
+    @staticmethod
+    def _mock_token_stream(text):
+        """
+        Yield text word by word with a small delay, imitating a streamed LLM reply
+        """
+        delay = float(os.getenv('MOCK_LLM_TOKEN_DELAY', 0.05))
+        for token in re.findall(r'\S+\s*|\s+', text):
+            time.sleep(delay)
+            yield token
     
     @staticmethod
     def _get_mock_insight_response(stock_data, balance_sheet, user_message):
@@ -671,4 +1104,14 @@ Format your response with clean line breaks and bullet points where appropriate.
                 f"I can provide insights about {name} ({symbol}).\n\n"
                 f"The current stock price is {price} with a market cap of {market_cap}.\n\n"
                 f"You can ask me about the company's financials, performance, valuation, or specific metrics like P/E ratio, dividend yield, etc."
-            )
\ No newline at end of file
+            )
+
+
+# Local OHLCV store behind get_historical_data
+history_store = HistoryStore(fetcher=StockService._fetch_history)
+
+# One shared in-memory series per market index for chart overlays
+benchmark_series = BenchmarkSeries(loader=StockService.get_index_data)
+
+# Persistent quarterly balance sheet cache behind get_balance_sheet_data
+fundamentals_cache = FundamentalsCache(fetcher=StockService._fetch_balance_sheets)
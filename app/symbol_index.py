@@ -0,0 +1,228 @@
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+
+from app import app
+from app.models import SymbolMaster
+from app.symbol_master import SEED_SYMBOLS, to_pinyin
+
+# Seconds before the index is reloaded in the background, to pick up
+# rebuilds made by build_symbol_master.py in another process
+SYMBOL_INDEX_RELOAD_INTERVAL = float(os.getenv('SYMBOL_INDEX_RELOAD_INTERVAL', 3600))
+
+# Prefix matches scanned per key before ranking; keeps one-letter queries cheap
+MAX_PREFIX_CANDIDATES = 500
+
+# Trigrams shared by more entries than this are too common to narrow a fuzzy search
+MAX_TRIGRAM_POSTINGS = 5000
+
+# Minimum share of the query's trigrams a name must contain for a fuzzy match
+FUZZY_THRESHOLD = 0.5
+
+# Rank of each kind of match, lower is better
+RANK_EXACT_SYMBOL = 0
+RANK_SYMBOL_PREFIX = 1
+RANK_NAME_PREFIX = 2
+RANK_INITIALS_PREFIX = 3
+RANK_FUZZY = 4
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize(text):
+    """Lowercase and strip punctuation (keeps CJK characters)"""
+    return ' '.join(_PUNCTUATION.sub(' ', (text or '').lower()).split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SymbolIndex:
+    """
+    In-memory prefix and fuzzy search over the symbol master
+
+    Prefix lookups use a sorted key list and bisect; misspellings fall back
+    to trigram similarity. Loaded lazily from SQLite on first use.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._by_symbol = {}
+        self._keys = []      # sorted search keys
+        self._key_refs = []  # (entry index, rank) for each key
+        self._postings = {}  # trigram -> list of entry indexes
+        self._trigram_counts = []
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    def reload(self):
+        """Rebuild the index from the symbol master table"""
+        with app.app_context():
+            rows = SymbolMaster.query.all()
+
+        entries = {}
+        for seed in SEED_SYMBOLS:
+            pinyin, initials = to_pinyin(seed.get('chinese_name'))
+            entries[(seed['symbol'], seed['market'])] = {
+                'symbol': seed['symbol'],
+                'market': seed['market'],
+                'name': seed.get('name'),
+                'chinese_name': seed.get('chinese_name'),
+                'pinyin': pinyin,
+                'pinyin_initials': initials,
+            }
+        for row in rows:
+            entries[(row.symbol, row.market)] = {
+                'symbol': row.symbol,
+                'market': row.market,
+                'name': row.name,
+                'chinese_name': row.chinese_name,
+                'pinyin': row.pinyin,
+                'pinyin_initials': row.pinyin_initials,
+            }
+
+        self._build(list(entries.values()))
+        print(f"Symbol index loaded with {len(self._entries)} symbols")
+
+    def _build(self, entries):
+        keyed = []
+        postings = {}
+        trigram_counts = []
+
+        for i, entry in enumerate(entries):
+            keyed.append((entry['symbol'].lower(), i, RANK_SYMBOL_PREFIX))
+
+            name = normalize(entry['name'])
+            words = name.split()
+            # Match from any of the first few words, e.g. "motors" finds "General Motors"
+            for start in range(min(len(words), 3)):
+                keyed.append((' '.join(words[start:]), i, RANK_NAME_PREFIX))
+            chinese_name = entry['chinese_name']
+            if chinese_name:
+                # Chinese names are unspaced, so match from any character, e.g. 茅台 finds 贵州茅台
+                for start in range(len(chinese_name)):
+                    keyed.append((chinese_name[start:], i, RANK_NAME_PREFIX))
+            if entry['pinyin']:
+                keyed.append((entry['pinyin'], i, RANK_NAME_PREFIX))
+            if entry['pinyin_initials']:
+                keyed.append((entry['pinyin_initials'], i, RANK_INITIALS_PREFIX))
+
+            grams = trigrams(name) if name else set()
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+            trigram_counts.append(len(grams))
+
+        keyed.sort()
+        with self._lock:
+            self._entries = entries
+            self._by_symbol = {(e['symbol'], e['market']): e for e in entries}
+            self._keys = [key for key, _, _ in keyed]
+            self._key_refs = [(i, rank) for _, i, rank in keyed]
+            self._postings = postings
+            self._trigram_counts = trigram_counts
+            self._loaded = True
+            self._loaded_at = time.time()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.reload()
+        elif time.time() - self._loaded_at >= SYMBOL_INDEX_RELOAD_INTERVAL and not self._reloading:
+            # Keep serving the current index while the new one builds
+            self._reloading = True
+            threading.Thread(target=self._background_reload, daemon=True).start()
+
+    def _background_reload(self):
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"Error reloading symbol index: {e}")
+        finally:
+            self._reloading = False
+
+    def lookup(self, symbol, market='US'):
+        """Get the symbol master entry for a symbol, or None"""
+        self._ensure_loaded()
+        return self._by_symbol.get((symbol, market))
+
+    def search(self, query, market=None, limit=10):
+        """
+        Search by ticker, English name, Chinese name or pinyin
+
+        Returns:
+            list: entry dicts (symbol, market, name, chinese_name, ...) best match first
+        """
+        self._ensure_loaded()
+        q = normalize(query)
+        if not q:
+            return []
+
+        best = {}  # entry index -> rank
+
+        def consider(i, rank):
+            if market and self._entries[i]['market'] != market:
+                return
+            if rank < best.get(i, RANK_FUZZY + 1):
+                best[i] = rank
+
+        # Prefix matches over every key
+        compact = q.replace(' ', '')
+        for prefix in {q, compact}:
+            pos = bisect_left(self._keys, prefix)
+            scanned = 0
+            while pos < len(self._keys) and self._keys[pos].startswith(prefix) and scanned < MAX_PREFIX_CANDIDATES:
+                i, rank = self._key_refs[pos]
+                if rank == RANK_SYMBOL_PREFIX and self._keys[pos] == prefix:
+                    rank = RANK_EXACT_SYMBOL
+                consider(i, rank)
+                pos += 1
+                scanned += 1
+
+        # Fuzzy matches for misspelled names
+        if len(best) < limit and len(q) >= 3:
+            for i, score in self._fuzzy(q):
+                consider(i, RANK_FUZZY)
+                if len(best) >= limit * 2:
+                    break
+
+        ranked = sorted(best.items(), key=lambda item: (
+            item[1], len(self._entries[item[0]]['name'] or self._entries[item[0]]['chinese_name'] or ''),
+            self._entries[item[0]]['symbol']
+        ))
+        return [self._entries[i] for i, _ in ranked[:limit]]
+
+    def _fuzzy(self, q):
+        """Entries whose names share enough trigrams with q, best first"""
+        grams = trigrams(q)
+        overlap = Counter()
+        for gram in grams:
+            entries = self._postings.get(gram)
+            if entries and len(entries) <= MAX_TRIGRAM_POSTINGS:
+                overlap.update(entries)
+
+        scored = []
+        for i, shared in overlap.items():
+            score = shared / len(grams)
+            if score >= FUZZY_THRESHOLD:
+                scored.append((i, score, self._trigram_counts[i]))
+        # Best coverage first, then the closest (shortest) name
+        scored.sort(key=lambda item: (-item[1], item[2]))
+        return [(i, score) for i, score, _ in scored]
+
+    def stats(self):
+        return {
+            'symbols': len(self._entries),
+            'keys': len(self._keys),
+            'loaded_at': datetime.fromtimestamp(self._loaded_at).isoformat() if self._loaded else None
+        }
+
+
+# Shared symbol index used by StockService
+symbol_index = SymbolIndex()
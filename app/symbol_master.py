@@ -0,0 +1,212 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+import requests
+from sqlalchemy import delete
+
+from app import db
+from app.models import SymbolMaster
+
+# US listings published by Nasdaq Trader (pipe delimited)
+NASDAQ_LISTED_URL = 'https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt'
+OTHER_LISTED_URL = 'https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt'
+
+# HKEX list of securities, in English and Chinese
+HKEX_LIST_URL = 'https://www.hkex.com.hk/eng/services/trading/securities/securitieslists/ListOfSecurities.xlsx'
+HKEX_LIST_ZH_URL = 'https://www.hkex.com.hk/chi/services/trading/securities/securitieslists/ListOfSecurities_c.xlsx'
+
+# Shanghai and Shenzhen A-share list (code and Chinese name)
+CN_LIST_URL = 'https://push2.eastmoney.com/api/qt/clist/get'
+CN_LIST_PARAMS = {
+    'pn': 1,
+    'pz': 10000,
+    'po': 1,
+    'np': 1,
+    'fltt': 2,
+    'fid': 'f12',
+    'fs': 'm:1+t:2,m:1+t:23,m:0+t:6,m:0+t:80',  # SSE main/STAR, SZSE main/ChiNext
+    'fields': 'f12,f14',
+}
+
+REQUEST_TIMEOUT = 30
+
+# Well known names, so search works before the first rebuild and CN stocks
+# have English names
+SEED_SYMBOLS = [
+    # US stocks
+    {'symbol': 'NVDA', 'market': 'US', 'name': 'NVIDIA Corporation'},
+    {'symbol': 'AAPL', 'market': 'US', 'name': 'Apple Inc.'},
+    {'symbol': 'MSFT', 'market': 'US', 'name': 'Microsoft Corporation'},
+    {'symbol': 'AMZN', 'market': 'US', 'name': 'Amazon.com, Inc.'},
+    {'symbol': 'GOOGL', 'market': 'US', 'name': 'Alphabet Inc. (Google)'},
+    {'symbol': 'TSLA', 'market': 'US', 'name': 'Tesla, Inc.'},
+    {'symbol': 'META', 'market': 'US', 'name': 'Meta Platforms, Inc. (Facebook)'},
+    {'symbol': 'NFLX', 'market': 'US', 'name': 'Netflix, Inc.'},
+    {'symbol': 'BRK-B', 'market': 'US', 'name': 'Berkshire Hathaway Inc.'},
+    {'symbol': 'JPM', 'market': 'US', 'name': 'JPMorgan Chase & Co.'},
+    {'symbol': 'KO', 'market': 'US', 'name': 'The Coca-Cola Company'},
+    {'symbol': 'DIS', 'market': 'US', 'name': 'The Walt Disney Company'},
+    {'symbol': 'WMT', 'market': 'US', 'name': 'Walmart Inc.'},
+    {'symbol': 'JNJ', 'market': 'US', 'name': 'Johnson & Johnson'},
+    {'symbol': 'V', 'market': 'US', 'name': 'Visa Inc.'},
+    {'symbol': 'MA', 'market': 'US', 'name': 'Mastercard Incorporated'},
+    {'symbol': 'INTC', 'market': 'US', 'name': 'Intel Corporation'},
+    {'symbol': 'AMD', 'market': 'US', 'name': 'Advanced Micro Devices, Inc.'},
+    {'symbol': 'QCOM', 'market': 'US', 'name': 'QUALCOMM Incorporated'},
+    {'symbol': 'IBM', 'market': 'US', 'name': 'International Business Machines Corporation'},
+    # HK stocks
+    {'symbol': '0700', 'market': 'HK', 'name': 'Tencent Holdings Ltd.', 'chinese_name': '腾讯控股'},
+    {'symbol': '9988', 'market': 'HK', 'name': 'Alibaba Group Holding Ltd.', 'chinese_name': '阿里巴巴'},
+    {'symbol': '0941', 'market': 'HK', 'name': 'China Mobile Ltd.', 'chinese_name': '中国移动'},
+    {'symbol': '0005', 'market': 'HK', 'name': 'HSBC Holdings plc', 'chinese_name': '汇丰控股'},
+    {'symbol': '3690', 'market': 'HK', 'name': 'Meituan', 'chinese_name': '美团'},
+    # CN stocks
+    {'symbol': '600519', 'market': 'CN', 'name': 'Kweichow Moutai Co., Ltd.', 'chinese_name': '贵州茅台'},
+    {'symbol': '601398', 'market': 'CN', 'name': 'Industrial and Commercial Bank of China', 'chinese_name': '工商银行'},
+    {'symbol': '600036', 'market': 'CN', 'name': 'China Merchants Bank', 'chinese_name': '招商银行'},
+    {'symbol': '601318', 'market': 'CN', 'name': 'Ping An Insurance', 'chinese_name': '中国平安'},
+    {'symbol': '000858', 'market': 'CN', 'name': 'Wuliangye Yibin Co., Ltd.', 'chinese_name': '五粮液'},
+]
+
+
+def to_pinyin(chinese_name):
+    """
+    Get (full pinyin, initials) for a Chinese name, e.g. ('guizhoumaotai', 'gzmt')
+    Returns (None, None) if pypinyin isn't installed
+    """
+    if not chinese_name:
+        return None, None
+    try:
+        from pypinyin import lazy_pinyin, Style
+    except ImportError:
+        return None, None
+
+    syllables = [s for s in lazy_pinyin(chinese_name) if s.strip()]
+    initials = lazy_pinyin(chinese_name, style=Style.FIRST_LETTER)
+    return ''.join(syllables).lower(), ''.join(initials).lower()
+
+
+def fetch_us_symbols():
+    """Download NASDAQ and NYSE/other US listings"""
+    symbols = []
+    for url, symbol_column in ((NASDAQ_LISTED_URL, 'Symbol'), (OTHER_LISTED_URL, 'ACT Symbol')):
+        response = requests.get(url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        frame = pd.read_csv(io.StringIO(response.text), sep='|', dtype=str)
+
+        # Last line is the file creation timestamp
+        frame = frame[frame[symbol_column].notna() & ~frame[symbol_column].str.startswith('File Creation Time')]
+        if 'Test Issue' in frame.columns:
+            frame = frame[frame['Test Issue'] != 'Y']
+
+        for symbol, name in zip(frame[symbol_column], frame['Security Name']):
+            # Skip preferred shares and warrants notation Yahoo doesn't use
+            if '$' in symbol or '=' in symbol:
+                continue
+            symbols.append({
+                'symbol': symbol.replace('.', '-'),  # Yahoo writes BRK.B as BRK-B
+                'market': 'US',
+                'name': name,
+            })
+    return symbols
+
+
+def fetch_hk_symbols():
+    """Download the HKEX list of equity securities with Chinese names"""
+    def read_list(url):
+        response = requests.get(url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        # Requires openpyxl; the first two rows are a title and a date
+        frame = pd.read_excel(io.BytesIO(response.content), skiprows=2, dtype=str)
+        frame = frame[frame.iloc[:, 2].astype(str).str.contains('Equity|股本', na=False)]
+        return {f"{int(code):04d}": name.strip() for code, name in zip(frame.iloc[:, 0], frame.iloc[:, 1])}
+
+    english = read_list(HKEX_LIST_URL)
+    try:
+        chinese = read_list(HKEX_LIST_ZH_URL)
+    except Exception as e:
+        print(f"Could not load HKEX Chinese names: {e}")
+        chinese = {}
+
+    return [
+        {'symbol': code, 'market': 'HK', 'name': name, 'chinese_name': chinese.get(code)}
+        for code, name in english.items()
+    ]
+
+
+def fetch_cn_symbols():
+    """Download the Shanghai and Shenzhen A-share list"""
+    response = requests.get(CN_LIST_URL, params=CN_LIST_PARAMS, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    rows = ((response.json().get('data') or {}).get('diff')) or []
+    if isinstance(rows, dict):
+        rows = list(rows.values())
+
+    return [
+        {'symbol': row['f12'], 'market': 'CN', 'name': None, 'chinese_name': row['f14'].replace(' ', '')}
+        for row in rows if row.get('f12') and row.get('f14')
+    ]
+
+
+MARKET_FETCHERS = {
+    'US': fetch_us_symbols,
+    'HK': fetch_hk_symbols,
+    'CN': fetch_cn_symbols,
+}
+
+
+def rebuild_symbol_master(markets=('US', 'HK', 'CN')):
+    """
+    Rebuild the symbol master for the given markets in bulk
+
+    A market whose download fails keeps its existing rows. Must be called
+    inside an app context.
+
+    Returns:
+        dict: number of stored symbols per rebuilt market
+    """
+    seeds = {(seed['symbol'], seed['market']): seed for seed in SEED_SYMBOLS}
+    counts = {}
+
+    for market in markets:
+        try:
+            print(f"Downloading {market} symbol list...")
+            symbols = MARKET_FETCHERS[market]()
+        except Exception as e:
+            print(f"Failed to download {market} symbol list, keeping existing rows: {e}")
+            continue
+
+        rows = {}
+        for entry in symbols:
+            rows[(entry['symbol'], market)] = entry
+        # Seed names fill gaps (e.g. English names for CN stocks)
+        for key, seed in seeds.items():
+            if key[1] == market:
+                row = rows.setdefault(key, dict(seed))
+                row['name'] = row.get('name') or seed.get('name')
+                row['chinese_name'] = row.get('chinese_name') or seed.get('chinese_name')
+
+        now = datetime.utcnow()
+        records = []
+        for (symbol, _), entry in rows.items():
+            pinyin, initials = to_pinyin(entry.get('chinese_name'))
+            records.append({
+                'symbol': symbol,
+                'market': market,
+                'name': entry.get('name'),
+                'chinese_name': entry.get('chinese_name'),
+                'pinyin': pinyin,
+                'pinyin_initials': initials,
+                'updated_at': now,
+            })
+
+        db.session.execute(delete(SymbolMaster).where(SymbolMaster.market == market))
+        if records:
+            db.session.execute(SymbolMaster.__table__.insert(), records)
+        db.session.commit()
+
+        counts[market] = len(records)
+        print(f"Stored {len(records)} {market} symbols")
+
+    return counts
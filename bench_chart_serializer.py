@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark the fast chart serializer against the Plotly fig.to_json() path
+
+Usage:
+    python bench_chart_serializer.py            # synthetic 5-year daily history
+    python bench_chart_serializer.py AAPL US    # real history via yfinance
+"""
+
+import sys
+import time
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.stock_service import StockService
+from app.chart_data import build_chart_series
+from app.chart_serializer import figure_json, plotly_figure_json
+
+RUNS = 20
+
+
+def synthetic_history(years=5):
+    """Build a random-walk daily OHLCV frame shaped like yfinance history"""
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=years * 252, name='Date')
+    rng = np.random.default_rng(42)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, len(index))))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.003, len(index))),
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(1e6, 5e7, len(index)).astype(float),
+    }, index=index)
+
+
+def bench(label, build):
+    """Time build() over RUNS runs and report payload size"""
+    payload = build()  # warm-up
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        build()
+    elapsed = (time.perf_counter() - start) / RUNS
+    print(f"{label:<28} {len(payload):>10,} bytes {elapsed * 1000:>10.2f} ms")
+    return payload, elapsed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        symbol = sys.argv[1]
+        market = sys.argv[2] if len(sys.argv) > 2 else 'US'
+        hist_data = StockService._fetch_history(symbol, market, period='5y')
+    else:
+        symbol = 'SYNTH'
+        hist_data = synthetic_history()
+
+    print(f"\n=== Chart serialization for {symbol}: {len(hist_data)} daily bars, {RUNS} runs ===")
+
+    # Downsampling is shared by both paths, so time it separately
+    series = build_chart_series(hist_data)
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        build_chart_series(hist_data)
+    print(f"{'build_chart_series (shared)':<28} {'':>16} {(time.perf_counter() - start) / RUNS * 1000:>10.2f} ms")
+
+    plotly_json, plotly_time = bench("fig.to_json()", lambda: plotly_figure_json(series, symbol))
+    fast_json, fast_time = bench("fast typed-array serializer", lambda: figure_json(series, symbol))
+
+    print(f"\nPayload: {len(fast_json) / len(plotly_json):.0%} of fig.to_json(), "
+          f"serialization {plotly_time / fast_time:.1f}x faster")
+
+    # Sanity check that both paths describe the same traces
+    plotly_traces = [trace['type'] for trace in json.loads(plotly_json)['data']]
+    fast_traces = [trace['type'] for trace in json.loads(fast_json)['data']]
+    print(f"Traces: {plotly_traces} vs {fast_traces}")
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Rebuild the offline symbol master used by name search and autocomplete
+
+Usage:
+    python build_symbol_master.py           # all markets
+    python build_symbol_master.py HK CN     # selected markets
+"""
+
+import sys
+
+from app import app, db
+from app.symbol_master import MARKET_FETCHERS, rebuild_symbol_master
+
+if __name__ == "__main__":
+    markets = [market.upper() for market in sys.argv[1:]] or list(MARKET_FETCHERS)
+    unknown = [market for market in markets if market not in MARKET_FETCHERS]
+    if unknown:
+        print(f"Unknown market(s): {', '.join(unknown)}. Choose from {', '.join(MARKET_FETCHERS)}")
+        sys.exit(1)
+
+    with app.app_context():
+        db.create_all()
+        counts = rebuild_symbol_master(markets)
+
+    print(f"\nSymbol master rebuilt: {counts}")
+    if set(counts) != set(markets):
+        sys.exit(1)
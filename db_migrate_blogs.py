@@ -1,8 +1,13 @@
-from app import app, db
-from app.models import MarkdownBlog
+"""
+Kept for existing installs: the markdown_blog table is now created by
+the versioned migrations in app/migrations.py (python migrate.py)
+"""
 
-# Create the MarkdownBlog table if it doesn't exist
-print("Migrating database: Adding MarkdownBlog table")
-with app.app_context():
-    db.create_all()
-print("Database migration completed successfully!")
\ No newline at end of file
+from app.migrations import run_migrations
+
+def run_migration():
+    versions = run_migrations()
+    print(f"Applied {len(versions)} migration(s)" if versions else "Database is up to date")
+
+if __name__ == "__main__":
+    run_migration()
@@ -1,17 +1,13 @@
-from app import app, db
-from sqlalchemy import text
+"""
+Kept for existing installs: the roe column is now added by
+the versioned migrations in app/migrations.py (python migrate.py)
+"""
+
+from app.migrations import run_migrations
 
 def run_migration():
-    with app.app_context():
-        # Add ROE column if it doesn't exist
-        try:
-            db.session.execute(text("ALTER TABLE stock ADD COLUMN roe FLOAT"))
-            print("Added ROE column")
-        except Exception as e:
-            print(f"Error adding ROE column: {e}")
-            
-        # Commit changes
-        db.session.commit()
+    versions = run_migrations()
+    print(f"Applied {len(versions)} migration(s)" if versions else "Database is up to date")
 
 if __name__ == "__main__":
-    run_migration()
\ No newline at end of file
+    run_migration()
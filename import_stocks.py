@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Import stocks into the portfolio from a CSV or JSON file
+
+Usage:
+    python import_stocks.py holdings.csv               # rows without a market are US
+    python import_stocks.py holdings.csv --market HK   # default market for rows without one
+    python import_stocks.py holdings.json --dry-run    # validate only, insert nothing
+
+CSV files need a header with a symbol column (symbol, ticker or code) and
+may have a market column; JSON files are a list of symbols or objects.
+"""
+
+import argparse
+import sys
+
+from app import app
+from app.portfolio_import import ImportFormatError, import_stocks, parse_import
+
+
+def print_progress(validated, total):
+    print(f"Validated {validated}/{total} symbols", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import stocks from a CSV or JSON file")
+    parser.add_argument('path', help="CSV or JSON file")
+    parser.add_argument('--market', default='US', choices=['US', 'HK', 'CN'],
+                        help="market for rows that don't name one")
+    parser.add_argument('--dry-run', action='store_true', help="validate without inserting")
+    args = parser.parse_args()
+
+    with open(args.path, 'rb') as f:
+        content = f.read()
+    fmt = 'json' if args.path.lower().endswith('.json') else 'csv' if args.path.lower().endswith('.csv') else None
+
+    try:
+        rows = parse_import(content, fmt)
+    except (ImportFormatError, UnicodeDecodeError) as e:
+        sys.exit(f"Could not read {args.path}: {e}")
+
+    with app.app_context():
+        report = import_stocks(rows, args.market, args.dry_run, progress=print_progress)
+
+    for entry in report['skipped']:
+        market = f" ({entry['market']})" if entry.get('market') else ''
+        print(f"  line {entry['line']}: {entry['symbol']}{market} skipped - {entry['reason']}")
+    if 'error' in report:
+        sys.exit(report['error'])
+    verb = "Would add" if args.dry_run else "Added"
+    print(f"{verb} {len(report['added'])} stocks, skipped {len(report['skipped'])}")
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Apply the versioned schema migrations in app/migrations.py
+
+Usage:
+    python migrate.py              # apply pending migrations
+    python migrate.py --to 3       # apply pending migrations up to version 3
+    python migrate.py --status     # list applied and pending migrations
+"""
+
+import argparse
+import json
+
+from app.migrations import MIGRATIONS, applied_migrations, run_migrations
+
+
+def print_status():
+    applied = {entry.version: entry for entry in applied_migrations()}
+    for version, description, _ in sorted(MIGRATIONS, key=lambda entry: entry[0]):
+        entry = applied.get(version)
+        if entry is None:
+            print(f"[pending] {version}: {description}")
+            continue
+        print(f"[applied {entry.applied_at:%Y-%m-%d %H:%M}] {version}: {description}")
+        for statement in json.loads(entry.statements or '[]'):
+            print(f"    {statement}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply schema migrations")
+    parser.add_argument('--to', type=int, help="highest version to apply")
+    parser.add_argument('--status', action='store_true', help="list applied and pending migrations")
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+    else:
+        versions = run_migrations(target=args.to)
+        print(f"Applied {len(versions)} migration(s)" if versions else "Database is up to date")
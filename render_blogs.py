@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Re-render the stored HTML of Markdown blogs
+
+Run after changing the Markdown extensions or the allowed tags in
+app/blog_renderer.py (posts whose stored HTML is already current are
+skipped unless --force is given).
+
+Usage:
+    python render_blogs.py            # posts rendered with an older configuration
+    python render_blogs.py --force    # every post
+"""
+
+import sys
+
+from app import app, db
+from app.models import MarkdownBlog
+from app.blog_renderer import blog_pages, render_blog
+
+
+def rerender_blogs(force=False):
+    with app.app_context():
+        blogs = MarkdownBlog.query.all()
+        rendered = 0
+        for index, blog in enumerate(blogs, 1):
+            if render_blog(blog, force=force):
+                rendered += 1
+            if index % 100 == 0:
+                db.session.commit()
+                print(f"  {index}/{len(blogs)} posts checked")
+        db.session.commit()
+
+    # Cached pages embed the old HTML
+    if rendered:
+        blog_pages.clear()
+    print(f"Re-rendered {rendered} of {len(blogs)} posts")
+    return rendered
+
+
+if __name__ == "__main__":
+    rerender_blogs(force='--force' in sys.argv[1:])
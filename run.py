@@ -1,6 +1,8 @@
 from app import app, db
 from app.models import Stock
+from app.quote_refresher import quote_refresher
 from datetime import datetime
+import os
 
 @app.context_processor
 def inject_now():
@@ -11,4 +13,8 @@ with app.app_context():
     db.create_all()
 
 if __name__ == '__main__':
+    # Warm all quotes at startup. With the debug reloader the app is served
+    # from a child process, so only start the refresher there.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        quote_refresher.start()
     app.run(debug=True, host='127.0.0.1', port=5000)
\ No newline at end of file
@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before it is imported
+_db_dir = tempfile.mkdtemp(prefix='myvalueline-test-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+os.environ['QUOTE_REFRESHER'] = '0'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import run  # noqa: E402,F401  (template context processors)
+from app import app, db  # noqa: E402
+
+
+@pytest.fixture
+def app_context():
+    """App context over empty tables, dropped again after the test"""
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
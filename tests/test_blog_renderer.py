@@ -0,0 +1,67 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.blog_renderer import blog_pages, render_blog
+from app.models import MarkdownBlog
+from render_blogs import rerender_blogs
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def blogs(app_context, tmp_path, monkeypatch):
+    """Three published posts saved before rendering on save, oldest first"""
+    monkeypatch.setattr(blog_pages, 'directory', str(tmp_path))
+    posts = [MarkdownBlog(title=f"Post {index}", content=f"# Post {index}\n\nBody {index}", is_published=True,
+                          created_at=START, updated_at=START + timedelta(days=index))
+             for index in range(3)]
+    db.session.add_all(posts)
+    db.session.commit()
+    return posts
+
+
+def updated_times():
+    db.session.expire_all()
+    return {blog.title: blog.updated_at for blog in MarkdownBlog.query}
+
+
+def listing(client):
+    return re.findall(r'<strong>(Post \d)</strong>', client.get('/blogs').get_data(as_text=True))
+
+
+def test_first_view_renders_without_touching_updated_at(blogs, app_context):
+    client = app_context.test_client()
+    before, order = updated_times(), listing(client)
+    assert order == ['Post 2', 'Post 1', 'Post 0']
+
+    response = client.get(f'/blogs/{blogs[0].id}')
+    assert response.status_code == 200
+    assert db.session.get(MarkdownBlog, blogs[0].id).rendered_html is not None
+    assert updated_times() == before
+    assert listing(client) == order
+
+
+@pytest.mark.parametrize('force', [False, True])
+def test_rerender_keeps_updated_at_and_listing(blogs, app_context, force):
+    client = app_context.test_client()
+    rerender_blogs()
+    before, order = updated_times(), listing(client)
+
+    assert rerender_blogs(force=force) == (3 if force else 0)
+    assert updated_times() == before
+    assert listing(client) == order
+
+
+def test_render_blog_on_an_edited_post_keeps_the_new_updated_at(blogs, app_context):
+    blog = blogs[0]
+    edited = datetime(2025, 6, 1)
+    blog.content = "Edited"
+    blog.updated_at = edited
+    assert render_blog(blog)
+    db.session.commit()
+
+    assert updated_times()['Post 0'] == edited
+    assert 'Edited' in blog.rendered_html
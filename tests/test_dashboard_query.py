@@ -0,0 +1,94 @@
+import pytest
+
+from app import db
+from app.dashboard_query import DashboardQueryError, dashboard_page, parse_filters
+from app.models import Stock
+
+ROE = {'A': 12.0, 'B': None, 'C': 5.0, 'D': 12.0, 'E': None, 'F': -3.0, 'G': None}
+
+
+@pytest.fixture
+def stocks(app_context):
+    rows = [Stock(symbol=symbol, market='HK' if symbol in 'CG' else 'US', name=symbol, roe=roe,
+                  display_order=(index + 1) * 1024)
+            for index, (symbol, roe) in enumerate(ROE.items())]
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def read_all(limit, **kwargs):
+    """Follow the cursors through every page; returns (symbols, pages)"""
+    symbols, pages, after = [], [], None
+    while True:
+        page = dashboard_page(after=after, limit=limit, **kwargs)
+        pages.append(page)
+        symbols += [row['symbol'] for row in page['stocks']]
+        after = page['next']
+        if after is None:
+            return symbols, pages
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 5, 7, 100])
+def test_ascending_pages_end_with_the_null_tail(stocks, limit):
+    symbols, pages = read_all(limit, sort='roe', direction='asc')
+    # Ties on roe broken by id; NULLs last, by id
+    assert symbols == ['F', 'C', 'A', 'D', 'B', 'E', 'G']
+    assert pages[0]['total'] == 7
+    assert all('total' not in page for page in pages[1:])
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 5, 7, 100])
+def test_descending_pages_also_end_with_the_null_tail(stocks, limit):
+    symbols, _ = read_all(limit, sort='roe', direction='desc')
+    assert symbols == ['D', 'A', 'C', 'F', 'G', 'E', 'B']
+
+
+def test_page_ending_on_the_last_value_continues_into_the_null_tail(stocks):
+    page = dashboard_page(sort='roe', limit=4)
+    assert [row['symbol'] for row in page['stocks']] == ['F', 'C', 'A', 'D']
+    assert page['next'] is not None
+
+    page = dashboard_page(sort='roe', after=page['next'], limit=4)
+    assert [row['symbol'] for row in page['stocks']] == ['B', 'E', 'G']
+    assert page['next'] is None
+
+
+def test_page_inside_the_null_tail_uses_a_null_cursor(stocks):
+    page = dashboard_page(sort='roe', limit=5)
+    assert page['next'].startswith('null_')
+    page = dashboard_page(sort='roe', after=page['next'], limit=5)
+    assert [row['symbol'] for row in page['stocks']] == ['E', 'G']
+
+
+def test_filters_apply_to_every_page(stocks):
+    market, thresholds = parse_filters({'market': 'us', 'min_roe': '0'})
+    symbols, pages = read_all(1, sort='roe', market=market, thresholds=thresholds)
+    assert symbols == ['A', 'D']
+    assert pages[0]['total'] == 2
+
+    # Without a threshold, the market filter keeps its NULLs
+    symbols, _ = read_all(2, sort='roe', market='HK')
+    assert symbols == ['C', 'G']
+
+
+def test_default_sort_is_display_order(stocks):
+    symbols, _ = read_all(3)
+    assert symbols == list(ROE)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'sort': 'name'},
+    {'direction': 'up'},
+    {'after': 'garbage'},
+    {'after': '1.5_x'},
+])
+def test_invalid_requests(stocks, kwargs):
+    with pytest.raises(DashboardQueryError):
+        dashboard_page(**kwargs)
+
+
+@pytest.mark.parametrize('args', [{'market': 'LSE'}, {'max_eps': 'lots'}])
+def test_invalid_filters(args):
+    with pytest.raises(DashboardQueryError):
+        parse_filters(args)
@@ -0,0 +1,140 @@
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from app import db
+from app.history_store import HistoryStore, HISTORY_SYNC_INTERVAL
+from app.models import PriceHistorySync
+
+
+class FakeFetcher:
+    """Serves bars from a {date: close} dict and records every call"""
+
+    def __init__(self, closes):
+        self.closes = dict(closes)
+        self.dividends = {}
+        self.calls = []
+
+    def __call__(self, symbol, market, period=None, start=None):
+        self.calls.append({'period': period} if period else {'start': start})
+        dates = sorted(d for d in self.closes if start is None or d >= date.fromisoformat(start))
+        if not dates:
+            return pd.DataFrame()
+        closes = [self.closes[d] for d in dates]
+        return pd.DataFrame({
+            'Open': closes, 'High': closes, 'Low': closes, 'Close': closes,
+            'Volume': [1000.0] * len(dates),
+            'Dividends': [self.dividends.get(d, 0.0) for d in dates],
+            'Stock Splits': [0.0] * len(dates),
+        }, index=pd.DatetimeIndex(dates, name='Date'))
+
+
+def business_days(count, end=None):
+    end = end or date.today()
+    days = pd.bdate_range(end=end, periods=count)
+    return [day.date() for day in days]
+
+
+def expire_sync(symbol, market='US'):
+    sync = db.session.get(PriceHistorySync, (symbol, market))
+    sync.last_synced = datetime.utcnow() - timedelta(seconds=HISTORY_SYNC_INTERVAL + 1)
+    db.session.commit()
+
+
+def test_first_request_bootstraps_then_serves_locally(app_context):
+    days = business_days(30)
+    fetcher = FakeFetcher({day: 100.0 + i for i, day in enumerate(days)})
+    store = HistoryStore(fetcher)
+
+    history = store.get_history('AAA', 'US', period='1mo')
+    assert fetcher.calls == [{'period': '10y'}]
+    assert history['Close'].iloc[-1] == 129.0
+
+    store.get_history('AAA', 'US', period='5d')
+    assert len(fetcher.calls) == 1
+
+
+def test_intraday_move_of_last_bar_is_not_a_readjustment(app_context):
+    days = business_days(30)
+    fetcher = FakeFetcher({day: 100.0 for day in days})
+    store = HistoryStore(fetcher)
+    store.get_history('AAA', 'US', period='1y')
+
+    # Today's bar moved during the session, and a new bar arrived
+    fetcher.closes[days[-1]] = 104.0
+    tomorrow = days[-1] + timedelta(days=1)
+    fetcher.closes[tomorrow] = 105.0
+    expire_sync('AAA')
+    history = store.get_history('AAA', 'US', period='1y')
+
+    assert len(fetcher.calls) == 2
+    assert 'start' in fetcher.calls[1]
+    assert history['Close'].loc[pd.Timestamp(days[-1])] == 104.0
+    assert history['Close'].iloc[-1] == 105.0
+    sync = db.session.get(PriceHistorySync, ('AAA', 'US'))
+    assert sync.last_date == tomorrow
+    assert sync.last_rewrite is not None and sync.last_rewrite < sync.last_synced
+
+
+def test_changed_earlier_bar_rewrites_stored_range(app_context):
+    days = business_days(30)
+    fetcher = FakeFetcher({day: 100.0 for day in days})
+    store = HistoryStore(fetcher)
+    store.get_history('AAA', 'US', period='1y')
+
+    # A dividend re-adjusted every close before the ex-date
+    for day in days[:-1]:
+        fetcher.closes[day] = 99.0
+    expire_sync('AAA')
+    history = store.get_history('AAA', 'US', period='1y')
+
+    assert len(fetcher.calls) == 3
+    assert fetcher.calls[2] == {'period': 'max'}  # listed inside the bootstrap window
+    assert (history['Close'].iloc[:-1] == 99.0).all()
+
+
+def test_new_dividend_rewrites_stored_range(app_context):
+    days = business_days(30)
+    fetcher = FakeFetcher({day: 100.0 for day in days})
+    store = HistoryStore(fetcher)
+    store.get_history('AAA', 'US', period='1y')
+
+    tomorrow = days[-1] + timedelta(days=1)
+    fetcher.closes[tomorrow] = 100.0
+    fetcher.dividends[tomorrow] = 0.5
+    expire_sync('AAA')
+    store.get_history('AAA', 'US', period='1y')
+
+    assert len(fetcher.calls) == 3
+
+
+def test_dividend_already_stored_on_last_bar_is_not_new(app_context):
+    days = business_days(30)
+    fetcher = FakeFetcher({day: 100.0 for day in days})
+    fetcher.dividends[days[-1]] = 0.5
+    store = HistoryStore(fetcher)
+    store.get_history('AAA', 'US', period='1y')
+
+    expire_sync('AAA')
+    store.get_history('AAA', 'US', period='1y')
+
+    assert len(fetcher.calls) == 2
+
+
+def test_empty_bootstrap_is_recorded_and_not_repeated(app_context):
+    fetcher = FakeFetcher({})
+    store = HistoryStore(fetcher)
+
+    assert store.get_history('GONE', 'US', period='1y') is None
+    assert store.get_history('GONE', 'US', period='1y') is None
+    assert len(fetcher.calls) == 1
+
+    sync = db.session.get(PriceHistorySync, ('GONE', 'US'))
+    assert sync.first_date is None and sync.last_synced is not None
+
+    # Retried once the sync interval has passed
+    fetcher.closes[date.today()] = 10.0
+    expire_sync('GONE')
+    history = store.get_history('GONE', 'US', period='1y')
+    assert len(fetcher.calls) == 2
+    assert history['Close'].iloc[-1] == 10.0
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.market_data_client import MarketDataClient
+
+pytest.importorskip('aiohttp')
+
+# 2024-01-02 .. 2024-01-04, 14:30 UTC (US session)
+TIMESTAMPS = [1704205800, 1704292200, 1704378600]
+
+
+def serve(client, status, body):
+    async def request(url, params=None, as_json=True):
+        return status, body
+
+    async def get_crumb(renew=False):
+        return 'crumb'
+
+    client._request = request
+    client._get_crumb = get_crumb
+
+
+def chart_body(adjclose):
+    return {'chart': {'result': [{
+        'meta': {'exchangeTimezoneName': 'America/New_York'},
+        'timestamp': TIMESTAMPS,
+        'indicators': {
+            'quote': [{
+                'open': [10.0, 11.0, 12.0],
+                'high': [10.0, 11.0, 12.0],
+                'low': [10.0, 11.0, 12.0],
+                'close': [10.0, 11.0, 12.0],
+                'volume': [100, 200, 300],
+            }],
+            'adjclose': [{'adjclose': adjclose}],
+        },
+        'events': {'dividends': {'1704292200': {'amount': 0.5, 'date': 1704292200}}},
+    }], 'error': None}}
+
+
+def test_history_is_auto_adjusted_like_yfinance():
+    client = MarketDataClient()
+    serve(client, 200, chart_body([5.0, 11.0, 12.0]))
+    frame = asyncio.run(client._history('AAA', period='5d'))
+
+    assert list(frame.columns) == ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+    assert [day.strftime('%Y-%m-%d') for day in frame.index] == ['2024-01-02', '2024-01-03', '2024-01-04']
+    assert str(frame.index.tz) == 'America/New_York'
+    # OHLC scaled by adjclose / close; the first bar was halved by the adjustment
+    assert frame['Close'].tolist() == [5.0, 11.0, 12.0]
+    assert frame['Open'].iloc[0] == 5.0
+    assert frame['Dividends'].tolist() == [0.0, 0.5, 0.0]
+
+
+def test_unknown_symbol_history_is_none():
+    client = MarketDataClient()
+    serve(client, 404, {'chart': {'result': None, 'error': {'code': 'Not Found'}}})
+    assert asyncio.run(client._history('NOPE', period='5d')) is None
+
+
+def test_quote_change_percent_is_a_percentage_like_info():
+    client = MarketDataClient()
+    serve(client, 200, {'quoteSummary': {'result': [{
+        'price': {'regularMarketPrice': {'raw': 101.0}, 'regularMarketChangePercent': {'raw': 0.0123}},
+        'summaryDetail': {'trailingPE': {'raw': 20.5}, 'regularMarketPrice': {'raw': 999.0}},
+    }], 'error': None}})
+    info = asyncio.run(client._quote_info('AAA'))
+
+    assert info['regularMarketChangePercent'] == pytest.approx(1.23)
+    assert info['regularMarketPrice'] == 101.0  # first module wins
+    assert info['trailingPE'] == 20.5
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from app import portfolio_import
+from app.portfolio_import import ImportFormatError, normalize_holding, parse_import
+
+
+@pytest.mark.parametrize('raw_symbol, raw_market, expected', [
+    ('aapl', None, ('AAPL', 'US')),
+    (' msft ', 'us', ('MSFT', 'US')),
+    ('0700.HK', None, ('0700', 'HK')),
+    ('700.hk', None, ('0700', 'HK')),
+    ('00005', 'HK', ('0005', 'HK')),
+    ('600519.SS', None, ('600519', 'CN')),
+    ('600519.SH', None, ('600519', 'CN')),
+    ('000001.SZ', None, ('000001', 'CN')),
+    ('BRK.B', None, ('BRK.B', 'US')),  # not a market suffix
+    ('0700.HK', 'hk', ('0700', 'HK')),
+])
+def test_normalize_holding(raw_symbol, raw_market, expected):
+    assert normalize_holding(raw_symbol, raw_market) == expected
+
+
+def test_normalize_holding_uses_default_market():
+    assert normalize_holding('5', default_market='HK') == ('0005', 'HK')
+    assert normalize_holding('600519', default_market='CN') == ('600519', 'CN')
+
+
+@pytest.mark.parametrize('raw_symbol, raw_market, message', [
+    ('', None, 'Missing symbol'),
+    (None, None, 'Missing symbol'),
+    ('  ', 'US', 'Missing symbol'),
+    ('AAPL', 'LSE', 'Unknown market LSE'),
+])
+def test_normalize_holding_rejects(raw_symbol, raw_market, message):
+    with pytest.raises(ValueError, match=message):
+        normalize_holding(raw_symbol, raw_market)
+
+
+def test_parse_csv_with_spreadsheet_line_numbers():
+    content = "Ticker,Exchange,Shares\nAAPL,US,10\n\n0700.HK,,5\n,,\nBAD,LSE,1\n"
+    assert parse_import(content) == [
+        {'line': 2, 'symbol': 'AAPL', 'market': 'US'},
+        {'line': 3, 'symbol': '0700.HK', 'market': None},
+        {'line': 5, 'symbol': 'BAD', 'market': 'LSE'},
+    ]
+
+
+def test_parse_csv_bytes_with_bom_and_chinese_headers():
+    content = "﻿股票代码,市场\n600519,CN\n".encode('utf-8')
+    assert parse_import(content) == [{'line': 2, 'symbol': '600519', 'market': 'CN'}]
+
+
+def test_parse_csv_row_without_symbol_is_kept_for_reporting():
+    rows = parse_import("symbol,market,note\n,HK,missing\n")
+    assert rows == [{'line': 2, 'symbol': None, 'market': 'HK'}]
+
+
+def test_parse_json_list_of_symbols_and_objects():
+    content = json.dumps(['AAPL', {'symbol': '0700', 'market': 'HK'}, {'Ticker': 'MSFT'}, 42])
+    assert parse_import(content) == [
+        {'line': 1, 'symbol': 'AAPL', 'market': None},
+        {'line': 2, 'symbol': '0700', 'market': 'HK'},
+        {'line': 3, 'symbol': 'MSFT', 'market': None},
+        {'line': 4, 'symbol': None, 'market': None},
+    ]
+
+
+def test_parse_json_wrapped_in_stocks_key():
+    content = json.dumps({'stocks': [{'code': '600519.SS'}]})
+    assert parse_import(content) == [{'line': 1, 'symbol': '600519.SS', 'market': None}]
+
+
+def test_parse_csv_without_symbol_column_reports_every_row():
+    rows = parse_import("name,shares\nApple,10\n", fmt='csv')
+    assert rows == [{'line': 2, 'symbol': None, 'market': None}]
+
+
+@pytest.mark.parametrize('content, message', [
+    ('[1, 2', 'Invalid JSON'),
+    ('{"holdings": []}', 'JSON must be a list'),
+    ('', 'CSV file is empty'),
+])
+def test_parse_import_rejects_malformed_files(content, message):
+    with pytest.raises(ImportFormatError, match=message):
+        parse_import(content)
+
+
+def test_parse_import_limits_rows(monkeypatch):
+    monkeypatch.setattr(portfolio_import, 'IMPORT_MAX_ROWS', 2)
+    with pytest.raises(ImportFormatError, match='Too many rows'):
+        parse_import('["A", "B", "C"]')
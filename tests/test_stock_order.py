@@ -0,0 +1,107 @@
+import pytest
+
+from app import db
+from app.models import ORDER_GAP, Stock
+from app.stock_order import ReorderError, StockOrder
+
+
+@pytest.fixture
+def stock_order(app_context, monkeypatch):
+    order = StockOrder()
+    # Rebalances run inline in these tests
+    monkeypatch.setattr(order, 'rebalance_in_background', lambda: None)
+    return order
+
+
+def add_stocks(*keys):
+    stocks = [Stock(symbol=f"S{index}", market='US', name=f"S{index}", display_order=key)
+              for index, key in enumerate(keys)]
+    db.session.add_all(stocks)
+    db.session.commit()
+    return stocks
+
+
+def dashboard_order():
+    return [stock.symbol for stock in Stock.query.order_by(Stock.display_order, Stock.id)]
+
+
+def keys():
+    return {stock.symbol: stock.display_order for stock in Stock.query}
+
+
+def test_new_stocks_are_appended_order_gap_apart(app_context):
+    for symbol in ('A', 'B'):
+        db.session.add(Stock(symbol=symbol, market='US', name=symbol))
+        db.session.commit()
+    assert [stock.display_order for stock in Stock.query.order_by(Stock.id)] == [ORDER_GAP, 2 * ORDER_GAP]
+
+
+def test_move_rewrites_only_the_moved_stock(stock_order):
+    a, b, c, d = add_stocks(1024, 2048, 3072, 4096)
+
+    assert stock_order.move(d, 1) == 1
+    assert dashboard_order() == ['S0', 'S3', 'S1', 'S2']
+    assert keys() == {'S0': 1024, 'S1': 2048, 'S2': 3072, 'S3': 1536}
+
+    stock_order.move(a, 10)  # past the end
+    assert dashboard_order() == ['S3', 'S1', 'S2', 'S0']
+    assert keys()['S0'] == 3072 + ORDER_GAP
+
+    stock_order.move(c, 0)
+    assert dashboard_order() == ['S2', 'S3', 'S1', 'S0']
+    assert keys()['S2'] == 1536 - ORDER_GAP
+
+
+def test_move_to_current_position_changes_nothing(stock_order):
+    a, b, c = add_stocks(1024, 2048, 3072)
+    assert stock_order.move(b, 1) == 0
+    assert keys() == {'S0': 1024, 'S1': 2048, 'S2': 3072}
+
+
+def test_move_without_room_rebalances_first(stock_order):
+    a, b, c = add_stocks(10, 11, 12)
+
+    assert stock_order.move(c, 1) == 1
+    assert dashboard_order() == ['S0', 'S2', 'S1']
+    assert stock_order.rebalances == 1
+    assert keys() == {'S0': ORDER_GAP, 'S2': ORDER_GAP + ORDER_GAP // 2, 'S1': 2 * ORDER_GAP}
+
+
+def test_step_up_and_down(stock_order):
+    a, b, c = add_stocks(1024, 2048, 3072)
+
+    stock_order.step(c, 'up')
+    assert dashboard_order() == ['S0', 'S2', 'S1']
+    stock_order.step(a, 'down')
+    assert dashboard_order() == ['S2', 'S0', 'S1']
+    assert stock_order.step(db.session.get(Stock, c.id), 'up') == 0
+    with pytest.raises(ReorderError):
+        stock_order.step(a, 'sideways')
+
+
+def test_apply_order_keeps_keys_of_stocks_already_in_order(stock_order):
+    a, b, c, d, e = add_stocks(1024, 2048, 3072, 4096, 5120)
+
+    # Only e moved, so only its key changes
+    assert stock_order.apply_order([a.id, e.id, b.id, c.id, d.id]) == 1
+    assert dashboard_order() == ['S0', 'S4', 'S1', 'S2', 'S3']
+    assert keys()['S1'] == 2048 and keys()['S3'] == 4096
+
+
+def test_apply_order_respaces_when_moved_stocks_do_not_fit(stock_order):
+    a, b, c = add_stocks(1, 2, 3)
+
+    stock_order.apply_order([c.id, a.id, b.id])
+    assert dashboard_order() == ['S2', 'S0', 'S1']
+    stock_order.apply_order([b.id, a.id, c.id])
+    assert dashboard_order() == ['S1', 'S0', 'S2']
+
+
+def test_apply_order_requires_every_stock_once(stock_order):
+    a, b, c = add_stocks(1024, 2048, 3072)
+
+    with pytest.raises(ReorderError):
+        stock_order.apply_order([a.id, b.id])
+    with pytest.raises(ReorderError):
+        stock_order.apply_order([a.id, b.id, b.id])
+    assert keys() == {'S0': 1024, 'S1': 2048, 'S2': 3072}